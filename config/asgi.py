@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Частые чтения — async-view (POLLS_ASYNC_READS в config.settings).
+os.environ.setdefault("POLLS_ASYNC_READS", "1")
+# Под ASGI у каждого запроса свой поток и своё соединение: постоянные
+# соединения только копились бы, для PostgreSQL вместо них — DATABASE_POOL=1.
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
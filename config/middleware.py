@@ -1,12 +1,251 @@
-class SimpleDebugMiddleware:
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.views.generic.list import MultipleObjectMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .routers import replica_configured, start_replica_reads, stop_replica_reads
+
+logger = logging.getLogger("config.performance")
+
+
+class QueryStats:
+    """Обёртка execute_wrapper: считает запросы и время выполнения SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def most_repeated(self, limit=3):
+        return [
+            (count, sql)
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+def view_query_budget(view_func, method):
+    """Бюджет SQL-запросов view: ``query_budgets`` по действиям ViewSet,
+    затем ``query_budget`` у функции или класса view."""
+    view_class = getattr(view_func, "cls", None) or getattr(
+        view_func, "view_class", None
+    )
+    budget = getattr(view_func, "query_budget", None)
+    if view_class is not None:
+        action = (getattr(view_func, "actions", None) or {}).get(method.lower())
+        budgets = getattr(view_class, "query_budgets", {})
+        if action in budgets:
+            return budgets[action]
+        if budget is None:
+            budget = getattr(view_class, "query_budget", None)
+    return budget
+
+
+class HybridMiddleware:
+    """Основа middleware, работающего и под WSGI, и под ASGI: в async-цепочке
+    вызывается ``__acall__``, и async-view не уходят в поток через
+    async_to_sync."""
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # process_view здесь не ходит в базу: в async-цепочке он
+            # вызывается корутиной, без перехода в поток.
+            if hasattr(self, "process_view"):
+                self.process_view = self.aprocess_view
 
     def __call__(self, request):
-        print(f"→ Запрос пришёл: {request.method} {request.path}")
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return type(self).process_view(self, request, view_func, view_args, view_kwargs)
+
+    def handle(self, request):
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+def watch_queries(stack, stats):
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(stats))
+
+
+class PerformanceMiddleware(HybridMiddleware):
+    """Время ответа, число и время SQL-запросов на каждый запрос.
+
+    Метрики уходят в заголовок ``Server-Timing`` и в лог
+    ``config.performance``; запросы сверх бюджета
+    ``PERFORMANCE_QUERY_BUDGET`` (или бюджета view, см. view_query_budget)
+    пишутся предупреждением с самыми повторяющимися запросами.
+    """
 
-        response = self.get_response(request)
+    def handle(self, request):
+        stats = QueryStats()
+        request.query_budget = getattr(settings, "PERFORMANCE_QUERY_BUDGET", None)
+        started = time.perf_counter()
 
-        print(f"← Ответ ушёл со статусом: {response.status_code}")
+        with ExitStack() as stack:
+            watch_queries(stack, stats)
+            response = self.get_response(request)
+
+        return self.report(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        request.query_budget = getattr(settings, "PERFORMANCE_QUERY_BUDGET", None)
+        started = time.perf_counter()
+
+        # Соединения с базой привязаны к потоку: под ASGI запросы запроса
+        # выполняются в его потоке sync_to_async, там и ставятся обёртки.
+        stack = ExitStack()
+        await sync_to_async(watch_queries)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+
+        return self.report(request, response, stats, started)
+
+    def report(self, request, response, stats, started):
+        duration = time.perf_counter() - started
+        budget = request.query_budget
+        over_budget = budget is not None and stats.count > budget
+
+        timings = [
+            f"app;dur={duration * 1000:.1f}",
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+        ]
+        if stats.duplicates:
+            timings.append(f'dup;desc="{stats.duplicates} duplicated queries"')
+        if over_budget:
+            timings.append(f'budget;desc="over budget {budget}"')
+        response["Server-Timing"] = ", ".join(timings)
+
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "queries": stats.count,
+            "sql_ms": round(stats.duration * 1000, 1),
+            "duplicates": stats.duplicates,
+            "query_budget": budget,
+        }
+        message = " ".join(f"{key}={value}" for key, value in fields.items())
+        if over_budget:
+            repeated = "; ".join(
+                f"{count}x {sql[:200]}" for count, sql in stats.most_repeated()
+            )
+            logger.warning(
+                "query budget exceeded %s repeated=[%s]",
+                message,
+                repeated,
+                extra={"performance": fields},
+            )
+        else:
+            logger.info("%s", message, extra={"performance": fields})
 
         return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = view_query_budget(view_func, request.method)
+        if budget is not None:
+            request.query_budget = budget
+
+
+def reads_from_replica(view_func, method):
+    """Можно ли view читать из реплики: GET-действия ViewSet (кроме
+    ``read_from_replica = False``), view-функции с ``read_from_replica = True``,
+    HTML-списки и списки объектов админки."""
+    if method not in ("GET", "HEAD"):
+        return False
+    if getattr(view_func, "read_from_replica", False):
+        return True
+    if getattr(view_func, "model_admin", None) is not None:
+        return view_func.__name__ == "changelist_view"
+    view_class = getattr(view_func, "cls", None) or getattr(
+        view_func, "view_class", None
+    )
+    if view_class is None:
+        return False
+    if getattr(view_func, "actions", None) is not None:
+        return getattr(view_class, "read_from_replica", True)
+    return issubclass(view_class, MultipleObjectMixin)
+
+
+class ReplicaReadMiddleware(HybridMiddleware):
+    """Направляет чтение только читающих view в реплику (config.routers);
+    записи и остальные view работают с основной базой."""
+
+    def handle(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            token = getattr(request, "_replica_token", None)
+            if token is not None:
+                stop_replica_reads(token)
+
+    async def __acall__(self, request):
+        # Под ASGI process_view выполняется в потоке, и флаг реплики
+        # переносится в контекст вызвавшей корутины: отдельная задача со своей
+        # копией контекста не даёт ему пережить запрос.
+        return await asyncio.create_task(self.get_response(request))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if replica_configured() and reads_from_replica(view_func, request.method):
+            request._replica_token = start_replica_reads()
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware для sync- и async-цепочки: сам WhiteNoise умеет
+    только sync, и под ASGI все view за ним выполнялись бы в потоке."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
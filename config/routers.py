@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = "replica"
+# Приложения, чьи модели можно читать из реплики. Сессии и пользователи
+# читаются из основной базы: отставание реплики не должно разлогинивать.
+REPLICA_APPS = {"polls"}
+
+_reading_from_replica = ContextVar("reading_from_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def start_replica_reads():
+    """Включает чтение из реплики в текущем контексте; возвращает токен для
+    ``stop_replica_reads``."""
+    return _reading_from_replica.set(True)
+
+
+def stop_replica_reads(token):
+    _reading_from_replica.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Внутри блока чтение моделей ``REPLICA_APPS`` идёт из реплики."""
+    token = start_replica_reads()
+    try:
+        yield
+    finally:
+        stop_replica_reads(token)
+
+
+class ReplicaRouter:
+    """Чтение в ``replica_reads()`` — из реплики, всё остальное и любые
+    записи — в основную базу (default)."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _reading_from_replica.get()
+            and model._meta.app_label in REPLICA_APPS
+            and replica_configured()
+        ):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему на реплику переносит репликация.
+        return db != REPLICA
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -54,9 +58,10 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.middleware.ReplicaReadMiddleware",
     "simple_history.middleware.HistoryRequestMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
-    "config.middleware.SimpleDebugMiddleware",
+    "polls.history.DeferredHistoryMiddleware",
+    "config.middleware.StaticFilesMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -84,12 +89,37 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Профиль базы задаётся окружением (config.database):
+#   DATABASE_URL          — основная база, по умолчанию sqlite:///db.sqlite3;
+#   DATABASE_REPLICA_URL  — реплика для чтения (config.routers);
+#   DATABASE_CONN_MAX_AGE — постоянные соединения, секунды ("none" — без
+#                           ограничения, 0 — соединение на запрос);
+#   DATABASE_POOL=1       — пул psycopg 3 для PostgreSQL вместо постоянных
+#                           соединений; под ASGI (uvicorn) нужен именно он.
+#   DATABASE_SQLITE_CONCURRENT=1 — SQLite для нескольких воркеров: WAL,
+#                           PRAGMA и BEGIN IMMEDIATE (config.database).
+_conn_max_age = os.environ.get("DATABASE_CONN_MAX_AGE", "60")
+DATABASE_OPTIONS = {
+    "base_dir": BASE_DIR,
+    "conn_max_age": None if _conn_max_age == "none" else int(_conn_max_age),
+    "pool": os.environ.get("DATABASE_POOL", "") == "1",
+    "sqlite_concurrent": os.environ.get("DATABASE_SQLITE_CONCURRENT", "") == "1",
+}
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_config(
+        os.environ.get("DATABASE_URL", "sqlite:///db.sqlite3"), **DATABASE_OPTIONS
+    ),
 }
+if os.environ.get("DATABASE_REPLICA_URL"):
+    DATABASES["replica"] = {
+        **database_config(os.environ["DATABASE_REPLICA_URL"], **DATABASE_OPTIONS),
+        # В тестах реплика — та же тестовая база.
+        "TEST": {"MIRROR": "default"},
+    }
+# GET-действия ViewSet, HTML-списки и списки админки читают модели polls из
+# реплики (config.middleware.ReplicaReadMiddleware); записи, сессии,
+# пользователи и проверки «я уже голосовал» — из основной базы.
+DATABASE_ROUTERS = ["config.routers.ReplicaRouter"]
 
 
 # Password validation
@@ -140,6 +170,56 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 10,
 }
 
+# Пагинация по умолчанию для ViewSet (по basename): "page" — постраничная
+# с count, "cursor" — по ключу без COUNT(*) и OFFSET (polls.pagination).
+# Клиент может выбрать режим сам параметром ?pagination=page|cursor.
+POLLS_PAGINATION_MODES = {
+    "nomination": "page",
+    "candidate": "page",
+    "vote": "page",
+}
+
+# Кэш ответов для тяжёлых действий NominationViewSet и индекс голосов.
+# CACHE_URL=redis://host:6379/0 — общий Redis для всех воркеров и
+# process_vote_queue: сброс по тегам сразу виден всем процессам. Без него —
+# LocMemCache процесса (вытесняет давно не читавшиеся записи при превышении
+# MAX_ENTRIES): сброс виден только своему процессу, и другие воркеры отдают
+# прежние ответы не дольше TIMEOUT секунд (см. README). Индекс голосов
+# пользователей (polls.voted) в кэше процесса видел бы удалённый в другом
+# процессе голос, поэтому без Redis он хранится в таблице основной базы.
+if os.environ.get("CACHE_URL"):
+    _redis = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["CACHE_URL"],
+    }
+    CACHES = {
+        "default": _redis,
+        "responses": {**_redis, "KEY_PREFIX": "polls-responses", "TIMEOUT": 30},
+    }
+    POLLS_VOTED_INDEX_CACHE = "default"
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "responses": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "polls-responses",
+            "TIMEOUT": 30,
+            "OPTIONS": {"MAX_ENTRIES": 2000, "CULL_FREQUENCY": 10},
+        },
+        # Таблица создаётся командой createcachetable.
+        "voted": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "polls_voted_index",
+        },
+    }
+    POLLS_VOTED_INDEX_CACHE = "voted"
+POLLS_RESPONSE_CACHE = "responses"
+# Сколько секунд хранятся закэшированные ответы по всем номинациям: голос
+# сбрасывает только ответы своей номинации.
+POLLS_LIST_CACHE_TIMEOUT = 5
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
@@ -147,4 +227,76 @@ LOGIN_REDIRECT_URL = "/nominations/"
 LOGOUT_REDIRECT_URL = "/nominations/"
 LOGIN_URL = "/login/"
 
+# Запросы, сделавшие больше SQL-запросов, попадают в лог предупреждением
+PERFORMANCE_QUERY_BUDGET = 30
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "config.performance": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Счётчики голосов (polls.CandidateTally / polls.NominationTally) вместо
+# подсчёта по таблице голосов на каждом чтении
+POLLS_USE_VOTE_TALLY = True
+
+# Максимальный размер пачки для /api/votes/bulk/
+POLLS_BULK_VOTE_MAX_ITEMS = 5000
+
+# Максимальный размер пачки для /api/candidates/bulk/
+POLLS_BULK_CANDIDATE_MAX_ITEMS = 5000
+
+# Режим django-simple-history по моделям (polls.history):
+# "full" — запись при каждом сохранении, "deferred" — пачкой после запроса,
+# "off" — без истории. Не указанные модели ведут историю в режиме "full".
+POLLS_HISTORY_MODES = {
+    "polls.Vote": "full",
+}
+
+# Поток результатов /api/nominations/<pk>/live/ (SSE, polls.live): результаты
+# номинации пересчитываются раз в INTERVAL секунд одним запросом на процесс,
+# сколько бы клиентов ни слушало; HEARTBEAT — период пустых сообщений.
+POLLS_LIVE_RESULTS = {
+    "INTERVAL": 1.0,
+    "HEARTBEAT": 15.0,
+}
+
+# Компактный журнал голосов polls.VoteAuditLog: (vote_id, user_id,
+# candidate_id, action, ts). Вместе с "polls.Vote": "off" заменяет историю.
+POLLS_VOTE_AUDIT_LOG = False
+
+# Отложенная запись голосов: запросы кладут голоса в очередь SQLite,
+# а в базу их переносит `python manage.py process_vote_queue`
+POLLS_VOTE_QUEUE = {
+    "ENABLED": False,
+    "PATH": BASE_DIR / "vote_queue.sqlite3",
+    "BATCH_SIZE": 1000,
+    "FLUSH_INTERVAL": 0.5,
+}
+
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Миниатюры фото кандидатов (polls.thumbnails): после загрузки фото варианты
+# SIZES (длинная сторона, px) в форматах FORMATS создаются в WORKERS
+# процессах рядом с оригиналом; WORKERS = 0 — сразу, в потоке запроса.
+POLLS_THUMBNAILS = {
+    "SIZES": (64, 256, 1024),
+    "FORMATS": ("webp", "jpeg"),
+    "QUALITY": 82,
+    "WORKERS": 2,
+}
+
+# Async-версии частых чтений (polls.views.async_urlpatterns) вместо
+# DRF-действий и CandidateDetailView на тех же адресах: под ASGI запрос ждёт
+# базу, не занимая поток. config.asgi включает их по умолчанию, под WSGI
+# async-view выполнялись бы через async_to_sync и только теряли бы время.
+POLLS_ASYNC_READS = os.environ.get("POLLS_ASYNC_READS", "") == "1"
@@ -0,0 +1,16 @@
+"""Профиль для тестов маршрутизации: к основной базе добавлена реплика —
+второй алиас SQLite, в тестах зеркало тестовой базы. Остальные тесты
+рассчитаны на одну базу и запускаются с обычными настройками.
+
+    python manage.py test polls.tests.ReplicaRoutingTests \
+        --settings=config.settings_test
+"""
+
+from .database import database_config
+from .settings import *  # noqa: F403
+from .settings import DATABASE_OPTIONS, DATABASES
+
+DATABASES["replica"] = {
+    **database_config("sqlite:///replica.sqlite3", **DATABASE_OPTIONS),
+    "TEST": {"MIRROR": "default"},
+}
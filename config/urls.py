@@ -5,6 +5,7 @@ from django.contrib.auth import views as auth_views
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from polls.urls import async_urlpatterns
 from polls.views import (
     CandidateViewSet,
     JuryMemberViewSet,
@@ -21,6 +22,7 @@ router.register("jury-members", JuryMemberViewSet, basename="jury-member")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    *(async_urlpatterns if settings.POLLS_ASYNC_READS else []),
     path("api/", include(router.urls)),
     path("", include("polls.urls")),
     path(
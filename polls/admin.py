@@ -1,10 +1,39 @@
 from django.contrib import admin
+from django.contrib.admin.utils import lookup_spawns_duplicates
 from django.utils.html import format_html
+from django.utils.text import smart_split, unescape_string_literal
 from import_export import resources
 from import_export.admin import ExportMixin, ImportExportModelAdmin
 from simple_history.admin import SimpleHistoryAdmin
 
-from .models import Candidate, JuryMember, Vote
+from . import search, tallies, thumbnails
+from .models import Candidate, JuryMember, Vote, VoteAuditLog, VoteBucket
+
+
+class IndexedSearchAdminMixin:
+    """Поиск в админке по индексу polls.search для проиндексированных полей.
+    Поля с префиксами ``^``, ``=``, ``@`` ищутся стандартным способом."""
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = [str(field) for field in self.get_search_fields(request)]
+        if not search_term or any(field[0] in "^=@" for field in search_fields):
+            return super().get_search_results(request, queryset, search_term)
+
+        terms = [
+            unescape_string_literal(bit)
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]
+            else bit
+            for bit in smart_split(search_term)
+        ]
+        queryset = queryset.filter(
+            search.search_q(
+                self.model, search_fields, terms, lambda field: f"{field}__icontains"
+            )
+        )
+        may_have_duplicates = any(
+            lookup_spawns_duplicates(self.opts, field) for field in search_fields
+        )
+        return queryset, may_have_duplicates
 
 
 class VoteInline(admin.TabularInline):
@@ -18,7 +47,9 @@ class VoteInline(admin.TabularInline):
         return False
 
 
-class NominationAdmin(SimpleHistoryAdmin, ImportExportModelAdmin):
+class NominationAdmin(
+    IndexedSearchAdminMixin, SimpleHistoryAdmin, ImportExportModelAdmin
+):
     list_display = ("id", "title", "is_active", "candidates_count", "created_at")
     list_display_links = ("id", "title")
     list_filter = ("is_active",)
@@ -34,7 +65,9 @@ class NominationAdmin(SimpleHistoryAdmin, ImportExportModelAdmin):
 
 
 @admin.register(Candidate)
-class CandidateAdmin(SimpleHistoryAdmin, ImportExportModelAdmin):
+class CandidateAdmin(
+    IndexedSearchAdminMixin, SimpleHistoryAdmin, ImportExportModelAdmin
+):
     list_display = (
         "id",
         "name",
@@ -51,9 +84,12 @@ class CandidateAdmin(SimpleHistoryAdmin, ImportExportModelAdmin):
     fieldsets = (("Основная информация", {"fields": ("name", "nomination", "photo")}),)
     readonly_fields = ("photo_preview",)
 
-    @admin.display(description="Кол-во голосов")
+    def get_queryset(self, request):
+        return tallies.with_vote_count(super().get_queryset(request))
+
+    @admin.display(description="Кол-во голосов", ordering="vote_count")
     def votes_count(self, obj):
-        return obj.votes.count()
+        return obj.vote_count
 
     votes_count.short_description = "Кол-во голосов"
 
@@ -61,7 +97,8 @@ class CandidateAdmin(SimpleHistoryAdmin, ImportExportModelAdmin):
     def photo_preview(self, obj):
         if obj.photo:
             return format_html(
-                '<img src="{}" style="max-height: 60px;"/>', obj.photo.url
+                '<img src="{}" style="max-height: 60px;"/>',
+                thumbnails.thumbnail_url(obj, 64),
             )
         return "—"
 
@@ -138,16 +175,17 @@ class VoteResource(resources.ModelResource):
 
 
 @admin.register(Vote)
-class VoteAdmin(ExportMixin, SimpleHistoryAdmin, admin.ModelAdmin):
+class VoteAdmin(
+    IndexedSearchAdminMixin, ExportMixin, SimpleHistoryAdmin, admin.ModelAdmin
+):
     resource_class = VoteResource
 
     list_display = ("id", "user", "candidate", "created_at", "candidate_and_user")
     list_display_links = ("id",)
-    list_filter = ("candidate__nomination", "created_at")
+    list_filter = ("nomination", "created_at")
     search_fields = ("user__username", "candidate__name")
     raw_id_fields = ("user", "candidate")
     readonly_fields = ("created_at",)
-    date_hierarchy = "created_at"
 
     @admin.display(description="Кандидат / Пользователь")
     def candidate_and_user(self, obj):
@@ -156,8 +194,44 @@ class VoteAdmin(ExportMixin, SimpleHistoryAdmin, admin.ModelAdmin):
     candidate_and_user.short_description = "Кандидат / Пользователь"
 
 
+@admin.register(VoteBucket)
+class VoteBucketAdmin(admin.ModelAdmin):
+    # Иерархия дат строится по часовым корзинам, а не по таблице голосов.
+    list_display = ("hour", "nomination", "candidate", "vote_count")
+    list_filter = ("nomination",)
+    list_select_related = ("nomination", "candidate__nomination")
+    date_hierarchy = "hour"
+    ordering = ("-hour",)
+    show_full_result_count = False
+
+    # Корзины ведутся счётчиками и backfill_vote_buckets.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(VoteAuditLog)
+class VoteAuditLogAdmin(admin.ModelAdmin):
+    list_display = ("id", "vote_id", "user_id", "candidate_id", "action", "ts")
+    list_filter = ("action",)
+    search_fields = ("=vote_id", "=user_id", "=candidate_id")
+    show_full_result_count = False
+
+    # Журнал только дополняется.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(JuryMember)
-class JuryMemberAdmin(admin.ModelAdmin):
+class JuryMemberAdmin(IndexedSearchAdminMixin, admin.ModelAdmin):
     list_display = ("id", "name")
     search_fields = ("name",)
     filter_horizontal = ("nominations",)
@@ -0,0 +1,25 @@
+from django.conf import settings
+
+from .models import VoteAuditLog
+
+
+def audit_enabled():
+    return getattr(settings, "POLLS_VOTE_AUDIT_LOG", False)
+
+
+def log_votes(votes, action):
+    """Дописывает в VoteAuditLog строки ``(vote_id, user_id, candidate_id)``."""
+    if not audit_enabled():
+        return
+    VoteAuditLog.objects.bulk_create(
+        (
+            VoteAuditLog(
+                vote_id=vote.pk,
+                user_id=vote.user_id,
+                candidate_id=vote.candidate_id,
+                action=action,
+            )
+            for vote in votes
+        ),
+        batch_size=500,
+    )
@@ -0,0 +1,144 @@
+from collections import Counter
+from datetime import UTC, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, Trunc
+from django.utils import timezone
+
+from .models import Vote, VoteBucket
+
+# Разрешение графика → период по умолчанию, если начало не задано.
+RESOLUTIONS = {
+    "hour": timedelta(days=2),
+    "day": timedelta(days=30),
+    "week": timedelta(weeks=12),
+}
+
+
+def bucket_start(moment):
+    """Начало часа, к которому относится момент."""
+    return moment.astimezone(UTC).replace(minute=0, second=0, microsecond=0)
+
+
+def vote_keys(votes):
+    """Изменения корзин ``{(кандидат, номинация, час): delta}`` для новых
+    голосов."""
+    return Counter(
+        (vote.candidate_id, vote.nomination_id, bucket_start(vote.created_at))
+        for vote in votes
+    )
+
+
+def apply_bucket_deltas(deltas):
+    """Применяет изменения ``{(candidate_id, nomination_id, hour): delta}``."""
+    missing = []
+    for (candidate_id, nomination_id, hour), delta in deltas.items():
+        if delta and not _add(candidate_id, hour, delta) and delta > 0:
+            missing.append((candidate_id, nomination_id, hour))
+    if not missing:
+        return
+    # Недостающие корзины создаются пустыми одной вставкой; строку, которую
+    # успела вставить параллельная транзакция, пропускаем и просто прибавляем.
+    VoteBucket.objects.bulk_create(
+        [
+            VoteBucket(
+                candidate_id=candidate_id, nomination_id=nomination_id, hour=hour
+            )
+            for candidate_id, nomination_id, hour in missing
+        ],
+        ignore_conflicts=True,
+    )
+    for key in missing:
+        _add(key[0], key[2], deltas[key])
+
+
+def _add(candidate_id, hour, delta):
+    return VoteBucket.objects.filter(candidate_id=candidate_id, hour=hour).update(
+        vote_count=Greatest(F("vote_count") + delta, Value(0))
+    )
+
+
+def rebuild_buckets(nomination_ids=None, since=None):
+    """Пересобирает корзины по таблице голосов (все, указанных номинаций
+    и/или начиная с часа, в который попадает ``since``). Возвращает число
+    записанных корзин."""
+    votes = Vote.objects.all()
+    buckets = VoteBucket.objects.all()
+    if nomination_ids is not None:
+        votes = votes.filter(nomination_id__in=nomination_ids)
+        buckets = buckets.filter(nomination_id__in=nomination_ids)
+    if since is not None:
+        since = bucket_start(since)
+        votes = votes.filter(created_at__gte=since)
+        buckets = buckets.filter(hour__gte=since)
+
+    rows = (
+        votes.values_list(
+            "candidate_id",
+            "nomination_id",
+            Trunc("created_at", "hour", tzinfo=UTC),
+        )
+        .annotate(Count("id"))
+        .order_by()
+    )
+    with transaction.atomic():
+        buckets.delete()
+        created = VoteBucket.objects.bulk_create(
+            (
+                VoteBucket(
+                    candidate_id=candidate_id,
+                    nomination_id=nomination_id,
+                    hour=hour,
+                    vote_count=total,
+                )
+                for candidate_id, nomination_id, hour, total in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def timeline(nomination_id, resolution, since, until):
+    """Голоса номинации по интервалам ``resolution`` в ``[since, until)``.
+
+    Один сгруппированный запрос по корзинам: из него собираются и ряд по
+    интервалам, и итоги кандидатов за период. Границы периода расширяются
+    до целых часов, пустые интервалы не выводятся; дни и недели считаются
+    в текущем часовом поясе.
+    """
+    rows = (
+        VoteBucket.objects.filter(
+            nomination_id=nomination_id,
+            hour__gte=bucket_start(since),
+            hour__lt=until,
+        )
+        .values_list(
+            Trunc("hour", resolution, tzinfo=timezone.get_current_timezone()),
+            "candidate_id",
+            "candidate__name",
+        )
+        .annotate(Sum("vote_count"))
+        .order_by()
+    )
+    series = Counter()
+    totals = Counter()
+    names = {}
+    for start, candidate_id, name, votes in rows:
+        series[start] += votes
+        totals[candidate_id] += votes
+        names[candidate_id] = name
+    return {
+        "nomination": nomination_id,
+        "resolution": resolution,
+        "since": since,
+        "until": until,
+        "total": sum(totals.values()),
+        "series": [
+            {"start": start, "votes": votes} for start, votes in sorted(series.items())
+        ],
+        "candidates": [
+            {"id": pk, "name": names[pk], "votes": votes}
+            for pk, votes in totals.most_common()
+        ],
+    }
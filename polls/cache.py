@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import uuid
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .buckets import bucket_start
+
+ALL_NOMINATIONS_TAG = "nominations"
+
+# Загрузки данных async-view, которые сейчас выполняются: (цикл событий, ключ)
+# → задача.
+_loading = {}
+
+
+def nomination_tag(pk):
+    return f"nomination:{pk}"
+
+
+def get_response_cache():
+    return caches[getattr(settings, "POLLS_RESPONSE_CACHE", "default")]
+
+
+def _response_timeout(pk):
+    # Ответы по всем номинациям голос не сбрасывает (см.
+    # invalidate_nominations), поэтому они живут недолго.
+    if pk is None:
+        return getattr(settings, "POLLS_LIST_CACHE_TIMEOUT", 5)
+    return DEFAULT_TIMEOUT
+
+
+def _tag_versions(cache, tags):
+    keys = {f"tag:{tag}": tag for tag in tags}
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        # Версия тега могла быть вытеснена: новая версия делает недоступными
+        # все ответы, сохранённые со старой.
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in sorted(keys)]
+
+
+async def _atag_versions(cache, tags):
+    keys = {f"tag:{tag}": tag for tag in tags}
+    versions = await cache.aget_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in sorted(keys)]
+
+
+def _response_tags(pk):
+    return [nomination_tag(pk)] if pk is not None else [ALL_NOMINATIONS_TAG]
+
+
+def _response_key(request, versions):
+    # Версия ресурса из conditional_response читается из базы: с ней ответ,
+    # закэшированный до изменения, не отдаётся под новым ETag, даже если сброс
+    # тегов не дошёл до кэша этого процесса.
+    resource = getattr(request, "_resource_version", None)
+    if resource is not None:
+        versions = [*versions, resource[1]]
+    signature = "|".join([request.method, request.get_full_path(), *versions])
+    return "response:" + hashlib.md5(signature.encode()).hexdigest()
+
+
+def invalidate(*tags):
+    """Сбрасывает все закэшированные ответы с указанными тегами."""
+    cache = get_response_cache()
+    cache.set_many({f"tag:{tag}": uuid.uuid4().hex for tag in tags}, timeout=None)
+
+
+def invalidate_on_commit(*tags):
+    # Сброс после коммита, иначе параллельный запрос успеет закэшировать
+    # данные, которые ещё не видны в базе.
+    transaction.on_commit(lambda: invalidate(*tags))
+
+
+def invalidate_nominations(*nomination_ids, lists=True):
+    """После коммита сбрасывает ответы номинаций, без аргументов — все.
+
+    ``lists=False`` — для голосов: сбрасываются только ответы своих
+    номинаций, а ответы по всем номинациям устаревают сами за
+    POLLS_LIST_CACHE_TIMEOUT секунд, иначе каждый голос сбрасывал бы их все.
+    """
+    tags = [nomination_tag(pk) for pk in set(nomination_ids) if pk is not None]
+    if lists or not tags:
+        tags.append(ALL_NOMINATIONS_TAG)
+    invalidate_on_commit(*tags)
+
+
+def cache_response(view_method=None, *, hourly=False):
+    """Кэширует ответ действия ViewSet по тегам номинаций.
+
+    Detail-действия зависят от тега своей номинации, list-действия — от
+    общего тега всех номинаций и хранятся POLLS_LIST_CACHE_TIMEOUT секунд.
+    ``hourly=True`` — для действий, зависящих от
+    текущего времени (окна «за N дней», timeline): их окна выровнены по часу,
+    а ключ включает текущий час, поэтому ответ не переживает смену окна.
+    """
+    if view_method is None:
+        return partial(cache_response, hourly=hourly)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        cache = get_response_cache()
+        versions = _tag_versions(cache, _response_tags(kwargs.get("pk")))
+        if hourly:
+            versions.append(bucket_start(timezone.now()).isoformat())
+        key = _response_key(request, versions)
+
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            if isinstance(response.data, QuerySet):
+                response.data = list(response.data)
+            cache.set(key, response.data, _response_timeout(kwargs.get("pk")))
+        return response
+
+    return wrapper
+
+
+async def _load_and_store(cache, key, load, timeout):
+    data = await load()
+    await cache.aset(key, data, timeout)
+    return data
+
+
+async def cached_data(request, load, pk=None):
+    """Данные ответа async-view из кэша ответов или ``await load()``.
+
+    Ключи и теги те же, что у cache_response: async- и DRF-версии действия
+    делят записи кэша. Одновременные промахи по одному ключу ждут одну
+    загрузку: под ASGI запросы не упираются в воркер, и без этого каждый
+    из них заново считал бы ту же тяжёлую агрегацию.
+    """
+    cache = get_response_cache()
+    key = _response_key(request, await _atag_versions(cache, _response_tags(pk)))
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+
+    loading_key = (asyncio.get_running_loop(), key)
+    task = _loading.get(loading_key)
+    if task is None:
+        task = asyncio.create_task(
+            _load_and_store(cache, key, load, _response_timeout(pk))
+        )
+        _loading[loading_key] = task
+        task.add_done_callback(lambda _: _loading.pop(loading_key, None))
+    # Отмена одного запроса не отменяет загрузку для остальных.
+    return await asyncio.shield(task)
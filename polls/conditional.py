@@ -0,0 +1,102 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .models import Candidate, Nomination
+
+
+def _latest(*moments):
+    return max((moment for moment in moments if moment is not None), default=None)
+
+
+def nominations_version(request, **kwargs):
+    """Версия списков номинаций и кандидатов: последнее изменение номинаций
+    и их показателей (голоса, кандидаты сдвигают ``tally.updated_at``) и
+    число номинаций — удаление не сдвигает максимум."""
+    row = Nomination.objects.aggregate(
+        count=Count("pk"),
+        nominations=Max("updated_at"),
+        tallies=Max("tally__updated_at"),
+    )
+    changed = _latest(row["nominations"], row["tallies"])
+    return changed, f"{row['count']}:{changed}"
+
+
+def nomination_version(request, pk=None, **kwargs):
+    row = (
+        Nomination.objects.filter(pk=pk)
+        .values_list("updated_at", "tally__updated_at")
+        .first()
+    )
+    if row is None:
+        return None
+    return _latest(*row), str(row)
+
+
+def candidate_version(request, pk=None, **kwargs):
+    row = (
+        Candidate.objects.filter(pk=pk)
+        .values_list("updated_at", "tally__updated_at", "nomination__updated_at")
+        .first()
+    )
+    if row is None:
+        return None
+    return _latest(*row), str(row)
+
+
+def _condition(version):
+    def resolve(request, *args, **kwargs):
+        # condition() спрашивает ETag и Last-Modified по отдельности, а
+        # версия читается одним запросом.
+        if not hasattr(request, "_resource_version"):
+            request._resource_version = version(request, **kwargs)
+        return request._resource_version
+
+    def etag(request, *args, **kwargs):
+        resolved = resolve(request, **kwargs)
+        if resolved is None:
+            return None
+        # Ответ зависит от пользователя (CandidateViewSet) и формата.
+        renderer = getattr(request, "accepted_renderer", None)
+        signature = "|".join(
+            [resolved[1], str(request.user.pk), getattr(renderer, "format", "")]
+        )
+        return 'W/"{}"'.format(hashlib.md5(signature.encode()).hexdigest())
+
+    def last_modified(request, *args, **kwargs):
+        resolved = resolve(request, **kwargs)
+        return resolved and resolved[0]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def conditional_response(version):
+    """Условный GET для действия ViewSet.
+
+    ``version(request, **kwargs)`` возвращает ``(время изменения, ключ)`` или
+    ``None``, если ресурса нет. По ним ставятся ETag и Last-Modified, а на
+    совпавший If-None-Match / If-Modified-Since сразу отдаётся 304 — без
+    основного запроса и сериализатора.
+    """
+    return method_decorator(_condition(version))
+
+
+def async_conditional_response(version):
+    """conditional_response для async-view: версия читается в потоке до
+    проверок condition(), которые сами вызывают функции синхронно."""
+
+    def decorator(view):
+        conditional_view = _condition(version)(view)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request._resource_version = await sync_to_async(version)(request, **kwargs)
+            return await conditional_view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
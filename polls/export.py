@@ -0,0 +1,118 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Vote
+
+# Колонки те же, что у VoteResource в админке.
+COLUMNS = (
+    ("id", "Уникальный номер"),
+    ("user", "Пользователь"),
+    ("candidate", "Кандидат"),
+    ("created_at", "Дата голосования"),
+    ("candidate_user", "Кандидат / Пользователь"),
+)
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+CHUNK_SIZE = 2000
+
+
+def parse_bound(value, end=False):
+    """Дата или дата со временем из ISO-строки; для конца диапазона голая
+    дата включает весь день."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Неверная дата: {value}")
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(nomination_id=None, since=None, until=None, active_only=False):
+    votes = Vote.objects.order_by("pk")
+    if nomination_id is not None:
+        votes = votes.filter(nomination_id=nomination_id)
+    if active_only:
+        votes = votes.filter(nomination__is_active=True)
+    if since is not None:
+        votes = votes.filter(created_at__gte=since)
+    if until is not None:
+        votes = votes.filter(created_at__lt=until)
+    return votes.values_list(
+        "pk", "user__username", "candidate__name", "nomination__title", "created_at"
+    )
+
+
+def format_row(values):
+    pk, username, name, title, created_at = values
+    return (
+        pk,
+        username.upper() if username else "-",
+        f"{name} ({title})",
+        # strftime на каждую строку заметно медленнее форматирования полей.
+        f"{created_at.day:02}.{created_at.month:02}.{created_at.year} "
+        f"{created_at.hour:02}:{created_at.minute:02}",
+        f"{name} — {username}",
+    )
+
+
+def export_rows(queryset):
+    """Строки экспорта: голоса читаются порциями через ``iterator()``."""
+    for values in queryset.iterator(CHUNK_SIZE):
+        yield format_row(values)
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def row_encoder(export_format):
+    """Заголовок выгрузки (или None) и функция, переводящая строку в текст."""
+    if export_format == "ndjson":
+        keys = [key for key, _ in COLUMNS]
+        return (
+            None,
+            lambda row: json.dumps(dict(zip(keys, row)), ensure_ascii=False) + "\n",
+        )
+    writer = csv.writer(Echo())
+    return writer.writerow([title for _, title in COLUMNS]), writer.writerow
+
+
+def stream_votes(export_format, queryset):
+    header, encode = row_encoder(export_format)
+    if header is not None:
+        yield header
+    for row in export_rows(queryset):
+        yield encode(row)
+
+
+async def astream_votes(export_format, queryset):
+    """Асинхронный вариант ``stream_votes`` для ASGI: Django отдаёт его
+    клиенту по частям, а синхронный итератор под ASGI сначала собирает в
+    список целиком. Порция строк читается и кодируется в потоке."""
+    header, encode = row_encoder(export_format)
+    if header is not None:
+        yield header
+    rows = export_rows(queryset)
+
+    def next_chunk():
+        return "".join(encode(row) for row in islice(rows, CHUNK_SIZE))
+
+    while chunk := await sync_to_async(next_chunk)():
+        yield chunk
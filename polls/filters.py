@@ -1,7 +1,33 @@
 import django_filters
-from django.db.models import Count
+from django.db.models import Exists, OuterRef, Q
+from rest_framework.filters import SearchFilter
 
-from .models import Candidate
+from . import search, tallies, voted
+from .models import Candidate, JuryMember, Vote
+
+
+class IndexedSearchFilter(SearchFilter):
+    """SearchFilter, который ищет по проиндексированным полям через
+    polls.search, а по остальным — как обычно, через LIKE."""
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        base = queryset
+        queryset = queryset.filter(
+            search.search_q(
+                queryset.model,
+                [str(field) for field in search_fields],
+                search_terms,
+                lambda field: self.construct_search(field, queryset),
+            )
+        )
+        if self.must_call_distinct(queryset, search_fields):
+            queryset = base.filter(Exists(queryset.filter(pk=OuterRef("pk"))))
+        return queryset
 
 
 class CandidateFilter(django_filters.FilterSet):
@@ -25,29 +51,37 @@ class CandidateFilter(django_filters.FilterSet):
         model = Candidate
         fields = ["nomination", "has_photo", "has_votes", "min_votes", "voted_by_me"]
 
+    # Фильтры собираются в один запрос из коррелированных EXISTS и одной
+    # аннотации числа голосов: без JOIN голосов и жюри строки кандидатов не
+    # размножаются, и DISTINCT не нужен.
+
     def filter_has_jury(self, queryset, name, value):
-        if value:
-            return queryset.filter(nomination__jury_members__isnull=False).distinct()
-        return queryset.filter(nomination__jury_members__isnull=True).distinct()
+        jury = JuryMember.nominations.through.objects.filter(
+            nomination_id=OuterRef("nomination_id")
+        )
+        return queryset.filter(Exists(jury) if value else ~Exists(jury))
 
     def filter_has_photo(self, queryset, name, value):
-        if value:
-            return queryset.exclude(photo__isnull=True).exclude(photo="")
-        return queryset.filter(photo__isnull=True) | queryset.filter(photo="")
+        no_photo = Q(photo__isnull=True) | Q(photo="")
+        return queryset.exclude(no_photo) if value else queryset.filter(no_photo)
 
     def filter_has_votes(self, queryset, name, value):
-        annotated = queryset.annotate(vc=Count("votes"))
-        if value:
-            return annotated.filter(vc__gt=0)
-        return annotated.filter(vc=0)
+        votes = Vote.objects.filter(candidate=OuterRef("pk"))
+        return queryset.filter(Exists(votes) if value else ~Exists(votes))
 
     def filter_min_votes(self, queryset, name, value):
-        return queryset.annotate(vc=Count("votes")).filter(vc__gte=value)
+        return self.with_vote_count(queryset).filter(vote_count__gte=value)
+
+    def with_vote_count(self, queryset):
+        if "vote_count" not in queryset.query.annotations:
+            queryset = tallies.with_vote_count(queryset)
+        return queryset
 
     def filter_voted_by_me(self, queryset, name, value):
         user = self.request.user if hasattr(self.request, "user") else None
         if not user or not user.is_authenticated:
             return queryset.none() if value else queryset
+        candidate_ids = voted.voted_candidate_ids(user)
         if value:
-            return queryset.filter(votes__user=user).distinct()
-        return queryset.exclude(votes__user=user).distinct()
+            return queryset.filter(pk__in=candidate_ids)
+        return queryset.exclude(pk__in=candidate_ids)
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+from simple_history.utils import bulk_create_with_history
+
+FULL = "full"
+DEFERRED = "deferred"
+OFF = "off"
+
+_state = Local()
+
+
+def history_mode(model):
+    """Режим истории модели из ``POLLS_HISTORY_MODES`` (по ``app.Model``)."""
+    modes = getattr(settings, "POLLS_HISTORY_MODES", {})
+    return modes.get(model._meta.label, FULL)
+
+
+class HistoryBuffer:
+    def __init__(self):
+        self.records = defaultdict(list)
+        self.closed = False
+
+    def add(self, record):
+        if self.closed:
+            record.save()
+        else:
+            self.records[type(record)].append(record)
+
+    def flush(self):
+        self.closed = True
+        for model, records in self.records.items():
+            model.objects.bulk_create(records, batch_size=500)
+        self.records.clear()
+
+
+@contextmanager
+def deferred_history():
+    """Копит исторические записи моделей в режиме ``deferred`` и пишет их
+    одним bulk_create на модель при выходе из блока."""
+    buffer = getattr(_state, "buffer", None)
+    if buffer is not None:
+        yield buffer
+        return
+    _state.buffer = buffer = HistoryBuffer()
+    try:
+        yield buffer
+    finally:
+        del _state.buffer
+        buffer.flush()
+
+
+@asynccontextmanager
+async def adeferred_history():
+    """deferred_history() для async-кода: накопленные записи пишутся в потоке
+    sync_to_async, пустой буфер закрывается без перехода в поток."""
+    buffer = getattr(_state, "buffer", None)
+    if buffer is not None:
+        yield buffer
+        return
+    _state.buffer = buffer = HistoryBuffer()
+    try:
+        yield buffer
+    finally:
+        del _state.buffer
+        if buffer.records:
+            await sync_to_async(buffer.flush)()
+        else:
+            buffer.flush()
+
+
+class ConfigurableHistoricalRecords(HistoricalRecords):
+    """HistoricalRecords с режимом из ``POLLS_HISTORY_MODES``.
+
+    ``full`` — запись сразу при сохранении, как в simple_history;
+    ``deferred`` — внутри ``deferred_history()`` (см. DeferredHistoryMiddleware)
+    записи копятся и вставляются пачкой после запроса, вне блока пишутся
+    сразу; ``off`` — история не ведётся.
+    """
+
+    def post_save(self, instance, created, using=None, **kwargs):
+        if history_mode(type(instance)) != OFF:
+            super().post_save(instance, created, using=using, **kwargs)
+
+    def post_delete(self, instance, using=None, **kwargs):
+        if history_mode(type(instance)) != OFF:
+            super().post_delete(instance, using=using, **kwargs)
+
+    def m2m_changed(self, instance, action, attr, pk_set, reverse, **kwargs):
+        if history_mode(type(instance)) != OFF:
+            super().m2m_changed(instance, action, attr, pk_set, reverse, **kwargs)
+
+    def create_historical_record(self, instance, history_type, using=None):
+        buffer = getattr(_state, "buffer", None)
+        if (
+            buffer is None
+            or self.m2m_fields
+            or history_mode(type(instance)) != DEFERRED
+        ):
+            return super().create_historical_record(instance, history_type, using)
+
+        # Как и bulk_create_with_history, отложенная запись не отправляет
+        # сигналы pre/post_create_historical_record.
+        manager = getattr(instance, self.manager_name)
+        attrs = {
+            field.attname: getattr(instance, field.attname)
+            for field in self.fields_included(instance)
+        }
+        if getattr(manager.model, "history_relation", None) is not None:
+            attrs["history_relation"] = instance
+        record = manager.model(
+            history_date=getattr(instance, "_history_date", timezone.now()),
+            history_type=history_type,
+            history_user=self.get_history_user(instance),
+            history_change_reason=self.get_change_reason_for_object(
+                instance, history_type, using
+            ),
+            **attrs,
+        )
+        # В буфер попадают только изменения из зафиксированных транзакций.
+        transaction.on_commit(lambda: buffer.add(record))
+
+
+def bulk_create_tracked(objs, model, default_user=None, batch_size=None):
+    """bulk_create с историей, если она включена для модели."""
+    if history_mode(model) == OFF:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+    return bulk_create_with_history(
+        objs, model, batch_size=batch_size, default_user=default_user
+    )
+
+
+class DeferredHistoryMiddleware:
+    """Откладывает запись истории моделей в режиме ``deferred`` до конца
+    запроса. Ставится после HistoryRequestMiddleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with deferred_history():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with adeferred_history():
+            return await self.get_response(request)
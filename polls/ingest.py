@@ -0,0 +1,195 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import audit, buckets, search, tallies, voted
+from .cache import invalidate_nominations
+from .history import bulk_create_tracked
+from .models import Candidate, Nomination, Vote, VoteAuditLog
+from .slugs import allocate_slugs
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+INVALID_CANDIDATE = "invalid_candidate"
+INVALID_USER = "invalid_user"
+
+# Размер IN-списков и пачек INSERT: укладывается в лимит параметров SQLite.
+CHUNK_SIZE = 500
+
+User = get_user_model()
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _candidate_nominations(candidate_ids):
+    nominations = {}
+    for chunk in _chunks(candidate_ids):
+        nominations.update(
+            Candidate.objects.filter(pk__in=chunk).values_list("id", "nomination_id")
+        )
+    return nominations
+
+
+def _existing_users(user_ids):
+    existing = set()
+    for chunk in _chunks(user_ids):
+        existing.update(User.objects.filter(pk__in=chunk).values_list("pk", flat=True))
+    return existing
+
+
+def _existing_votes(pairs):
+    """Возвращает уже записанные пары ``(user_id, nomination_id)``."""
+    nomination_ids = {nomination_id for _, nomination_id in pairs}
+    existing = set()
+    for chunk in _chunks({user_id for user_id, _ in pairs}):
+        existing.update(
+            Vote.objects.filter(
+                user_id__in=chunk, nomination_id__in=nomination_ids
+            ).values_list("user_id", "nomination_id")
+        )
+    return existing & set(pairs)
+
+
+def _insert(votes, created_by):
+    with transaction.atomic():
+        created = bulk_create_tracked(votes, Vote, default_user=created_by)
+        audit.log_votes(created, VoteAuditLog.CREATED)
+        added = Counter(vote.nomination_id for vote in created)
+        tallies.apply_vote_deltas(
+            Counter(vote.candidate_id for vote in created),
+            {pk: {"total_votes": count} for pk, count in added.items()},
+        )
+        buckets.apply_bucket_deltas(buckets.vote_keys(created))
+        voted.record_votes(created)
+        invalidate_nominations(*{vote.nomination_id for vote in created}, lists=False)
+    return created
+
+
+def ingest_votes(items, created_by=None, batch_size=CHUNK_SIZE):
+    """Записывает пачку голосов ``{"user_id", "candidate_id"}`` и
+    необязательного ``"created_at"`` (по умолчанию — время записи).
+
+    Проверки выполняются несколькими запросами на всю пачку, вставка идёт
+    через bulk_create порциями по ``batch_size``, каждая в своей транзакции.
+    Возвращает список результатов в порядке входных элементов.
+    """
+    now = timezone.now()
+    results = [{"index": index, "status": ACCEPTED} for index in range(len(items))]
+    nominations = _candidate_nominations({item["candidate_id"] for item in items})
+    users = _existing_users({item["user_id"] for item in items})
+
+    pending = []
+    for index, item in enumerate(items):
+        if item["candidate_id"] not in nominations:
+            results[index]["status"] = INVALID_CANDIDATE
+        elif item["user_id"] not in users:
+            results[index]["status"] = INVALID_USER
+        else:
+            pending.append(index)
+
+    def pair(index):
+        item = items[index]
+        return item["user_id"], nominations[item["candidate_id"]]
+
+    existing = _existing_votes({pair(index) for index in pending})
+    accepted = []
+    for index in pending:
+        key = pair(index)
+        if key in existing:
+            results[index]["status"] = DUPLICATE
+        else:
+            existing.add(key)
+            accepted.append(index)
+
+    for chunk in _chunks(accepted, batch_size):
+        created = []
+        while chunk:
+            votes = [
+                Vote(
+                    user_id=items[index]["user_id"],
+                    candidate_id=items[index]["candidate_id"],
+                    nomination_id=nominations[items[index]["candidate_id"]],
+                    created_at=items[index].get("created_at") or now,
+                    created_by=created_by,
+                )
+                for index in chunk
+            ]
+            try:
+                created = _insert(votes, created_by)
+                break
+            except IntegrityError:
+                # Параллельная запись успела раньше: перепроверяем порцию и
+                # вставляем то, что осталось, пока гонки не прекратятся.
+                raced = _existing_votes({pair(index) for index in chunk})
+                if not raced:
+                    raise
+                for index in chunk:
+                    if pair(index) in raced:
+                        results[index]["status"] = DUPLICATE
+                chunk = [index for index in chunk if pair(index) not in raced]
+        for index, vote in zip(chunk, created):
+            results[index]["vote_id"] = vote.pk
+
+    return results
+
+
+def _insert_candidates(candidates, created_by):
+    # Slug подбираются только тем, кому он не задан явно.
+    pending = [candidate for candidate in candidates if not candidate.slug]
+    slugs = allocate_slugs(Candidate, [candidate.slug_base() for candidate in pending])
+    for candidate, slug in zip(pending, slugs):
+        candidate.slug = slug
+    try:
+        with transaction.atomic():
+            created = bulk_create_tracked(
+                candidates, Candidate, default_user=created_by
+            )
+            added = Counter(candidate.nomination_id for candidate in created)
+            for nomination_id, count in added.items():
+                tallies.apply_nomination_changes(
+                    nomination_id, {"candidate_count": count}
+                )
+            search.index_objects(created)
+    except IntegrityError:
+        for candidate in pending:
+            candidate.slug = ""
+        raise
+    invalidate_nominations(*{candidate.nomination_id for candidate in created})
+    return created
+
+
+def create_candidates(candidates, created_by=None, batch_size=CHUNK_SIZE):
+    """Создаёт кандидатов пачкой.
+
+    Номинации читаются одним запросом, slug для каждой порции подбираются
+    в памяти по одному запросу (см. ``allocate_slugs``), вставка идёт через
+    bulk_create. Неизвестная номинация — ``Nomination.DoesNotExist``.
+    """
+    candidates = list(candidates)
+    nominations = Nomination.objects.in_bulk(
+        {candidate.nomination_id for candidate in candidates}
+    )
+    for candidate in candidates:
+        if candidate.nomination_id not in nominations:
+            raise Nomination.DoesNotExist(
+                f"Номинация {candidate.nomination_id} не найдена"
+            )
+        candidate.nomination = nominations[candidate.nomination_id]
+        if created_by is not None:
+            candidate.created_by = created_by
+            candidate.last_modified_by = created_by
+
+    created = []
+    for chunk in _chunks(candidates, batch_size):
+        try:
+            created += _insert_candidates(chunk, created_by)
+        except IntegrityError:
+            # Slug успели занять параллельно: подбираем заново один раз.
+            created += _insert_candidates(chunk, created_by)
+    return created
@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import tallies
+from .models import Candidate
+
+DEFAULTS = {
+    # Как часто пересчитывать результаты номинации, у которой есть слушатели.
+    "INTERVAL": 1.0,
+    # Пустой комментарий SSE, чтобы прокси не закрывали молчащее соединение.
+    "HEARTBEAT": 15.0,
+}
+
+_channels = {}
+
+
+def live_settings():
+    return {**DEFAULTS, **getattr(settings, "POLLS_LIVE_RESULTS", {})}
+
+
+def load_counts(nomination_id):
+    candidates = tallies.with_vote_count(
+        Candidate.objects.filter(nomination_id=nomination_id).order_by()
+    )
+    return {
+        pk: (name, vote_count)
+        for pk, name, vote_count in candidates.values_list("pk", "name", "vote_count")
+    }
+
+
+def sse_message(event, version, data):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"id: {version}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class NominationChannel:
+    """Результаты одной номинации для всех её слушателей в процессе.
+
+    Пока есть хотя бы один слушатель, фоновая задача раз в ``INTERVAL``
+    читает результаты одним запросом и, если они изменились, готовит одно
+    сообщение ``delta`` и одно ``snapshot``. Эти строки получают все
+    слушатели: число запросов не зависит от числа клиентов. Слушатель,
+    пропустивший несколько версий, получает снимок вместо дельты.
+    """
+
+    def __init__(self, nomination_id, interval):
+        self.nomination_id = nomination_id
+        self.interval = interval
+        self.counts = None
+        self.version = 0
+        self.delta_message = None
+        self.snapshot_message = None
+        self.changed = asyncio.Condition()
+        self.listeners = 0
+        self.task = None
+        self.loop = asyncio.get_running_loop()
+
+    def publish(self, counts):
+        if counts == self.counts:
+            return False
+        previous = self.counts or {}
+        self.counts = counts
+        self.version += 1
+        total = sum(count for _, count in counts.values())
+        changed = [
+            {"id": pk, "name": name, "vote_count": count}
+            for pk, (name, count) in counts.items()
+            if previous.get(pk) != (name, count)
+        ]
+        self.delta_message = sse_message(
+            "delta",
+            self.version,
+            {
+                "nomination": self.nomination_id,
+                "total_votes": total,
+                "candidates": changed,
+                "removed": [pk for pk in previous if pk not in counts],
+            },
+        )
+        self.snapshot_message = sse_message(
+            "snapshot",
+            self.version,
+            {
+                "nomination": self.nomination_id,
+                "total_votes": total,
+                "candidates": [
+                    {"id": pk, "name": name, "vote_count": count}
+                    for pk, (name, count) in counts.items()
+                ],
+            },
+        )
+        return True
+
+    async def run(self):
+        try:
+            while self.listeners:
+                counts = await sync_to_async(load_counts)(self.nomination_id)
+                if self.publish(counts):
+                    async with self.changed:
+                        self.changed.notify_all()
+                await asyncio.sleep(self.interval)
+        finally:
+            if _channels.get(self.nomination_id) is self:
+                del _channels[self.nomination_id]
+
+    async def messages(self, heartbeat):
+        """Строки SSE для одного слушателя: снимок, затем дельты."""
+        self.listeners += 1
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        version = 0
+        try:
+            while True:
+                async with self.changed:
+                    try:
+                        await asyncio.wait_for(
+                            self.changed.wait_for(lambda: self.version > version),
+                            heartbeat,
+                        )
+                    except TimeoutError:
+                        timed_out = True
+                    else:
+                        timed_out = False
+                if timed_out:
+                    # Задача обновления упала: закрываем поток, EventSource
+                    # переподключится к новому каналу.
+                    if self.task.done():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                # Версию запоминаем до yield: пока клиент читает сообщение,
+                # канал может опубликовать следующую.
+                if version and self.version == version + 1:
+                    message = self.delta_message
+                else:
+                    message = self.snapshot_message
+                version = self.version
+                yield message
+        finally:
+            self.listeners -= 1
+
+
+def nomination_channel(nomination_id):
+    channel = _channels.get(nomination_id)
+    # Канал привязан к своему циклу событий (для тестов и перезапусков).
+    if channel is None or channel.loop is not asyncio.get_running_loop():
+        channel = NominationChannel(nomination_id, live_settings()["INTERVAL"])
+        _channels[nomination_id] = channel
+    return channel
+
+
+def live_results(nomination_id):
+    """Асинхронный поток SSE с результатами номинации."""
+    return nomination_channel(nomination_id).messages(live_settings()["HEARTBEAT"])
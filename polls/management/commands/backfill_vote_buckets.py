@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.buckets import rebuild_buckets
+from polls.cache import invalidate_nominations
+from polls.export import parse_bound
+
+
+class Command(BaseCommand):
+    help = "Заполнить часовые корзины голосов (VoteBucket) по таблице голосов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--nomination",
+            type=int,
+            action="append",
+            dest="nominations",
+            help="Пересобрать только эту номинацию (можно повторять)",
+        )
+        parser.add_argument(
+            "--since",
+            help="Пересобрать корзины начиная с этого момента (ISO-дата или "
+            "дата и время)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = parse_bound(options["since"])
+            except ValueError as error:
+                raise CommandError(str(error))
+
+        written = rebuild_buckets(options["nominations"], since)
+        invalidate_nominations(*(options["nominations"] or ()))
+        self.stdout.write(self.style.SUCCESS(f"Записано корзин: {written}"))
@@ -0,0 +1,456 @@
+import json
+import logging
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+
+from config.middleware import view_query_budget
+from polls.cache import get_response_cache
+from polls.models import Candidate, JuryMember, Nomination, Vote
+from polls.views import JuryMemberViewSet
+
+User = get_user_model()
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def succeeded(name, status):
+    """Ответ без ошибки: 2xx, для HTML-форм — и перенаправление."""
+    if name.startswith("html."):
+        return 200 <= status < 400
+    return 200 <= status < 300
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Замерить задержку и число SQL-запросов для всех действий API "
+        "и HTML-страниц на текущей базе"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--user", help="Имя пользователя (по умолчанию — любой голосовавший)"
+        )
+        parser.add_argument(
+            "--only", help="Замерять только эндпоинты, имя которых содержит строку"
+        )
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Не очищать кэш ответов перед каждым запросом",
+        )
+        parser.add_argument(
+            "--check-budgets",
+            action="store_true",
+            help="Завершиться с ошибкой, если эндпоинт превысил бюджет запросов",
+        )
+        parser.add_argument("--output", help="Сохранить результаты в JSON")
+        parser.add_argument("--compare", help="Сравнить с сохранённым JSON")
+
+    def handle(self, *args, **options):
+        # Строки PerformanceMiddleware на каждый запрос только мешают отчёту.
+        logging.getLogger("config.performance").setLevel(logging.ERROR)
+        user = self.get_user(options["user"])
+        client = Client(HTTP_HOST="localhost", raise_request_exception=False)
+        client.force_login(user)
+
+        results = {}
+        self.not_measured = []
+        for name, method, path, data in self.endpoints(user):
+            if options["only"] and options["only"] not in name:
+                continue
+            results[name] = self.measure(client, name, method, path, data, options)
+            self.print_row(name, results[name])
+
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "iterations": options["iterations"],
+                "user": user.username,
+                "vote_tally": getattr(settings, "POLLS_USE_VOTE_TALLY", False),
+                "warm_cache": options["warm_cache"],
+                "dataset": {
+                    "nominations": Nomination.objects.count(),
+                    "candidates": Candidate.objects.count(),
+                    "users": User.objects.count(),
+                    "votes": Vote.objects.count(),
+                    "jury_members": JuryMember.objects.count(),
+                },
+            },
+            "results": results,
+            "not_measured": self.not_measured,
+        }
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты сохранены в {options['output']}")
+
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+        over_budget = [
+            f"{name}: {result['queries']} > {result['query_budget']}"
+            for name, result in results.items()
+            if result["query_budget"] is not None
+            and result["queries"] > result["query_budget"]
+        ]
+        if over_budget and options["check_budgets"]:
+            raise CommandError(
+                "Превышен бюджет SQL-запросов:\n" + "\n".join(over_budget)
+            )
+        # Замер ответа с ошибкой — это замер не того пути, что в названии.
+        failed = [
+            f"{name}: {result['method']} {result['path']} → "
+            + ",".join(map(str, result["status"]))
+            for name, result in results.items()
+            if not result["ok"]
+        ]
+        if failed:
+            raise CommandError("Эндпоинты ответили ошибкой:\n" + "\n".join(failed))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь {username} не найден")
+        if not Vote.objects.exists():
+            raise CommandError("В базе нет голосов: сначала запустите seed_data")
+        # Голосовавший пользователь, у которого осталась номинация без его
+        # голоса: иначе votes.create, votes.bulk и html.vote замеряли бы отказ
+        # в повторном голосе. Голос один на номинацию, поэтому голосов меньше,
+        # чем номинаций с кандидатами, — значит, свободная номинация есть.
+        nominations = Nomination.objects.filter(candidates__isnull=False).distinct()
+        user = (
+            User.objects.annotate(voted=Count("vote"))
+            .filter(voted__gt=0, voted__lt=nominations.count())
+            .order_by("pk")
+            .first()
+        )
+        if user is None:
+            raise CommandError(
+                "Все голосовавшие пользователи уже проголосовали во всех "
+                "номинациях: добавьте номинацию с кандидатами или пользователей "
+                "(seed_data)"
+            )
+        return user
+
+    def endpoints(self, user):
+        vote = Vote.objects.filter(user=user).select_related("candidate").first()
+        if vote is None:
+            raise CommandError(f"{user.username} ещё не голосовал")
+        candidate = vote.candidate
+        nomination_id = candidate.nomination_id
+        # Кандидат из номинации, где пользователь ещё не голосовал.
+        free = (
+            Candidate.objects.exclude(nomination__votes__user=user)
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if free is None:
+            raise CommandError(
+                f"{user.username} проголосовал во всех номинациях: "
+                "votes.create, votes.bulk и html.vote замеряли бы отказ"
+            )
+        # Член жюри, которого отдаёт JuryMemberViewSet (его queryset отбирает
+        # не всех): иначе retrieve и destroy замеряли бы ответ 404.
+        jury_ids = JuryMemberViewSet().get_queryset().values_list("pk", flat=True)
+        jury_id = jury_ids.first()
+        nomination = {"title": "Бенчмарк", "description": "", "is_active": True}
+
+        endpoints = [
+            ("nominations.list", "get", "/api/nominations/", None),
+            (
+                "nominations.list_cursor",
+                "get",
+                "/api/nominations/?pagination=cursor",
+                None,
+            ),
+            ("nominations.retrieve", "get", f"/api/nominations/{nomination_id}/", None),
+            ("nominations.create", "post", "/api/nominations/", nomination),
+            (
+                "nominations.update",
+                "patch",
+                f"/api/nominations/{nomination_id}/",
+                {"title": "Бенчмарк"},
+            ),
+            (
+                "nominations.destroy",
+                "delete",
+                f"/api/nominations/{nomination_id}/",
+                None,
+            ),
+            ("nominations.active", "get", "/api/nominations/active/", None),
+            (
+                "nominations.stats",
+                "post",
+                f"/api/nominations/{nomination_id}/stats/",
+                None,
+            ),
+            (
+                "nominations.timeline",
+                "get",
+                f"/api/nominations/{nomination_id}/timeline/?resolution=hour",
+                None,
+            ),
+            (
+                "nominations.stats_summary",
+                "get",
+                "/api/nominations/stats_summary/",
+                None,
+            ),
+            (
+                "nominations.recently_active_with_votes",
+                "get",
+                "/api/nominations/recently_active_with_votes/",
+                None,
+            ),
+            (
+                "nominations.high_activity_or_old_active",
+                "get",
+                "/api/nominations/high_activity_or_old_active/",
+                None,
+            ),
+            (
+                "nominations.controversial_or_trending",
+                "get",
+                "/api/nominations/controversial_or_trending/",
+                None,
+            ),
+            (
+                "nominations.jury_active_or_no_jury",
+                "get",
+                "/api/nominations/jury_active_or_no_jury/",
+                None,
+            ),
+            ("candidates.list", "get", "/api/candidates/", None),
+            (
+                "candidates.list_cursor",
+                "get",
+                "/api/candidates/?pagination=cursor",
+                None,
+            ),
+            ("candidates.retrieve", "get", f"/api/candidates/{candidate.pk}/", None),
+            (
+                "candidates.update",
+                "patch",
+                f"/api/candidates/{candidate.pk}/",
+                {"name": "Бенчмарк"},
+            ),
+            ("candidates.destroy", "delete", f"/api/candidates/{candidate.pk}/", None),
+            (
+                "candidates.bulk",
+                "post",
+                "/api/candidates/bulk/",
+                {
+                    "candidates": [{"nomination": nomination_id, "name": "Бенчмарк"}]
+                    * 100
+                },
+            ),
+            (
+                "candidates.complex_filter",
+                "get",
+                "/api/candidates/complex_filter/",
+                None,
+            ),
+            ("candidates.popular", "get", "/api/candidates/popular/", None),
+            (
+                "candidates.special_candidates",
+                "get",
+                "/api/candidates/special_candidates/",
+                None,
+            ),
+            ("candidates.controversial", "get", "/api/candidates/controversial/", None),
+            (
+                "candidates.my_voted_and_popular",
+                "get",
+                "/api/candidates/my_voted_and_popular/",
+                None,
+            ),
+            (
+                "candidates.filtered",
+                "get",
+                "/api/candidates/?has_votes=true&min_votes=1&has_jury=true",
+                None,
+            ),
+            ("votes.list", "get", "/api/votes/", None),
+            ("votes.list_cursor", "get", "/api/votes/?pagination=cursor", None),
+            ("votes.retrieve", "get", f"/api/votes/{vote.pk}/", None),
+            ("votes.create", "post", "/api/votes/", {"candidate": free}),
+            ("votes.destroy", "delete", f"/api/votes/{vote.pk}/", None),
+            (
+                "votes.bulk",
+                "post",
+                "/api/votes/bulk/",
+                {"votes": [{"candidate": free}]},
+            ),
+            ("jury.list", "get", "/api/jury-members/", None),
+            ("jury.retrieve", "get", f"/api/jury-members/{jury_id}/", None),
+            (
+                "jury.create",
+                "post",
+                "/api/jury-members/",
+                {"name": "Бенчмарк", "nominations": [nomination_id]},
+            ),
+            ("jury.destroy", "delete", f"/api/jury-members/{jury_id}/", None),
+            (
+                "jury.with_active_nominations",
+                "get",
+                "/api/jury-members/with_active_nominations/",
+                None,
+            ),
+            ("html.nomination_list", "get", "/nominations/", None),
+            ("html.nomination_add", "get", "/nominations/add/", None),
+            (
+                "html.nomination_edit",
+                "get",
+                f"/nominations/{nomination_id}/edit/",
+                None,
+            ),
+            (
+                "html.candidates_by_nomination",
+                "get",
+                f"/nominations/{nomination_id}/candidates/",
+                None,
+            ),
+            ("html.candidate_detail", "get", f"/candidates/{candidate.pk}/", None),
+            (
+                "html.candidate_detail_slug",
+                "get",
+                f"/candidates/{candidate.slug}/",
+                None,
+            ),
+            ("html.vote", "post", f"/candidates/{free}/vote/", None),
+        ]
+        if jury_id is None:
+            self.not_measured = ["jury.retrieve", "jury.destroy"]
+            self.stderr.write(
+                self.style.WARNING(
+                    "Нет членов жюри, которых отдаёт JuryMemberViewSet: "
+                    "jury.retrieve и jury.destroy не замерены"
+                )
+            )
+            endpoints = [
+                endpoint
+                for endpoint in endpoints
+                if endpoint[0] not in self.not_measured
+            ]
+        return endpoints
+
+    def request(self, client, method, path, data, options):
+        if not options["warm_cache"]:
+            get_response_cache().clear()
+        # Журнал запросов ограничен по длине, а CaptureQueriesContext считает
+        # разницу его длин, поэтому перед замером журнал очищается.
+        reset_queries()
+        # Каждый запрос откатывается, чтобы замеры записи не меняли данные.
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method)(
+                    path, data=data, content_type="application/json"
+                )
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        query_time = sum(float(query["time"]) for query in queries.captured_queries)
+        return response.status_code, elapsed, len(queries), query_time
+
+    def measure(self, client, name, method, path, data, options):
+        for _ in range(options["warmup"]):
+            self.request(client, method, path, data, options)
+
+        timings, query_counts, query_times, statuses = [], [], [], set()
+        for _ in range(options["iterations"]):
+            status, elapsed, count, query_time = self.request(
+                client, method, path, data, options
+            )
+            statuses.add(status)
+            timings.append(elapsed * 1000)
+            query_counts.append(count)
+            query_times.append(query_time * 1000)
+
+        return {
+            "method": method.upper(),
+            "path": path,
+            "status": sorted(statuses),
+            "ok": all(succeeded(name, status) for status in statuses),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "queries": max(query_counts),
+            "query_budget": self.query_budget(method, path),
+            "sql_ms": round(statistics.fmean(query_times), 3),
+        }
+
+    def query_budget(self, method, path):
+        try:
+            match = resolve(urlsplit(path).path)
+        except Resolver404:
+            return None
+        return view_query_budget(match.func, method)
+
+    def print_row(self, name, result):
+        line = (
+            f"{name:<45} {','.join(map(str, result['status'])):<8} "
+            f"p50={result['p50_ms']:>9.2f}ms p95={result['p95_ms']:>9.2f}ms "
+            f"p99={result['p99_ms']:>9.2f}ms queries={result['queries']:>4}"
+        )
+        budget = result["query_budget"]
+        if not result["ok"]:
+            line = self.style.ERROR(f"{line} (ошибка)")
+        elif budget is not None and result["queries"] > budget:
+            line = self.style.ERROR(f"{line} (бюджет {budget})")
+        self.stdout.write(line)
+
+    def compare(self, path, results):
+        with open(path, encoding="utf-8") as file:
+            baseline = json.load(file)
+        self.stdout.write(
+            f"\nСравнение с {path} (коммит {baseline['meta'].get('commit')}):"
+        )
+        for name, result in results.items():
+            old = baseline["results"].get(name)
+            if not old:
+                continue
+            change = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            line = (
+                f"{name:<45} p95 {old['p95_ms']:>9.2f} → {result['p95_ms']:>9.2f}ms "
+                f"({change:+.0f}%)  queries {old['queries']} → {result['queries']}"
+            )
+            if result["queries"] > old["queries"] or change > 20:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
@@ -0,0 +1,154 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.management.commands.bench_api import git_commit
+
+# Развёртывания для сравнения: gunicorn с sync-воркером (config.wsgi) и
+# с uvicorn-воркером (config.asgi, async-версии частых чтений).
+DEPLOYMENTS = {
+    "wsgi": ["config.wsgi:application"],
+    "asgi": ["config.asgi:application", "-k", "uvicorn_worker.UvicornWorker"],
+}
+DEFAULT_MIX = "stats_summary=30,active=20,popular=20,stats=15,candidate_page=15"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнить WSGI- и ASGI-развёртывание: одинаковое число процессов "
+        "gunicorn под нагрузкой loadgen с разным числом параллельных клиентов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--deployments",
+            nargs="+",
+            choices=sorted(DEPLOYMENTS),
+            default=["wsgi", "asgi"],
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            nargs="+",
+            default=[1, 8, 32],
+            help="Числа параллельных клиентов, для каждого — отдельный прогон",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Длительность прогона, секунды"
+        )
+        parser.add_argument("--mix", default=DEFAULT_MIX, help="Смесь запросов loadgen")
+        parser.add_argument(
+            "--workers", type=int, default=1, help="Процессов gunicorn на сервер"
+        )
+        parser.add_argument("--output", help="Сохранить результаты в JSON")
+
+    def handle(self, *args, **options):
+        results = {}
+        self.stdout.write(
+            f"{'сервер':<6} {'клиентов':>9} {'запросов/с':>11} {'p50, мс':>9} "
+            f"{'p95, мс':>9} {'p99, мс':>9} {'ошибки':>8}"
+        )
+        for deployment in options["deployments"]:
+            with self.server(deployment, options["workers"]) as url:
+                for clients in options["clients"]:
+                    report = self.run_load(url, clients, options)
+                    results.setdefault(deployment, {})[clients] = report
+                    self.stdout.write(
+                        f"{deployment:<6} {clients:>9} "
+                        f"{report['throughput_rps']:>11.1f} "
+                        f"{report['p50_ms']:>9.1f} {report['p95_ms']:>9.1f} "
+                        f"{report['p99_ms']:>9.1f} {report['error_rate']:>8.1%}"
+                    )
+
+        if options["output"]:
+            data = {
+                "meta": {
+                    "commit": git_commit(),
+                    "mix": options["mix"],
+                    "workers": options["workers"],
+                    "duration_s": options["duration"],
+                },
+                "results": results,
+            }
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты сохранены в {options['output']}")
+
+    @contextmanager
+    def server(self, deployment, workers):
+        """Запускает gunicorn на свободном порту с окружением этой команды
+        (та же база и настройки) и отдаёт его адрес."""
+        port = free_port()
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "gunicorn",
+                    *DEPLOYMENTS[deployment],
+                    "--workers",
+                    str(workers),
+                    "--bind",
+                    f"127.0.0.1:{port}",
+                ],
+                cwd=settings.BASE_DIR,
+                env=os.environ.copy(),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            try:
+                if not wait_for_port(port, process, timeout=30):
+                    log.seek(0)
+                    output = log.read().decode(errors="replace")[-2000:]
+                    raise CommandError(f"Сервер {deployment} не запустился:\n{output}")
+                yield f"http://127.0.0.1:{port}"
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    def run_load(self, url, clients, options):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "load.json")
+            call_command(
+                "loadgen",
+                target=url,
+                clients=clients,
+                duration=options["duration"],
+                mix=options["mix"],
+                output=output,
+                stdout=StringIO(),
+            )
+            with open(output, encoding="utf-8") as file:
+                return json.load(file)
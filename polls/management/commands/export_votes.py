@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from polls import export
+
+
+class Command(BaseCommand):
+    help = "Выгрузить голоса в CSV или NDJSON без загрузки их в память"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=export.FORMATS, default="csv")
+        parser.add_argument("--nomination", type=int)
+        parser.add_argument("--since", help="С даты (ISO-дата или дата и время)")
+        parser.add_argument("--until", help="По дату включительно")
+        parser.add_argument(
+            "--active-only",
+            action="store_true",
+            help="Только голоса активных номинаций",
+        )
+        parser.add_argument("--output", help="Файл (по умолчанию stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            since = options["since"] and export.parse_bound(options["since"])
+            until = options["until"] and export.parse_bound(options["until"], end=True)
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        queryset = export.export_queryset(
+            options["nomination"], since, until, options["active_only"]
+        )
+        chunks = export.stream_votes(options["format"], queryset)
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(options["output"], "w", encoding="utf-8", newline="") as file:
+            file.writelines(chunks)
+        self.stdout.write(f"Голоса выгружены в {options['output']}")
@@ -0,0 +1,77 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from polls import thumbnails
+from polls.models import Candidate
+
+
+def generate(candidate_id):
+    """Миниатюры одного кандидата в отдельном процессе."""
+    try:
+        candidate = Candidate.objects.filter(pk=candidate_id).first()
+        if candidate is None or not candidate.photo:
+            return candidate_id, None
+        return candidate_id, thumbnails.generate_thumbnails(candidate) is not None
+    except Exception as error:
+        return candidate_id, error
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Создать миниатюры фото кандидатов, у которых их ещё нет"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--candidate",
+            type=int,
+            action="append",
+            dest="candidates",
+            help="Обработать только этого кандидата (можно повторять)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать миниатюры, даже если они актуальны",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=thumbnails.thumbnail_settings()["WORKERS"] or 1,
+            help="Число процессов Pillow",
+        )
+
+    def handle(self, *args, **options):
+        candidates = Candidate.objects.exclude(photo="").exclude(photo__isnull=True)
+        if options["candidates"]:
+            candidates = candidates.filter(pk__in=options["candidates"])
+        pending = [
+            candidate.pk
+            for candidate in candidates.only("pk", "photo", "thumbnails").iterator()
+            if options["force"] or not thumbnails.is_current(candidate)
+        ]
+        if not pending:
+            self.stdout.write("Все миниатюры актуальны")
+            return
+
+        done = failed = 0
+        for candidate_id, result in self.generate(pending, options["workers"]):
+            if isinstance(result, Exception):
+                failed += 1
+                self.stderr.write(f"Кандидат {candidate_id}: {result}")
+            elif result:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f"Обработано кандидатов: {done}"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"С ошибками: {failed}"))
+
+    def generate(self, candidate_ids, workers):
+        if workers <= 1:
+            return map(generate, candidate_ids)
+        # Дочерние процессы не должны делить с родителем открытые соединения.
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+            return list(pool.map(generate, candidate_ids, chunksize=8))
@@ -0,0 +1,414 @@
+import asyncio
+import http.client
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.utils.crypto import get_random_string
+
+from polls.management.commands.bench_api import git_commit, percentile
+from polls.models import ALREADY_VOTED_MESSAGE, Candidate
+
+User = get_user_model()
+
+LOAD_PREFIX = "loadgen"
+# Эндпоинты смеси: имя → (метод, путь); {nomination} и {candidate} —
+# случайные номинация и её кандидат.
+ENDPOINTS = {
+    "stats": ("POST", "/api/nominations/{nomination}/stats/"),
+    "stats_summary": ("GET", "/api/nominations/stats_summary/"),
+    "active": ("GET", "/api/nominations/active/"),
+    "popular": ("GET", "/api/candidates/popular/"),
+    "candidates": ("GET", "/api/candidates/?nomination_id={nomination}"),
+    "candidate_page": ("GET", "/candidates/{candidate}/"),
+    "nominations": ("GET", "/api/nominations/"),
+    "vote": ("POST", "/api/votes/"),
+}
+DEFAULT_MIX = "stats=35,popular=35,candidates=20,vote=10"
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "BEGIN")
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise CommandError(
+                f"Неизвестный эндпоинт {name!r}; доступны: {', '.join(ENDPOINTS)}"
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f"Неверный вес в --mix: {part!r}")
+    return mix
+
+
+class LockProbe:
+    """Обёртка execute_wrapper для соединений, открытых во время нагрузки:
+    ошибки «database is locked» и записи, ждавшие дольше порога (в SQLite —
+    ожидание блокировки базы)."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.locked_errors = 0
+        self.slow_writes = 0
+        self.slow_write_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as error:
+            if "locked" in str(error):
+                with self.lock:
+                    self.locked_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold and sql.lstrip().upper().startswith(
+                WRITE_STATEMENTS
+            ):
+                with self.lock:
+                    self.slow_writes += 1
+                    self.slow_write_time += elapsed
+
+    def install(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.duplicates = Counter()
+
+    def record(self, name, elapsed, status, body):
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            self.statuses[name][status] += 1
+            if status == 400 and ALREADY_VOTED_MESSAGE in body:
+                self.duplicates[name] += 1
+
+
+class WSGITransport:
+    """Приложение в этом процессе через WSGI-обработчик тестового клиента."""
+
+    def __init__(self, user):
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(user)
+
+    def request(self, method, path, data):
+        response = self.client.generic(
+            method, path, json.dumps(data) if data else "", "application/json"
+        )
+        return response.status_code, response.content.decode(errors="replace")
+
+
+class ASGITransport:
+    """Приложение в этом процессе через ASGI-обработчик. Как и ASGIHandler
+    сервера, каждый запрос выполняет синхронные части в своём потоке."""
+
+    def __init__(self, user):
+        self.client = AsyncClient(raise_request_exception=False)
+        self.user = user
+
+    async def login(self):
+        await self.client.aforce_login(self.user)
+
+    async def request(self, method, path, data):
+        async with ThreadSensitiveContext():
+            response = await self.client.generic(
+                method, path, json.dumps(data) if data else "", "application/json"
+            )
+        return response.status_code, response.content.decode(errors="replace")
+
+
+class HTTPTransport:
+    """Запущенный сервер по HTTP с keep-alive. Сессия создаётся в той же базе,
+    что у сервера; CSRF-токен передаётся cookie и заголовком."""
+
+    def __init__(self, user, base_url):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(
+            parts.hostname, parts.port or 80, timeout=60
+        )
+        client = Client()
+        client.force_login(user)
+        csrf = get_random_string(32)
+        self.headers = {
+            "Cookie": (
+                f"{settings.SESSION_COOKIE_NAME}="
+                f"{client.cookies[settings.SESSION_COOKIE_NAME].value}; "
+                f"{settings.CSRF_COOKIE_NAME}={csrf}"
+            ),
+            "X-CSRFToken": csrf,
+            "Content-Type": "application/json",
+        }
+
+    def request(self, method, path, data):
+        body = json.dumps(data) if data else None
+        try:
+            self.connection.request(method, path, body, self.headers)
+            response = self.connection.getresponse()
+            return response.status, response.read().decode(errors="replace")
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+
+
+class Command(BaseCommand):
+    help = (
+        "Генератор нагрузки: много параллельных клиентов со смесью чтений и "
+        "голосов против приложения (WSGI/ASGI в процессе или сервер по HTTP)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            default="wsgi",
+            help="wsgi или asgi — приложение в этом процессе; "
+            "http://localhost:8000 — запущенный сервер",
+        )
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help=f"Доли запросов, например {DEFAULT_MIX}; "
+            f"эндпоинты: {', '.join(ENDPOINTS)}",
+        )
+        parser.add_argument(
+            "--clients", type=int, default=20, help="Параллельных клиентов"
+        )
+        parser.add_argument(
+            "--duration", type=float, default=30, help="Длительность, секунды"
+        )
+        parser.add_argument(
+            "--lock-threshold",
+            type=float,
+            default=50,
+            help="Запись дольше порога (мс) считается ожиданием блокировки",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Сохранить отчёт в JSON")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Не удалять пользователей нагрузки и их голоса",
+        )
+
+    def handle(self, *args, **options):
+        # Строки логов на каждый запрос (в т.ч. 400 на повторный голос) мешают отчёту.
+        logging.getLogger("config.performance").setLevel(logging.ERROR)
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        mix = parse_mix(options["mix"])
+        target = options["target"]
+        if target not in ("wsgi", "asgi") and not target.startswith("http://"):
+            raise CommandError("--target: wsgi, asgi или http://host:port")
+
+        self.candidates = defaultdict(list)
+        for pk, nomination_id in Candidate.objects.values_list("pk", "nomination_id"):
+            self.candidates[nomination_id].append(pk)
+        if not self.candidates:
+            raise CommandError("Нет кандидатов: заполните базу (seed_data)")
+        self.nominations = sorted(self.candidates)
+
+        # У каждого клиента свой пользователь: голоса идут от разных людей.
+        users = self.create_users(options["clients"])
+        results = Results()
+        probe = LockProbe(options["lock_threshold"] / 1000)
+        connection_created.connect(probe.install)
+        try:
+            if target == "asgi":
+                with self.in_process():
+                    elapsed = asyncio.run(self.run_async(users, mix, results, options))
+            elif target == "wsgi":
+                with self.in_process():
+                    elapsed = self.run_threads(users, mix, results, options)
+            else:
+                elapsed = self.run_threads(users, mix, results, options)
+        finally:
+            connection_created.disconnect(probe.install)
+            if not options["keep"]:
+                User.objects.filter(username__startswith=f"{LOAD_PREFIX}-").delete()
+
+        report = self.report(results, probe, elapsed, options)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчёт сохранён в {options['output']}")
+
+    def in_process(self):
+        # Тестовые клиенты приходят с хостом testserver.
+        return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"])
+
+    def create_users(self, count):
+        User.objects.filter(username__startswith=f"{LOAD_PREFIX}-").delete()
+        return User.objects.bulk_create(
+            User(username=f"{LOAD_PREFIX}-{index}") for index in range(count)
+        )
+
+    def next_request(self, rng, names, weights):
+        name = rng.choices(names, weights)[0]
+        method, path = ENDPOINTS[name]
+        nomination = rng.choice(self.nominations)
+        candidate = rng.choice(self.candidates[nomination])
+        data = {"candidate": candidate} if name == "vote" else None
+        return (
+            name,
+            method,
+            path.format(nomination=nomination, candidate=candidate),
+            data,
+        )
+
+    def run_threads(self, users, mix, results, options):
+        """Клиенты в потоках; возвращает длительность нагрузки в секундах."""
+        names, weights = list(mix), list(mix.values())
+        # Входы — до начала отсчёта и по очереди: сессии пишутся в базу.
+        if options["target"] == "wsgi":
+            transports = [WSGITransport(user) for user in users]
+        else:
+            transports = [HTTPTransport(user, options["target"]) for user in users]
+        started = time.perf_counter()
+        deadline = time.monotonic() + options["duration"]
+
+        def run_client(index, transport):
+            rng = random.Random(options["seed"] + index)
+            while time.monotonic() < deadline:
+                name, method, path, data = self.next_request(rng, names, weights)
+                began = time.perf_counter()
+                try:
+                    status, body = transport.request(method, path, data)
+                except Exception:
+                    status, body = None, ""
+                results.record(name, time.perf_counter() - began, status, body)
+
+        threads = [
+            threading.Thread(target=run_client, args=(index, transport))
+            for index, transport in enumerate(transports)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    async def run_async(self, users, mix, results, options):
+        """Клиенты-задачи asyncio; возвращает длительность нагрузки."""
+        names, weights = list(mix), list(mix.values())
+        transports = [ASGITransport(user) for user in users]
+        for transport in transports:
+            await transport.login()
+        started = time.perf_counter()
+        deadline = time.monotonic() + options["duration"]
+
+        async def run_client(index, transport):
+            rng = random.Random(options["seed"] + index)
+            while time.monotonic() < deadline:
+                name, method, path, data = self.next_request(rng, names, weights)
+                began = time.perf_counter()
+                try:
+                    status, body = await transport.request(method, path, data)
+                except Exception:
+                    status, body = None, ""
+                results.record(name, time.perf_counter() - began, status, body)
+
+        await asyncio.gather(
+            *(
+                run_client(index, transport)
+                for index, transport in enumerate(transports)
+            )
+        )
+        return time.perf_counter() - started
+
+    def report(self, results, probe, elapsed, options):
+        endpoints = {}
+        for name in sorted(results.latencies):
+            latencies = [value * 1000 for value in results.latencies[name]]
+            statuses = results.statuses[name]
+            total = sum(statuses.values())
+            duplicates = results.duplicates[name]
+            errors = (
+                sum(
+                    count
+                    for status, count in statuses.items()
+                    if status is None or status >= 400
+                )
+                - duplicates
+            )
+            endpoints[name] = {
+                "requests": total,
+                "rps": round(total / elapsed, 1),
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "errors": errors,
+                "error_rate": round(errors / total, 4),
+                "duplicate_votes": duplicates,
+                "statuses": {str(status): count for status, count in statuses.items()},
+            }
+        total = sum(result["requests"] for result in endpoints.values())
+        latencies = [
+            value * 1000 for values in results.latencies.values() for value in values
+        ]
+        errors = sum(result["errors"] for result in endpoints.values())
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "target": options["target"],
+                "mix": options["mix"],
+                "clients": options["clients"],
+                "duration_s": round(elapsed, 1),
+            },
+            "throughput_rps": round(total / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+            "error_rate": round(errors / total, 4) if total else None,
+            "lock_waits": {
+                "locked_errors": probe.locked_errors,
+                "slow_writes": probe.slow_writes,
+                "slow_write_ms": round(probe.slow_write_time * 1000, 1),
+            },
+            "endpoints": endpoints,
+        }
+
+        self.stdout.write(
+            f"{'эндпоинт':<14} {'запросов':>9} {'rps':>8} {'p50, мс':>9} "
+            f"{'p95, мс':>9} {'p99, мс':>9} {'ошибки':>8} {'повторы':>8}"
+        )
+        for name, result in endpoints.items():
+            self.stdout.write(
+                f"{name:<14} {result['requests']:>9} {result['rps']:>8.1f} "
+                f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                f"{result['p99_ms']:>9.1f} {result['error_rate']:>8.1%} "
+                f"{result['duplicate_votes']:>8}"
+            )
+        self.stdout.write(
+            f"Всего: {total} запросов за {elapsed:.1f} с, "
+            f"{report['throughput_rps']} запросов/с"
+        )
+        if options["target"].startswith("http://"):
+            self.stdout.write("Ожидания блокировок видны только в режимах wsgi/asgi")
+        else:
+            waits = report["lock_waits"]
+            self.stdout.write(
+                f"Блокировки БД: ошибок «locked» — {waits['locked_errors']}, "
+                f"записей дольше {options['lock_threshold']:g} мс — "
+                f"{waits['slow_writes']} ({waits['slow_write_ms']} мс)"
+            )
+        return report
@@ -0,0 +1,162 @@
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+from polls.management.commands.bench_api import percentile
+from polls.models import Candidate, Vote
+
+User = get_user_model()
+
+LOAD_PREFIX = "loadtest"
+
+
+def cast_votes(pairs, start_at):
+    """Голосует в отдельном процессе так же, как HTML-форма голосования:
+    кандидат читается из базы, голос пишется в транзакции."""
+    latencies, locked, failed = [], 0, 0
+    try:
+        # Соединение открывается до старта, чтобы процессы начали вместе.
+        connection.ensure_connection()
+        time.sleep(max(0.0, start_at - time.time()))
+        started = time.time()
+        for user_id, candidate_id in pairs:
+            began = time.perf_counter()
+            try:
+                candidate = Candidate.objects.get(pk=candidate_id)
+                with transaction.atomic():
+                    Vote.objects.create(user_id=user_id, candidate=candidate)
+            except OperationalError as error:
+                if "locked" not in str(error):
+                    raise
+                locked += 1
+            except Exception:
+                failed += 1
+            else:
+                latencies.append(time.perf_counter() - began)
+        return started, time.time(), latencies, locked, failed
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест записи голосов: как пропускная способность зависит "
+        "от числа параллельных процессов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            nargs="+",
+            default=[1, 2, 4, 8],
+            help="Числа процессов, для каждого — отдельный прогон",
+        )
+        parser.add_argument(
+            "--votes", type=int, default=2000, help="Голосов в каждом прогоне"
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Не удалять тестовых пользователей и их голоса",
+        )
+
+    def handle(self, *args, **options):
+        candidates = list(Candidate.objects.values_list("pk", "nomination_id"))
+        nominations = sorted({nomination_id for _, nomination_id in candidates})
+        if not nominations:
+            raise CommandError("Нет кандидатов: заполните базу (seed_data)")
+
+        self.stdout.write(self.describe_database())
+        self.stdout.write(
+            f"{'процессов':>10} {'голосов/с':>10} {'p50, мс':>9} {'p95, мс':>9} "
+            f"{'p99, мс':>9} {'locked':>7} {'ошибок':>7}"
+        )
+        rng = random.Random(options["seed"])
+        users = self.create_users(-(-options["votes"] // len(nominations)))
+        try:
+            for workers in options["workers"]:
+                pairs = self.vote_pairs(rng, users, candidates, options["votes"])
+                self.report(workers, self.run(pairs, workers))
+                self.clear_votes()
+        finally:
+            if not options["keep"]:
+                User.objects.filter(username__startswith=f"{LOAD_PREFIX}-").delete()
+
+    def describe_database(self):
+        if connection.vendor != "sqlite":
+            return f"База: {connection.vendor}"
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+        transaction_mode = connection.settings_dict["OPTIONS"].get(
+            "transaction_mode", "DEFERRED"
+        )
+        return (
+            f"База: sqlite, journal_mode={journal_mode}, транзакции {transaction_mode}"
+        )
+
+    def create_users(self, count):
+        User.objects.filter(username__startswith=f"{LOAD_PREFIX}-").delete()
+        User.objects.bulk_create(
+            User(username=f"{LOAD_PREFIX}-{index}") for index in range(count)
+        )
+        return list(
+            User.objects.filter(username__startswith=f"{LOAD_PREFIX}-").values_list(
+                "pk", flat=True
+            )
+        )
+
+    def vote_pairs(self, rng, users, candidates, count):
+        """Голоса разных пользователей: каждая пара (пользователь, номинация)
+        встречается один раз, поэтому дубликатов нет."""
+        by_nomination = {}
+        for candidate_id, nomination_id in candidates:
+            by_nomination.setdefault(nomination_id, []).append(candidate_id)
+        pairs = [
+            (user_id, rng.choice(candidate_ids))
+            for user_id in users
+            for candidate_ids in by_nomination.values()
+        ]
+        rng.shuffle(pairs)
+        return pairs[:count]
+
+    def run(self, pairs, workers):
+        chunks = [pairs[index::workers] for index in range(workers)]
+        # Дочерние процессы не должны делить с родителем открытые соединения.
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+            start_at = time.time() + 1.0
+            return list(pool.map(cast_votes, chunks, [start_at] * workers))
+
+    def report(self, workers, results):
+        started = min(result[0] for result in results)
+        finished = max(result[1] for result in results)
+        latencies = [latency for result in results for latency in result[2]]
+        locked = sum(result[3] for result in results)
+        failed = sum(result[4] for result in results)
+        throughput = len(latencies) / max(finished - started, 1e-9)
+        if latencies:
+            timings = [
+                statistics.median(latencies) * 1000,
+                percentile(latencies, 95) * 1000,
+                percentile(latencies, 99) * 1000,
+            ]
+        else:
+            timings = [0.0, 0.0, 0.0]
+        self.stdout.write(
+            f"{workers:>10} {throughput:>10.1f} "
+            + " ".join(f"{value:>9.1f}" for value in timings)
+            + f" {locked:>7} {failed:>7}"
+        )
+
+    def clear_votes(self):
+        # Удаление через ORM: сигналы возвращают счётчики и корзины голосов.
+        Vote.objects.filter(user__username__startswith=f"{LOAD_PREFIX}-").delete()
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from polls.vote_queue import get_queue, process_batch, queue_settings
+
+
+class Command(BaseCommand):
+    help = "Переносить голоса из очереди POLLS_VOTE_QUEUE в базу пачками"
+
+    def add_arguments(self, parser):
+        config = queue_settings()
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=config["BATCH_SIZE"],
+            help="Сколько голосов записывать за одну транзакцию",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=config["FLUSH_INTERVAL"],
+            help="Пауза в секундах, когда очередь пуста",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать очередь до конца и выйти",
+        )
+        parser.add_argument(
+            "--purge-after",
+            type=float,
+            default=86400,
+            help="Через сколько секунд удалять обработанные записи",
+        )
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        batch_size = options["batch_size"]
+        self.stdout.write(f"Обработка очереди {queue.path}")
+
+        try:
+            while True:
+                close_old_connections()
+                processed = process_batch(queue, batch_size)
+                if processed:
+                    self.stdout.write(f"- записано из очереди: {processed}")
+                if processed < batch_size:
+                    queue.purge(options["purge_after"])
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS("Готово!"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from polls.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобрать поисковый индекс (номинации, кандидаты, члены жюри, пользователи)"
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано объектов: {total}"))
@@ -1,16 +1,179 @@
-from django.core.management.base import BaseCommand
+import json
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
 
-from polls.models import Candidate
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from polls.models import Candidate, Nomination, Vote
+from polls.tallies import count_votes, lock_tallies, write_tallies
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def count_chunk(nomination_ids):
+    """Подсчёт в отдельном процессе для части номинаций."""
+    try:
+        return list(count_votes(nomination_ids))
+    finally:
+        connections.close_all()
 
 
 class Command(BaseCommand):
     help = "Пересчитать количество голосов у кандидатов"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--nomination",
+            type=int,
+            action="append",
+            dest="nominations",
+            help="Пересчитать только эту номинацию (можно повторять)",
+        )
+        parser.add_argument(
+            "--since",
+            help=(
+                "Пересчитать только номинации, получившие голоса с этого момента "
+                "(ISO-дата или дата и время)"
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Число процессов, между которыми делятся номинации",
+        )
+        parser.add_argument(
+            "--write",
+            action="store_true",
+            help="Записать результаты в счётчики голосов",
+        )
+        parser.add_argument(
+            "--json",
+            dest="json_path",
+            help="Сохранить отчёт в JSON (``-`` — в stdout) вместо вывода списка",
+        )
+
     def handle(self, *args, **options):
-        self.stdout.write("Подсчет голосов:")
+        nomination_ids = self.scope(options)
+        if nomination_ids == []:
+            self.stdout.write("Нет номинаций для пересчёта")
+            return
+
+        candidate_counts = Counter()
+        nomination_counts = Counter()
+        # С --write подсчёт и запись идут в одной транзакции после блокировки
+        # счётчиков: голоса, пришедшие во время пересчёта, не теряются.
+        with transaction.atomic():
+            if options["write"]:
+                lock_tallies(nomination_ids)
+            for candidate_id, nomination_id, total in self.count(
+                nomination_ids, options["workers"]
+            ):
+                candidate_counts[candidate_id] += total
+                nomination_counts[nomination_id] += total
+            if options["write"]:
+                write_tallies(candidate_counts, nomination_ids)
 
-        for candidate in Candidate.objects.all():
-            votes_count = candidate.votes.count()
-            self.stdout.write(f"- {candidate.name}: {votes_count}")
+        if options["json_path"]:
+            self.write_report(
+                options, nomination_ids, candidate_counts, nomination_counts
+            )
+            if options["json_path"] == "-":
+                return
+        else:
+            self.stdout.write("Подсчет голосов:")
+            for candidate_id, _, name in self.candidates(nomination_ids):
+                self.stdout.write(f"- {name}: {candidate_counts[candidate_id]}")
 
+        if options["write"]:
+            self.stdout.write(
+                f"Счётчики обновлены: кандидатов с голосами — "
+                f"{len(candidate_counts)}, номинаций — {len(nomination_counts)}"
+            )
         self.stdout.write(self.style.SUCCESS("Готово!"))
+
+    def scope(self, options):
+        """Номинации для пересчёта; ``None`` — все."""
+        nomination_ids = options["nominations"]
+        if options["since"]:
+            try:
+                since = parse_since(options["since"])
+            except ValueError:
+                raise CommandError(f"Неверная дата --since: {options['since']}")
+            # Итог номинации зависит от всех её голосов, поэтому пересчитываются
+            # целиком номинации, где появились новые голоса. Удалённые голоса
+            # счётчики учитывают сами через сигналы.
+            touched = Vote.objects.filter(created_at__gte=since)
+            if nomination_ids:
+                touched = touched.filter(nomination_id__in=nomination_ids)
+            nomination_ids = list(
+                touched.values_list("nomination_id", flat=True).distinct().order_by()
+            )
+        return nomination_ids
+
+    def count(self, nomination_ids, workers):
+        if workers <= 1:
+            return count_votes(nomination_ids)
+
+        if nomination_ids is None:
+            nomination_ids = list(Nomination.objects.values_list("pk", flat=True))
+        chunks = [nomination_ids[index::workers] for index in range(workers)]
+        # Процессы запускаются заново, а не через fork: они не делят с
+        # родителем соединение, которое держит транзакцию с блокировками.
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        ) as pool:
+            return [
+                row
+                for rows in pool.map(count_chunk, [chunk for chunk in chunks if chunk])
+                for row in rows
+            ]
+
+    def candidates(self, nomination_ids):
+        candidates = Candidate.objects.order_by("nomination_id", "name")
+        if nomination_ids is not None:
+            candidates = candidates.filter(nomination_id__in=nomination_ids)
+        return candidates.values_list("pk", "nomination_id", "name").iterator()
+
+    def write_report(self, options, nomination_ids, candidate_counts, counts):
+        nominations = Nomination.objects.order_by("pk")
+        if nomination_ids is not None:
+            nominations = nominations.filter(pk__in=nomination_ids)
+        report = {
+            "generated_at": timezone.now().isoformat(timespec="seconds"),
+            "since": options["since"],
+            "written": options["write"],
+            "nominations": {
+                pk: {"title": title, "total_votes": counts[pk], "candidates": []}
+                for pk, title in nominations.values_list("pk", "title")
+            },
+        }
+        for pk, nomination_id, name in self.candidates(nomination_ids):
+            report["nominations"][nomination_id]["candidates"].append(
+                {"id": pk, "name": name, "votes": candidate_counts[pk]}
+            )
+
+        if options["json_path"] == "-":
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        with open(options["json_path"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f"Отчёт сохранён в {options['json_path']}")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from polls.cache import invalidate_nominations
+from polls.tallies import rebuild_nomination_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобрать показатели номинаций (кандидаты, жюри, голоса); голоса "
+        "за 7 и 30 дней считаются при чтении и пересчёта не требуют"
+    )
+
+    def handle(self, *args, **options):
+        metrics = rebuild_nomination_metrics()
+        invalidate_nominations()
+        self.stdout.write(f"Показатели пересобраны: номинаций — {len(metrics)}")
@@ -0,0 +1,213 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from polls.models import Candidate, JuryMember, Nomination, Vote
+from polls.search import rebuild_index
+from polls.tallies import rebuild_tallies
+
+User = get_user_model()
+
+SEED_PREFIX = "seed"
+BATCH_SIZE = 2000
+
+
+@contextmanager
+def explicit_created_at(model):
+    # auto_now_add перезаписывает дату при вставке, а для реалистичных
+    # данных даты должны быть распределены по времени.
+    field = model._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Заполнить базу синтетическими данными для нагрузочных замеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nominations", type=int, default=20)
+        parser.add_argument(
+            "--candidates", type=int, default=10, help="Кандидатов в номинации"
+        )
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--votes", type=int, default=10000)
+        parser.add_argument("--jury", type=int, default=30, help="Членов жюри")
+        parser.add_argument(
+            "--jury-per-member",
+            type=int,
+            default=3,
+            help="Номинаций у одного члена жюри",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.2,
+            help="Показатель распределения Ципфа для популярности кандидатов",
+        )
+        parser.add_argument(
+            "--days", type=int, default=60, help="За сколько дней раскидать голоса"
+        )
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить ранее сгенерированные данные перед заполнением",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        if options["clear"]:
+            self.clear()
+
+        max_votes = options["users"] * options["nominations"]
+        if options["votes"] > max_votes:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Голосов не может быть больше {max_votes} "
+                    "(по одному на пользователя в номинации)"
+                )
+            )
+            options["votes"] = max_votes
+
+        now = timezone.now()
+        with transaction.atomic():
+            nominations = self.create_nominations(options, rng, now)
+            candidates = self.create_candidates(options, nominations)
+            users = self.create_users(options)
+            self.create_jury(options, rng, nominations)
+        self.create_votes(options, rng, now, candidates, users)
+        rebuild_tallies()
+        rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS("Готово!"))
+
+    def clear(self):
+        prefix = f"{SEED_PREFIX}-"
+        Nomination.objects.filter(title__startswith=prefix).delete()
+        JuryMember.objects.filter(name__startswith=prefix).delete()
+        User.objects.filter(username__startswith=prefix).delete()
+        rebuild_tallies()
+        self.stdout.write("Старые данные удалены")
+
+    def create_nominations(self, options, rng, now):
+        nominations = [
+            Nomination(
+                title=f"{SEED_PREFIX}-nomination-{index}",
+                description="Синтетическая номинация",
+                is_active=rng.random() < 0.8,
+            )
+            for index in range(options["nominations"])
+        ]
+        with explicit_created_at(Nomination):
+            for nomination in nominations:
+                nomination.created_at = now - timedelta(days=rng.randint(0, 180))
+            nominations = Nomination.objects.bulk_create(nominations)
+        self.stdout.write(f"- номинаций: {len(nominations)}")
+        return nominations
+
+    def create_candidates(self, options, nominations):
+        candidates = {}
+        for nomination in nominations:
+            candidates[nomination.pk] = Candidate.objects.bulk_create(
+                Candidate(
+                    nomination=nomination,
+                    name=f"Кандидат {index}",
+                    slug=f"{SEED_PREFIX}-{nomination.pk}-{index}",
+                )
+                for index in range(options["candidates"])
+            )
+        self.stdout.write(f"- кандидатов: {sum(map(len, candidates.values()))}")
+        return candidates
+
+    def create_users(self, options):
+        password = make_password(options["password"])
+        users = User.objects.bulk_create(
+            (
+                User(username=f"{SEED_PREFIX}-user-{index}", password=password)
+                for index in range(options["users"])
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        self.stdout.write(f"- пользователей: {len(users)}")
+        return [user.pk for user in users]
+
+    def create_jury(self, options, rng, nominations):
+        # JuryMemberViewSet отдаёт только членов жюри с «user» в имени: такое
+        # имя у каждого второго, чтобы bench_api замерял retrieve и destroy.
+        members = JuryMember.objects.bulk_create(
+            JuryMember(
+                name=f"{SEED_PREFIX}-jury-user-{index}"
+                if index % 2 == 0
+                else f"{SEED_PREFIX}-jury-{index}"
+            )
+            for index in range(options["jury"])
+        )
+        per_member = min(options["jury_per_member"], len(nominations))
+        Through = JuryMember.nominations.through
+        Through.objects.bulk_create(
+            Through(jurymember_id=member.pk, nomination_id=nomination.pk)
+            for member in members
+            for nomination in rng.sample(nominations, per_member)
+        )
+        self.stdout.write(f"- членов жюри: {len(members)}")
+
+    def create_votes(self, options, rng, now, candidates, users):
+        nomination_ids = list(candidates)
+        if not options["candidates"] or not nomination_ids or not users:
+            return
+        weights = [
+            1 / (rank ** options["skew"])
+            for rank in range(1, options["candidates"] + 1)
+        ]
+        # Номинации тоже неравномерно популярны: первые получают больше голосов.
+        nomination_weights = [
+            1 / (rank**0.5) for rank in range(1, len(nomination_ids) + 1)
+        ]
+        seconds = options["days"] * 86400
+
+        pairs = set()
+        if options["votes"] * 2 > len(users) * len(nomination_ids):
+            # Почти все пары заняты: случайный перебор сходился бы слишком долго.
+            pairs = set(
+                rng.sample(
+                    [
+                        (user, nomination)
+                        for user in users
+                        for nomination in nomination_ids
+                    ],
+                    options["votes"],
+                )
+            )
+        while len(pairs) < options["votes"]:
+            user_id = rng.choice(users)
+            nomination_id = rng.choices(nomination_ids, nomination_weights)[0]
+            pairs.add((user_id, nomination_id))
+
+        votes = []
+        for user_id, nomination_id in pairs:
+            candidate = rng.choices(candidates[nomination_id], weights)[0]
+            votes.append(
+                Vote(
+                    user_id=user_id,
+                    candidate_id=candidate.pk,
+                    nomination_id=nomination_id,
+                    # Больше голосов ближе к текущему моменту.
+                    created_at=now - timedelta(seconds=seconds * rng.random() ** 2),
+                )
+            )
+
+        for start in range(0, len(votes), BATCH_SIZE):
+            with transaction.atomic():
+                Vote.objects.bulk_create(votes[start : start + BATCH_SIZE])
+        self.stdout.write(f"- голосов: {len(votes)}")
@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_tallies(apps, schema_editor):
+    Vote = apps.get_model('polls', 'Vote')
+    CandidateTally = apps.get_model('polls', 'CandidateTally')
+    NominationTally = apps.get_model('polls', 'NominationTally')
+
+    nomination_totals = {}
+    candidate_tallies = []
+    rows = (
+        Vote.objects.values('candidate_id', 'candidate__nomination_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        candidate_tallies.append(
+            CandidateTally(candidate_id=row['candidate_id'], vote_count=row['total'])
+        )
+        nomination_id = row['candidate__nomination_id']
+        nomination_totals[nomination_id] = (
+            nomination_totals.get(nomination_id, 0) + row['total']
+        )
+
+    CandidateTally.objects.bulk_create(candidate_tallies)
+    NominationTally.objects.bulk_create(
+        NominationTally(nomination_id=pk, total_votes=total)
+        for pk, total in nomination_totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0002_alter_nomination_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateTally',
+            fields=[
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='polls.candidate', verbose_name='Кандидат')),
+                ('vote_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Кол-во голосов')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Счётчик голосов кандидата',
+                'verbose_name_plural': 'Счётчики голосов кандидатов',
+            },
+        ),
+        migrations.CreateModel(
+            name='NominationTally',
+            fields=[
+                ('nomination', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='polls.nomination', verbose_name='Номинация')),
+                ('total_votes', models.PositiveIntegerField(default=0, verbose_name='Всего голосов')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Счётчик голосов номинации',
+                'verbose_name_plural': 'Счётчики голосов номинаций',
+            },
+        ),
+        migrations.RunPython(fill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:02
+
+import logging
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+logger = logging.getLogger(__name__)
+
+
+def fill_vote_nomination(apps, schema_editor):
+    Vote = apps.get_model('polls', 'Vote')
+    Candidate = apps.get_model('polls', 'Candidate')
+
+    Vote.objects.update(
+        nomination_id=Subquery(
+            Candidate.objects.filter(pk=OuterRef('candidate_id')).values(
+                'nomination_id'
+            )[:1]
+        )
+    )
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    """Оставляет самый ранний голос пользователя в номинации: повторные
+    голоса (гонка двух POST) иначе не дают создать ограничение."""
+    Vote = apps.get_model('polls', 'Vote')
+    CandidateTally = apps.get_model('polls', 'CandidateTally')
+    NominationTally = apps.get_model('polls', 'NominationTally')
+
+    duplicates = (
+        Vote.objects.values('user_id', 'nomination_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    extra_ids, candidate_ids, nomination_ids = [], set(), set()
+    for group in duplicates:
+        votes = list(
+            Vote.objects.filter(
+                user_id=group['user_id'], nomination_id=group['nomination_id']
+            )
+            .order_by('created_at', 'id')
+            .values_list('id', 'candidate_id')
+        )
+        for vote_id, candidate_id in votes[1:]:
+            extra_ids.append(vote_id)
+            candidate_ids.add(candidate_id)
+        nomination_ids.add(group['nomination_id'])
+    if not extra_ids:
+        return
+
+    Vote.objects.filter(pk__in=extra_ids).delete()
+    # Счётчики 0003 пересчитываются для затронутых кандидатов и номинаций.
+    for candidate_id in candidate_ids:
+        CandidateTally.objects.filter(candidate_id=candidate_id).update(
+            vote_count=Vote.objects.filter(candidate_id=candidate_id).count()
+        )
+    for nomination_id in nomination_ids:
+        NominationTally.objects.filter(nomination_id=nomination_id).update(
+            total_votes=Vote.objects.filter(nomination_id=nomination_id).count()
+        )
+    logger.warning(
+        'Удалено повторных голосов: %d (в %d номинациях)',
+        len(extra_ids),
+        len(nomination_ids),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_vote_tallies'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalvote',
+            name='nomination',
+            field=models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='polls.nomination', verbose_name='Номинация'),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='nomination',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='polls.nomination', verbose_name='Номинация'),
+        ),
+        migrations.RunPython(fill_vote_nomination, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vote',
+            name='nomination',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='polls.nomination', verbose_name='Номинация'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='vote',
+            name='unique_vote_per_candidate',
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('user', 'nomination'), name='unique_vote_per_nomination', violation_error_message='Вы уже голосовали в этой номинации'),
+        ),
+    ]
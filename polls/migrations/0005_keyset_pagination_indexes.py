@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0004_vote_nomination'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidate',
+            index=models.Index(fields=['name', 'id'], name='candidate_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nomination',
+            index=models.Index(fields=['created_at', 'id'], name='nomination_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='vote_user_created_id_idx'),
+        ),
+    ]
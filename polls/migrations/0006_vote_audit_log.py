@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteAuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vote_id', models.BigIntegerField(db_index=True, verbose_name='Голос')),
+                ('user_id', models.BigIntegerField(verbose_name='Пользователь')),
+                ('candidate_id', models.BigIntegerField(verbose_name='Кандидат')),
+                ('action', models.CharField(choices=[('+', 'Создан'), ('~', 'Изменён'), ('-', 'Удалён')], max_length=1, verbose_name='Действие')),
+                ('ts', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время')),
+            ],
+            options={
+                'verbose_name': 'Запись журнала голосов',
+                'verbose_name_plural': 'Журнал голосов',
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:00
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def fill_metrics(apps, schema_editor):
+    Nomination = apps.get_model('polls', 'Nomination')
+    NominationTally = apps.get_model('polls', 'NominationTally')
+    Vote = apps.get_model('polls', 'Vote')
+    Candidate = apps.get_model('polls', 'Candidate')
+    JuryLink = apps.get_model('polls', 'JuryMember').nominations.through
+
+    now = timezone.now()
+    metrics = {
+        pk: {
+            'candidate_count': 0,
+            'jury_count': 0,
+            'total_votes': 0,
+            'votes_7d': 0,
+            'votes_30d': 0,
+        }
+        for pk in Nomination.objects.values_list('pk', flat=True)
+    }
+    rows = (
+        Vote.objects.values('nomination_id')
+        .annotate(
+            total_votes=Count('id'),
+            votes_7d=Count('id', filter=Q(created_at__gte=now - timedelta(days=7))),
+            votes_30d=Count('id', filter=Q(created_at__gte=now - timedelta(days=30))),
+        )
+        .order_by()
+    )
+    for row in rows:
+        metrics[row.pop('nomination_id')].update(row)
+    for field, model in (('candidate_count', Candidate), ('jury_count', JuryLink)):
+        counts = model.objects.values_list('nomination_id').annotate(Count('id'))
+        for pk, count in counts.order_by():
+            metrics[pk][field] = count
+
+    NominationTally.objects.all().delete()
+    NominationTally.objects.bulk_create(
+        [NominationTally(nomination_id=pk, **row) for pk, row in metrics.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_vote_audit_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='nominationtally',
+            options={'verbose_name': 'Показатели номинации', 'verbose_name_plural': 'Показатели номинаций'},
+        ),
+        migrations.AddField(
+            model_name='nominationtally',
+            name='candidate_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Кандидатов'),
+        ),
+        migrations.AddField(
+            model_name='nominationtally',
+            name='jury_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Членов жюри'),
+        ),
+        migrations.AddField(
+            model_name='nominationtally',
+            name='votes_30d',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Голосов за 30 дней'),
+        ),
+        migrations.AddField(
+            model_name='nominationtally',
+            name='votes_7d',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Голосов за 7 дней'),
+        ),
+        migrations.AlterField(
+            model_name='nominationtally',
+            name='total_votes',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Всего голосов'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['nomination', 'created_at'], name='vote_nomination_created_idx'),
+        ),
+        migrations.RunPython(fill_metrics, migrations.RunPython.noop),
+    ]
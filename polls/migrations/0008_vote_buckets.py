@@ -0,0 +1,60 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:40
+
+from datetime import UTC
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Trunc
+
+
+def fill_buckets(apps, schema_editor):
+    Vote = apps.get_model('polls', 'Vote')
+    VoteBucket = apps.get_model('polls', 'VoteBucket')
+
+    rows = (
+        Vote.objects.values_list(
+            'candidate_id', 'nomination_id', Trunc('created_at', 'hour', tzinfo=UTC)
+        )
+        .annotate(Count('id'))
+        .order_by()
+    )
+    VoteBucket.objects.bulk_create(
+        (
+            VoteBucket(
+                candidate_id=candidate_id,
+                nomination_id=nomination_id,
+                hour=hour,
+                vote_count=total,
+            )
+            for candidate_id, nomination_id, hour, total in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0007_nomination_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Час')),
+                ('vote_count', models.PositiveIntegerField(default=0, verbose_name='Кол-во голосов')),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='polls.candidate', verbose_name='Кандидат')),
+                ('nomination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='polls.nomination', verbose_name='Номинация')),
+            ],
+            options={
+                'verbose_name': 'Голоса за час',
+                'verbose_name_plural': 'Голоса по часам',
+                'indexes': [models.Index(fields=['nomination', 'hour'], name='vote_bucket_nom_hour_idx'), models.Index(fields=['hour'], name='vote_bucket_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('candidate', 'hour'), name='unique_vote_bucket')],
+            },
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE polls_search_fts USING fts5(
+        text, content='polls_searchdocument', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    """CREATE TRIGGER polls_search_fts_ai AFTER INSERT ON polls_searchdocument
+    BEGIN
+        INSERT INTO polls_search_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER polls_search_fts_ad AFTER DELETE ON polls_searchdocument
+    BEGIN
+        INSERT INTO polls_search_fts(polls_search_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER polls_search_fts_au AFTER UPDATE ON polls_searchdocument
+    BEGIN
+        INSERT INTO polls_search_fts(polls_search_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO polls_search_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+SQLITE_FTS_DROP = [
+    'DROP TRIGGER IF EXISTS polls_search_fts_ai',
+    'DROP TRIGGER IF EXISTS polls_search_fts_ad',
+    'DROP TRIGGER IF EXISTS polls_search_fts_au',
+    'DROP TABLE IF EXISTS polls_search_fts',
+]
+POSTGRES_TRGM = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX polls_search_text_trgm_idx ON polls_searchdocument '
+    'USING gin (text gin_trgm_ops)',
+]
+POSTGRES_TRGM_DROP = ['DROP INDEX IF EXISTS polls_search_text_trgm_idx']
+
+INDEXED_FIELDS = {
+    ('polls', 'Nomination'): ('title',),
+    ('polls', 'Candidate'): ('name',),
+    ('polls', 'JuryMember'): ('name',),
+    tuple(settings.AUTH_USER_MODEL.split('.')): ('username',),
+}
+
+
+def statements(schema_editor, sqlite, postgres):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        # Токенизатор trigram появился в SQLite 3.34; в более старых версиях
+        # поиск идёт LIKE по таблице документов.
+        if connection.Database.sqlite_version_info >= (3, 34):
+            return sqlite
+    elif connection.vendor == 'postgresql':
+        return postgres
+    return []
+
+
+def create_search_index(apps, schema_editor):
+    for sql in statements(schema_editor, SQLITE_FTS, POSTGRES_TRGM):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in statements(schema_editor, SQLITE_FTS_DROP, POSTGRES_TRGM_DROP):
+        schema_editor.execute(sql)
+
+
+def fill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('polls', 'SearchDocument')
+    for (app_label, model_name), fields in INDEXED_FIELDS.items():
+        model = apps.get_model(app_label, model_name)
+        label = f'{app_label}.{model_name}'.lower()
+        rows = model._default_manager.values_list('pk', *fields).order_by()
+        SearchDocument.objects.bulk_create(
+            (
+                SearchDocument(
+                    model=label,
+                    field=field,
+                    object_id=row[0],
+                    text=(value or '').casefold().replace('ё', 'е'),
+                )
+                for row in rows.iterator()
+                for field, value in zip(fields, row[1:])
+            ),
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0008_vote_buckets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Модель')),
+                ('field', models.CharField(max_length=100, verbose_name='Поле')),
+                ('object_id', models.BigIntegerField(verbose_name='Объект')),
+                ('text', models.TextField(verbose_name='Текст')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковый индекс',
+                'constraints': [models.UniqueConstraint(fields=('model', 'field', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Миниатюры фото'),
+        ),
+        migrations.AddField(
+            model_name='historicalcandidate',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Миниатюры фото'),
+        ),
+    ]
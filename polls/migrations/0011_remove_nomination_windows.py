@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0010_candidate_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='nominationtally',
+            name='votes_7d',
+        ),
+        migrations.RemoveField(
+            model_name='nominationtally',
+            name='votes_30d',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0011_remove_nomination_windows'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vote',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Дата голосования'),
+        ),
+        migrations.AlterField(
+            model_name='historicalvote',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Дата голосования'),
+        ),
+    ]
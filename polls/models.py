@@ -2,10 +2,14 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils import timezone
 from django.utils.text import slugify
-from simple_history.models import HistoricalRecords
+
+from .history import ConfigurableHistoricalRecords
+from .slugs import allocate_slugs
 
 User = get_user_model()
 
+ALREADY_VOTED_MESSAGE = "Вы уже голосовали в этой номинации"
+
 
 class Nomination(models.Model):
     title = models.CharField(max_length=255, verbose_name="Название номинации")
@@ -22,12 +26,15 @@ class Nomination(models.Model):
         verbose_name="Создал",
     )
 
-    history = HistoricalRecords()
+    history = ConfigurableHistoricalRecords()
 
     class Meta:
         verbose_name = "Номинация"
         verbose_name_plural = "Номинации"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="nomination_created_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -47,6 +54,11 @@ class Candidate(models.Model):
         null=True,
         verbose_name="Фото кандидата",
     )
+    # {"source": имя фото, "variants": {"256": {"webp": имя, ...}}},
+    # заполняется в фоне (см. polls.thumbnails).
+    thumbnails = models.JSONField(
+        default=dict, blank=True, editable=False, verbose_name="Миниатюры фото"
+    )
     slug = models.SlugField(
         max_length=255, unique=True, blank=True, verbose_name="Slug (автогенерируется)"
     )
@@ -69,12 +81,15 @@ class Candidate(models.Model):
         verbose_name="Последний редактор",
     )
 
-    history = HistoricalRecords()
+    history = ConfigurableHistoricalRecords()
 
     class Meta:
         verbose_name = "Кандидат"
         verbose_name_plural = "Кандидаты"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name", "id"], name="candidate_name_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.nomination})"
@@ -87,15 +102,12 @@ class Candidate(models.Model):
             self.last_modified_by = user
 
         if not self.slug:
-            base = f"{self.name} {self.nomination.title}"
-            self.slug = slugify(base)
-            original = self.slug
-            counter = 1
-            while Candidate.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
-                self.slug = f"{original}-{counter}"
-                counter += 1
+            [self.slug] = allocate_slugs(Candidate, [self.slug_base()], self.pk)
         super().save(*args, **kwargs)
 
+    def slug_base(self):
+        return slugify(f"{self.name} {self.nomination.title}")
+
 
 class FavoriteCandidate(models.Model):
     user = models.ForeignKey(
@@ -129,8 +141,16 @@ class Vote(models.Model):
         related_name="votes",
         verbose_name="Кандидат",
     )
+    nomination = models.ForeignKey(
+        Nomination,
+        on_delete=models.CASCADE,
+        related_name="votes",
+        editable=False,
+        verbose_name="Номинация",
+    )
+    # Не auto_now_add: голос из очереди получает время постановки в очередь.
     created_at = models.DateTimeField(
-        auto_now_add=True, verbose_name="Дата голосования"
+        default=timezone.now, editable=False, verbose_name="Дата голосования"
     )
 
     created_by = models.ForeignKey(
@@ -142,33 +162,190 @@ class Vote(models.Model):
         verbose_name="Создал запись",
     )
 
-    history = HistoricalRecords()
+    history = ConfigurableHistoricalRecords()
 
     class Meta:
         verbose_name = "Голос"
         verbose_name_plural = "Голоса"
         constraints = [
             models.UniqueConstraint(
-                fields=["user", "candidate"], name="unique_vote_per_candidate"
+                fields=["user", "nomination"],
+                name="unique_vote_per_nomination",
+                violation_error_message=ALREADY_VOTED_MESSAGE,
+            ),
+        ]
+        indexes = [
+            # Ключ курсорной пагинации /api/votes/ (список всегда по user).
+            models.Index(
+                fields=["user", "created_at", "id"], name="vote_user_created_id_idx"
+            ),
+            # Пересчёт окон «голосов за N дней» по номинациям.
+            models.Index(
+                fields=["nomination", "created_at"], name="vote_nomination_created_idx"
             ),
         ]
 
+    # Кандидат голоса на момент загрузки из базы или последнего сохранения.
+    _saved_candidate_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_candidate_id = instance.__dict__.get("candidate_id")
+        return instance
+
     def clean(self):
-        from django.core.exceptions import ValidationError
+        # Номинация нужна до validate_constraints, который full_clean
+        # вызывает после clean.
+        if self.candidate_id:
+            self.nomination_id = self.candidate.nomination_id
+
+    def validate_constraints(self, exclude=None):
+        # Номинации нет в формах — она выводится из кандидата, поэтому
+        # ограничение по ней проверяется и тогда, когда форма её исключила.
+        if exclude and self.candidate_id:
+            exclude = set(exclude) - {"nomination"}
+        super().validate_constraints(exclude=exclude)
 
+    def save(self, *args, **kwargs):
+        # Номинация дублируется из кандидата, чтобы правило «один голос в
+        # номинации» проверялось уникальным индексом, а не запросом. Кандидат
+        # читается из базы, только если номинация не задана или кандидат
+        # сменился и не загружен.
         if (
-            Vote.objects.filter(
-                user=self.user, candidate__nomination=self.candidate.nomination
-            )
-            .exclude(pk=self.pk)
-            .exists()
+            self.nomination_id is None
+            or self.candidate_id != self._saved_candidate_id
+            or Vote.candidate.is_cached(self)
         ):
-            raise ValidationError("Вы уже голосовали в этой номинации")
+            self.nomination_id = self.candidate.nomination_id
+        super().save(*args, **kwargs)
+        self._saved_candidate_id = self.candidate_id
 
     def __str__(self):
         return f"{self.user} → {self.candidate}"
 
 
+class VoteAuditLog(models.Model):
+    """Компактный журнал изменений голосов, только добавление записей.
+
+    Идентификаторы хранятся без внешних ключей: записи переживают удаление
+    голоса, кандидата или пользователя и не требуют проверок FK при вставке.
+    """
+
+    CREATED = "+"
+    CHANGED = "~"
+    DELETED = "-"
+    ACTION_CHOICES = [
+        (CREATED, "Создан"),
+        (CHANGED, "Изменён"),
+        (DELETED, "Удалён"),
+    ]
+
+    vote_id = models.BigIntegerField(db_index=True, verbose_name="Голос")
+    user_id = models.BigIntegerField(verbose_name="Пользователь")
+    candidate_id = models.BigIntegerField(verbose_name="Кандидат")
+    action = models.CharField(
+        max_length=1, choices=ACTION_CHOICES, verbose_name="Действие"
+    )
+    ts = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Время")
+
+    class Meta:
+        verbose_name = "Запись журнала голосов"
+        verbose_name_plural = "Журнал голосов"
+
+    def __str__(self):
+        return f"{self.action} {self.vote_id}: {self.user_id} → {self.candidate_id}"
+
+
+class CandidateTally(models.Model):
+    candidate = models.OneToOneField(
+        Candidate,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="tally",
+        verbose_name="Кандидат",
+    )
+    vote_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Кол-во голосов"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        verbose_name = "Счётчик голосов кандидата"
+        verbose_name_plural = "Счётчики голосов кандидатов"
+
+    def __str__(self):
+        return f"{self.candidate_id}: {self.vote_count}"
+
+
+class NominationTally(models.Model):
+    nomination = models.OneToOneField(
+        Nomination,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="tally",
+        verbose_name="Номинация",
+    )
+    candidate_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Кандидатов"
+    )
+    jury_count = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Членов жюри"
+    )
+    total_votes = models.PositiveIntegerField(
+        default=0, db_index=True, verbose_name="Всего голосов"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        verbose_name = "Показатели номинации"
+        verbose_name_plural = "Показатели номинаций"
+
+    def __str__(self):
+        return f"{self.nomination_id}: {self.total_votes}"
+
+
+class VoteBucket(models.Model):
+    """Голоса кандидата за один час (начало часа в UTC).
+
+    Ведётся вместе со счётчиками; графики и окна «за N дней» читают эти
+    строки вместо таблицы голосов (см. polls.buckets).
+    """
+
+    candidate = models.ForeignKey(
+        Candidate,
+        on_delete=models.CASCADE,
+        related_name="buckets",
+        verbose_name="Кандидат",
+    )
+    nomination = models.ForeignKey(
+        Nomination,
+        on_delete=models.CASCADE,
+        related_name="buckets",
+        verbose_name="Номинация",
+    )
+    hour = models.DateTimeField(verbose_name="Час")
+    vote_count = models.PositiveIntegerField(default=0, verbose_name="Кол-во голосов")
+
+    class Meta:
+        verbose_name = "Голоса за час"
+        verbose_name_plural = "Голоса по часам"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["candidate", "hour"], name="unique_vote_bucket"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["nomination", "hour"], name="vote_bucket_nom_hour_idx"
+            ),
+            models.Index(fields=["hour"], name="vote_bucket_hour_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.candidate_id} @ {self.hour:%Y-%m-%d %H:00}: {self.vote_count}"
+
+
 class JuryMember(models.Model):
     name = models.CharField(max_length=255, verbose_name="Имя члена жюри")
     nominations = models.ManyToManyField(
@@ -177,7 +354,7 @@ class JuryMember(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
 
-    history = HistoricalRecords()
+    history = ConfigurableHistoricalRecords()
 
     class Meta:
         verbose_name = "Член жюри"
@@ -186,3 +363,25 @@ class JuryMember(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class SearchDocument(models.Model):
+    """Нормализованный текст одного поля объекта для поиска по индексу
+    (FTS5 trigram в SQLite, pg_trgm в PostgreSQL, см. polls.search)."""
+
+    model = models.CharField(max_length=100, verbose_name="Модель")
+    field = models.CharField(max_length=100, verbose_name="Поле")
+    object_id = models.BigIntegerField(verbose_name="Объект")
+    text = models.TextField(verbose_name="Текст")
+
+    class Meta:
+        verbose_name = "Поисковый документ"
+        verbose_name_plural = "Поисковый индекс"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "field", "object_id"], name="unique_search_document"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model}.{self.field} #{self.object_id}"
@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+INVALID_CURSOR_MESSAGE = "Неверный курсор"
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу из индексированных полей.
+
+    Следующая страница выбирается условием ``(поле, id) > (последнее
+    значение)`` вместо OFFSET и без ``COUNT(*)``, поэтому глубина страницы
+    не влияет на время запроса. Курсор в ``next`` кодирует ключ последней
+    строки и остаётся корректным при вставке новых строк.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering
+        ]
+
+        queryset = queryset.order_by(*self.ordering)
+        key = self.decode_cursor(request)
+        if key is not None:
+            queryset = queryset.filter(self.after(key))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def after(self, key):
+        # Лексикографическое сравнение кортежей: (a > x) или (a = x и b > y)...
+        conditions = []
+        for position, (name, value) in enumerate(zip(self.ordering, key)):
+            lookup = "lt" if name.startswith("-") else "gt"
+            equal = {
+                field.attname: key[index]
+                for index, field in enumerate(self.fields[:position])
+            }
+            conditions.append(
+                Q(**equal, **{f"{self.fields[position].attname}__{lookup}": value})
+            )
+        return reduce(or_, conditions)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if not isinstance(raw, list) or len(raw) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, raw)]
+        except (binascii.Error, UnicodeDecodeError, ValueError, DjangoValidationError):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+
+    def encode_cursor(self, row):
+        raw = [field.value_to_string(row) for field in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class VoteKeysetPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class CandidateKeysetPagination(KeysetPagination):
+    ordering = ("name", "id")
+    page_size = 12
+    max_page_size = 50
+
+
+class NominationKeysetPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class SelectablePaginationMixin:
+    """Выбор пагинации для эндпоинта ViewSet.
+
+    ``?pagination=cursor`` (или переданный ``cursor``) включает
+    ``cursor_pagination_class``, ``?pagination=page`` — обычную постраничную.
+    Режим по умолчанию задаётся в ``POLLS_PAGINATION_MODES`` по basename.
+    """
+
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        if self.cursor_pagination_class is None or self.request is None:
+            return False
+        params = self.request.query_params
+        mode = params.get("pagination")
+        if mode is None:
+            if KeysetPagination.cursor_query_param in params:
+                return True
+            modes = getattr(settings, "POLLS_PAGINATION_MODES", {})
+            mode = modes.get(self.basename, "page")
+        return mode == "cursor"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,148 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import RawSQL
+
+from .models import SearchDocument
+
+# Проиндексированные поля: модель (``app_label.model_name``) → поля.
+INDEXED_FIELDS = {
+    "polls.nomination": ("title",),
+    "polls.candidate": ("name",),
+    "polls.jurymember": ("name",),
+    settings.AUTH_USER_MODEL.lower(): ("username",),
+}
+# Таблица FTS5 с токенизатором trigram (SQLite 3.34+), см. миграцию 0009.
+FTS_TABLE = "polls_search_fts"
+# Более короткие слова trigram-индекс не находит: для них LIKE по документам.
+MIN_TRIGRAM_LENGTH = 3
+BATCH_SIZE = 500
+
+
+def normalize(text):
+    """Текст для индекса и запроса: casefold работает и для кириллицы,
+    в отличие от LIKE в SQLite; «ё» ищется как «е»."""
+    return (text or "").casefold().replace("ё", "е")
+
+
+def indexed_fields(model):
+    return INDEXED_FIELDS.get(model._meta.label_lower, ())
+
+
+def uses_fts(connection):
+    return connection.vendor == "sqlite" and (
+        connection.Database.sqlite_version_info >= (3, 34)
+    )
+
+
+def documents(objs, fields=None):
+    for obj in objs:
+        for field in indexed_fields(type(obj)):
+            if fields is None or field in fields:
+                yield SearchDocument(
+                    model=obj._meta.label_lower,
+                    field=field,
+                    object_id=obj.pk,
+                    text=normalize(getattr(obj, field)),
+                )
+
+
+def index_objects(objs, fields=None):
+    """Добавляет или обновляет документы объектов (только ``fields``, если
+    заданы) одним upsert на пачку."""
+    SearchDocument.objects.bulk_create(
+        documents(objs, fields),
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["model", "field", "object_id"],
+        update_fields=["text"],
+    )
+
+
+def unindex_objects(model, pks):
+    SearchDocument.objects.filter(
+        model=model._meta.label_lower,
+        field__in=indexed_fields(model),
+        object_id__in=pks,
+    ).delete()
+
+
+def rebuild_index():
+    """Пересобирает индекс по всем проиндексированным моделям. Возвращает
+    число проиндексированных объектов."""
+    total = 0
+    SearchDocument.objects.all().delete()
+    for label, fields in INDEXED_FIELDS.items():
+        objs = apps.get_model(label)._default_manager.only("pk", *fields).order_by()
+        batch = []
+        for obj in objs.iterator(BATCH_SIZE):
+            batch.append(obj)
+            if len(batch) == BATCH_SIZE:
+                index_objects(batch)
+                total += len(batch)
+                batch = []
+        index_objects(batch)
+        total += len(batch)
+    return total
+
+
+def matching_ids(model, field, term):
+    """Подзапрос pk объектов ``model``, у которых ``field`` содержит ``term``."""
+    term = normalize(term)
+    label = model._meta.label_lower
+    connection = connections[router.db_for_read(SearchDocument)]
+    if uses_fts(connection) and len(term) >= MIN_TRIGRAM_LENGTH:
+        # Унарный «+» не даёт SQLite выбрать индекс (model, field) и
+        # перебирать все документы модели: строки берутся по rowid из FTS.
+        return RawSQL(
+            f"SELECT object_id FROM {SearchDocument._meta.db_table} "
+            f"WHERE id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s) "
+            "AND +model = %s AND +field = %s",
+            ['"{}"'.format(term.replace('"', '""')), label, field],
+        )
+    # В PostgreSQL LIKE '%…%' по нормализованному тексту обслуживает
+    # GIN-индекс pg_trgm.
+    return SearchDocument.objects.filter(
+        model=label, field=field, text__contains=term
+    ).values("object_id")
+
+
+def field_q(model, path, term):
+    """Условие поиска ``term`` по пути поля (``name``, ``nomination__title``)
+    через индекс; ``None``, если поле не проиндексировано."""
+    *relations, name = path.split(LOOKUP_SEP)
+    target = model
+    try:
+        for relation in relations:
+            field = target._meta.get_field(relation)
+            if not field.is_relation:
+                return None
+            target = field.related_model
+    except FieldDoesNotExist:
+        return None
+    if name not in indexed_fields(target):
+        return None
+    lookup = LOOKUP_SEP.join([*relations, "pk", "in"])
+    return Q(**{lookup: matching_ids(target, name, term)})
+
+
+def search_q(model, paths, terms, fallback):
+    """Условие в духе SearchFilter: каждое слово должно найтись хотя бы в
+    одном поле. Для непроиндексированных полей ``fallback(path)`` возвращает
+    обычный ORM-lookup."""
+    conditions = []
+    for term in terms:
+        queries = []
+        for path in paths:
+            query = field_q(model, path, term)
+            if query is None:
+                query = Q(**{fallback(path): term})
+            queries.append(query)
+        conditions.append(reduce(or_, queries))
+    return reduce(and_, conditions)
@@ -1,7 +1,10 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Candidate, JuryMember, Nomination, Vote
+from . import thumbnails, voted
+from .models import ALREADY_VOTED_MESSAGE, Candidate, JuryMember, Nomination, Vote
 
 
 class NominationSerializer(serializers.ModelSerializer):
@@ -19,7 +22,7 @@ class NominationSerializer(serializers.ModelSerializer):
             created_at = timezone.now()
             updated_at = instance.get("updated_at", created_at)
 
-        if created_at >= updated_at:
+        if created_at > updated_at:
             raise serializers.ValidationError(
                 {
                     "created_at": "Дата создания должна быть раньше даты обновления",
@@ -33,6 +36,7 @@ class NominationSerializer(serializers.ModelSerializer):
 class CandidateSerializer(serializers.ModelSerializer):
     nomination = NominationSerializer(read_only=True)
     photo_url = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = Candidate
@@ -43,6 +47,11 @@ class CandidateSerializer(serializers.ModelSerializer):
             return obj.photo.url
         return None
 
+    def get_thumbnails(self, obj):
+        # {"64": {"webp": url, "jpeg": url}, ...}; пусто, пока миниатюры
+        # создаются в фоне.
+        return thumbnails.thumbnail_urls(obj)
+
 
 class VoteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -50,15 +59,19 @@ class VoteSerializer(serializers.ModelSerializer):
         fields = ("id", "candidate", "created_at")
         read_only_fields = ("created_at",)
 
-    def validate(self, attrs):
-        user = self.context["request"].user
-        candidate = attrs["candidate"]
-        nomination = candidate.nomination
-
-        if Vote.objects.filter(user=user, candidate__nomination=nomination).exists():
-            raise serializers.ValidationError("Вы уже голосовали в этой номинации")
-
-        return attrs
+    def save(self, **kwargs):
+        # Повтор отсекается по индексу голосов пользователя без запроса;
+        # окончательно правило «один голос в номинации» проверяет уникальный
+        # индекс unique_vote_per_nomination, поэтому голос — один INSERT.
+        user = kwargs.get("user")
+        candidate = self.validated_data["candidate"]
+        if self.instance is None and voted.has_voted(user, candidate.nomination_id):
+            raise serializers.ValidationError(ALREADY_VOTED_MESSAGE)
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            raise serializers.ValidationError(ALREADY_VOTED_MESSAGE)
 
 
 class JuryMemberSerializer(serializers.ModelSerializer):
@@ -69,3 +82,30 @@ class JuryMemberSerializer(serializers.ModelSerializer):
     class Meta:
         model = JuryMember
         fields = ("id", "name", "nominations")
+
+
+class BulkVoteItemSerializer(serializers.Serializer):
+    candidate = serializers.IntegerField()
+    user = serializers.IntegerField(required=False)
+
+
+class BulkVoteSerializer(serializers.Serializer):
+    votes = serializers.ListField(
+        child=BulkVoteItemSerializer(),
+        allow_empty=False,
+        max_length=settings.POLLS_BULK_VOTE_MAX_ITEMS,
+    )
+
+
+class BulkCandidateItemSerializer(serializers.Serializer):
+    # Номинации проверяются одним запросом на всю пачку в create_candidates.
+    nomination = serializers.IntegerField()
+    name = serializers.CharField(max_length=255)
+
+
+class BulkCandidateSerializer(serializers.Serializer):
+    candidates = serializers.ListField(
+        child=BulkCandidateItemSerializer(),
+        allow_empty=False,
+        max_length=settings.POLLS_BULK_CANDIDATE_MAX_ITEMS,
+    )
@@ -0,0 +1,269 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import audit, search, tallies, thumbnails, voted
+from .cache import invalidate_nominations
+from .models import (
+    Candidate,
+    JuryMember,
+    Nomination,
+    NominationTally,
+    Vote,
+    VoteAuditLog,
+)
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Vote)
+def remember_vote_candidate(sender, instance, **kwargs):
+    instance._previous_candidate = None
+    if instance.pk:
+        instance._previous_candidate = (
+            Vote.objects.filter(pk=instance.pk)
+            .values_list("candidate_id", "nomination_id")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Vote)
+def count_saved_vote(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    candidate_id = instance.candidate_id
+    nomination_id = instance.nomination_id
+    previous = getattr(instance, "_previous_candidate", None)
+    if created or previous is None:
+        tallies.apply_vote(candidate_id, nomination_id, 1, instance.created_at)
+    elif previous[0] != candidate_id:
+        tallies.apply_vote(previous[0], previous[1], -1, instance.created_at)
+        tallies.apply_vote(candidate_id, nomination_id, 1, instance.created_at)
+
+
+@receiver(post_delete, sender=Vote)
+def uncount_deleted_vote(sender, instance, **kwargs):
+    tallies.apply_vote(
+        instance.candidate_id, instance.nomination_id, -1, instance.created_at
+    )
+
+
+@receiver(post_save, sender=Vote)
+def audit_saved_vote(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        action = VoteAuditLog.CREATED if created else VoteAuditLog.CHANGED
+        audit.log_votes([instance], action)
+
+
+@receiver(post_delete, sender=Vote)
+def audit_deleted_vote(sender, instance, **kwargs):
+    audit.log_votes([instance], VoteAuditLog.DELETED)
+
+
+@receiver(post_save, sender=Vote)
+def index_saved_vote(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        voted.record_votes([instance])
+    elif getattr(instance, "_previous_candidate", None) != (
+        instance.candidate_id,
+        instance.nomination_id,
+    ):
+        voted.forget_users([instance.user_id])
+
+
+@receiver(post_delete, sender=Vote)
+def unindex_deleted_vote(sender, instance, **kwargs):
+    voted.forget_users([instance.user_id])
+
+
+@receiver(pre_save, sender=Candidate)
+def remember_candidate_nomination(sender, instance, **kwargs):
+    instance._previous_nomination_id = None
+    if instance.pk:
+        instance._previous_nomination_id = (
+            Candidate.objects.filter(pk=instance.pk)
+            .values_list("nomination_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Candidate)
+def move_candidate_votes(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, "_previous_nomination_id", None)
+    if raw:
+        return
+    if created:
+        tallies.apply_nomination_changes(instance.nomination_id, {"candidate_count": 1})
+        return
+    if previous is None or previous == instance.nomination_id:
+        return
+    moved = instance.votes.aggregate(total_votes=Count("id"))
+    voted.forget_users(instance.votes.values_list("user_id", flat=True))
+    instance.votes.update(nomination_id=instance.nomination_id)
+    instance.buckets.update(nomination_id=instance.nomination_id)
+    tallies.apply_nomination_changes(
+        previous,
+        {"candidate_count": -1, **{name: -count for name, count in moved.items()}},
+    )
+    tallies.apply_nomination_changes(
+        instance.nomination_id, {"candidate_count": 1, **moved}
+    )
+
+
+@receiver(post_save, sender=Candidate)
+def touch_candidate_nomination(sender, instance, created, raw=False, **kwargs):
+    # Переименование или новое фото не меняют показателей, но должны сменить
+    # версию номинации для условных GET.
+    if not created and not raw:
+        tallies.touch_nominations(instance.nomination_id)
+
+
+@receiver(post_delete, sender=Candidate)
+def uncount_deleted_candidate(sender, instance, **kwargs):
+    tallies.apply_nomination_changes(instance.nomination_id, {"candidate_count": -1})
+
+
+@receiver(post_save, sender=Nomination)
+def create_nomination_tally(sender, instance, created, raw=False, **kwargs):
+    # Строка показателей есть у каждой номинации, поэтому фильтры по ней
+    # обходятся без COALESCE.
+    if created and not raw:
+        NominationTally.objects.get_or_create(nomination=instance)
+
+
+@receiver(m2m_changed, sender=JuryMember.nominations.through)
+def count_jury_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # После очистки связей уже не узнать, какие номинации затронуты.
+        if reverse:
+            instance._cleared_jury = {instance.pk: instance.jury_members.count()}
+        else:
+            instance._cleared_jury = dict.fromkeys(
+                instance.nominations.values_list("pk", flat=True), 1
+            )
+        return
+    if action == "pre_remove" and pk_set:
+        # pk_set удаления содержит и переданные id, которых не было в связях.
+        if reverse:
+            instance._removed_jury = {
+                instance.pk: sender.objects.filter(
+                    nomination_id=instance.pk, jurymember_id__in=pk_set
+                ).count()
+            }
+        else:
+            instance._removed_jury = dict.fromkeys(
+                sender.objects.filter(
+                    jurymember_id=instance.pk, nomination_id__in=pk_set
+                ).values_list("nomination_id", flat=True),
+                1,
+            )
+        return
+    if action == "post_clear":
+        changes = getattr(instance, "_cleared_jury", {})
+        sign = -1
+    elif action == "post_remove" and pk_set:
+        changes = getattr(instance, "_removed_jury", {})
+        sign = -1
+    elif action == "post_add" and pk_set:
+        sign = 1
+        if reverse:
+            changes = {instance.pk: len(pk_set)}
+        else:
+            changes = dict.fromkeys(pk_set, 1)
+    else:
+        return
+    for nomination_id, count in changes.items():
+        tallies.apply_nomination_changes(nomination_id, {"jury_count": sign * count})
+
+
+@receiver(pre_delete, sender=JuryMember)
+def remember_jury_nominations(sender, instance, **kwargs):
+    instance._jury_nominations = list(instance.nominations.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=JuryMember)
+def uncount_deleted_jury(sender, instance, **kwargs):
+    for nomination_id in getattr(instance, "_jury_nominations", []):
+        tallies.apply_nomination_changes(nomination_id, {"jury_count": -1})
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+def invalidate_vote_responses(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_candidate", None)
+    invalidate_nominations(
+        instance.nomination_id, previous and previous[1], lists=False
+    )
+
+
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def invalidate_candidate_responses(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_nomination_id", None)
+    invalidate_nominations(instance.nomination_id, previous)
+
+
+@receiver(post_save, sender=Nomination)
+@receiver(post_delete, sender=Nomination)
+def invalidate_nomination_responses(sender, instance, **kwargs):
+    invalidate_nominations(instance.pk)
+
+
+@receiver(post_delete, sender=JuryMember)
+def invalidate_jury_responses(sender, instance, **kwargs):
+    invalidate_nominations()
+
+
+@receiver(m2m_changed, sender=JuryMember.nominations.through)
+def invalidate_jury_nominations(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        invalidate_nominations(instance.pk)
+    elif pk_set:
+        invalidate_nominations(*pk_set)
+    else:
+        invalidate_nominations()
+
+
+@receiver(post_save, sender=Nomination)
+@receiver(post_save, sender=Candidate)
+@receiver(post_save, sender=JuryMember)
+@receiver(post_save, sender=User)
+def index_saved_object(sender, instance, update_fields=None, **kwargs):
+    # Сохранения без поисковых полей (например, last_login) индекс не трогают.
+    search.index_objects([instance], update_fields)
+
+
+@receiver(post_delete, sender=Nomination)
+@receiver(post_delete, sender=Candidate)
+@receiver(post_delete, sender=JuryMember)
+@receiver(post_delete, sender=User)
+def unindex_deleted_object(sender, instance, **kwargs):
+    search.unindex_objects(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Candidate)
+def schedule_candidate_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.photo:
+        thumbnails.schedule_thumbnails(instance)
+    elif instance.thumbnails:
+        thumbnails.clear_thumbnails(instance)
+
+
+@receiver(post_delete, sender=Candidate)
+def delete_candidate_thumbnails(sender, instance, **kwargs):
+    if instance.thumbnails:
+        transaction.on_commit(lambda: thumbnails.delete_thumbnails(instance))
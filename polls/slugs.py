@@ -0,0 +1,47 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+# Сколько разных основ проверять одним запросом (OR из условий по slug).
+BASES_PER_QUERY = 200
+
+
+def taken_slugs(model, bases, exclude_pk=None):
+    """Занятые slug вида ``основа`` и ``основа-N`` для всех основ сразу."""
+    bases = list(bases)
+    taken = set()
+    for start in range(0, len(bases), BASES_PER_QUERY):
+        chunk = bases[start : start + BASES_PER_QUERY]
+        condition = reduce(
+            or_, (Q(slug=base) | Q(slug__startswith=f"{base}-") for base in chunk)
+        )
+        queryset = model.objects.filter(condition)
+        if exclude_pk is not None:
+            queryset = queryset.exclude(pk=exclude_pk)
+        taken.update(queryset.values_list("slug", flat=True))
+    return taken
+
+
+def allocate_slugs(model, bases, exclude_pk=None):
+    """Подбирает уникальные slug для списка основ.
+
+    Занятые варианты читаются одним запросом, дальше счётчики подбираются
+    в памяти, поэтому число запросов не зависит от числа совпадающих имён.
+    Одинаковые основы в списке получают ``основа``, ``основа-1``, ``основа-2``...
+    """
+    taken = taken_slugs(model, set(bases), exclude_pk)
+    counters = {}
+    slugs = []
+    for base in bases:
+        slug = base
+        if slug in taken:
+            # Первый свободный номер, как и при последовательном переборе.
+            counter = counters.get(base, 1)
+            while f"{base}-{counter}" in taken:
+                counter += 1
+            counters[base] = counter + 1
+            slug = f"{base}-{counter}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
@@ -0,0 +1,381 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import buckets
+from .models import (
+    Candidate,
+    CandidateTally,
+    JuryMember,
+    Nomination,
+    NominationTally,
+    Vote,
+    VoteBucket,
+)
+
+NOMINATION_METRICS = ("candidate_count", "jury_count", "total_votes")
+# Окна для «свежих» голосов: показатель → число дней. Считаются при чтении,
+# а не хранятся: иначе выпавшие из окна голоса учитывал бы только пересчёт по
+# расписанию.
+RECENT_WINDOWS = {"votes_7d": 7, "votes_30d": 30}
+
+
+def window_start(days, now=None):
+    """Начало окна «за N дней», выровненное по часу: так окно состоит из
+    целых корзин VoteBucket и считается по ним точно."""
+    return buckets.bucket_start((now or timezone.now()) - timedelta(days=days))
+
+
+def tally_enabled():
+    return getattr(settings, "POLLS_USE_VOTE_TALLY", False)
+
+
+def with_vote_count(queryset, name="vote_count"):
+    """Аннотирует кандидатов количеством голосов из счётчика или из голосов.
+
+    Без счётчиков число считается коррелированным подзапросом, а не JOIN +
+    GROUP BY: другие соединения запроса не искажают результат.
+    """
+    if tally_enabled():
+        return queryset.annotate(**{name: Coalesce(F("tally__vote_count"), Value(0))})
+    votes = (
+        Vote.objects.filter(candidate=OuterRef("pk"))
+        .order_by()
+        .values("candidate")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return queryset.annotate(**{name: Coalesce(Subquery(votes), Value(0))})
+
+
+def candidate_vote_count(candidate):
+    if tally_enabled():
+        tally = (
+            CandidateTally.objects.filter(candidate=candidate)
+            .values_list("vote_count", flat=True)
+            .first()
+        )
+        return tally or 0
+    return candidate.votes.count()
+
+
+async def acandidate_vote_count(candidate):
+    if tally_enabled():
+        tally = (
+            await CandidateTally.objects.filter(candidate=candidate)
+            .values_list("vote_count", flat=True)
+            .afirst()
+        )
+        return tally or 0
+    return await candidate.votes.acount()
+
+
+def nomination_vote_stats(nomination):
+    """Голоса по кандидатам номинации в формате ``candidate__name`` / ``total``."""
+    if tally_enabled():
+        return (
+            CandidateTally.objects.filter(
+                candidate__nomination=nomination, vote_count__gt=0
+            )
+            .values("candidate__name")
+            .annotate(total=F("vote_count"))
+        )
+    return (
+        Vote.objects.filter(nomination=nomination)
+        .values("candidate__name")
+        .annotate(total=Count("id"))
+    )
+
+
+def with_nomination_metrics(queryset):
+    """Аннотирует номинации показателями ``NOMINATION_METRICS`` и голосами
+    за окна ``RECENT_WINDOWS``.
+
+    Из таблицы показателей это простые поля соединённой строки, по которым
+    работают индексы, а окна — суммы часовых корзин номинации; без счётчиков
+    всё считается по связям.
+    """
+    if tally_enabled():
+        return queryset.annotate(
+            **{name: F(f"tally__{name}") for name in NOMINATION_METRICS},
+            **recent_bucket_votes(),
+        )
+    now = timezone.now()
+    return queryset.annotate(
+        candidate_count=Count("candidates", distinct=True),
+        jury_count=Count("jury_members", distinct=True),
+        total_votes=Count("votes", distinct=True),
+        **{
+            name: Count(
+                "votes",
+                filter=Q(votes__created_at__gte=window_start(days, now)),
+                distinct=True,
+            )
+            for name, days in RECENT_WINDOWS.items()
+        },
+    )
+
+
+def recent_bucket_votes():
+    """Подзапросы голосов номинации за окна ``RECENT_WINDOWS`` по часовым
+    корзинам (индекс по номинации и часу)."""
+    now = timezone.now()
+    return {
+        name: Coalesce(
+            Subquery(
+                VoteBucket.objects.filter(
+                    nomination=OuterRef("pk"), hour__gte=window_start(days, now)
+                )
+                .order_by()
+                .values("nomination")
+                .annotate(total=Sum("vote_count"))
+                .values("total")
+            ),
+            Value(0),
+        )
+        for name, days in RECENT_WINDOWS.items()
+    }
+
+
+def nomination_metrics(nomination_id):
+    """Полный пересчёт показателей одной номинации."""
+    metrics = Vote.objects.filter(nomination_id=nomination_id).aggregate(
+        total_votes=Count("id")
+    )
+    metrics["candidate_count"] = Candidate.objects.filter(
+        nomination_id=nomination_id
+    ).count()
+    metrics["jury_count"] = JuryMember.nominations.through.objects.filter(
+        nomination_id=nomination_id
+    ).count()
+    return metrics
+
+
+def _bump(model, key, pk, changes, recount):
+    changes = {field: delta for field, delta in changes.items() if delta}
+    if not changes:
+        return
+    now = timezone.now()
+    # Счётчики не уходят ниже нуля, даже если удаление пришло по устаревшему
+    # экземпляру голоса.
+    values = {
+        field: Greatest(F(field) + delta, Value(0)) for field, delta in changes.items()
+    }
+    updated = model.objects.filter(**{key: pk}).update(**values, updated_at=now)
+    if updated or not any(delta > 0 for delta in changes.values()):
+        return
+    # Строки счётчика ещё нет: создаём её с полным пересчётом, который уже
+    # учитывает только что записанные изменения.
+    try:
+        with transaction.atomic():
+            model.objects.create(**{key: pk}, **recount())
+    except IntegrityError:
+        model.objects.filter(**{key: pk}).update(**values, updated_at=now)
+
+
+def apply_vote_deltas(candidate_deltas, nomination_deltas):
+    """Применяет изменения счётчиков: ``{candidate_id: delta}`` для кандидатов
+    и ``{nomination_id: {показатель: delta}}`` для номинаций."""
+    for candidate_id, delta in candidate_deltas.items():
+        _bump(
+            CandidateTally,
+            "candidate_id",
+            candidate_id,
+            {"vote_count": delta},
+            lambda: {
+                "vote_count": Vote.objects.filter(candidate_id=candidate_id).count()
+            },
+        )
+    for nomination_id, changes in nomination_deltas.items():
+        apply_nomination_changes(nomination_id, changes)
+
+
+def apply_nomination_changes(nomination_id, changes):
+    _bump(
+        NominationTally,
+        "nomination_id",
+        nomination_id,
+        changes,
+        lambda: nomination_metrics(nomination_id),
+    )
+
+
+def touch_nominations(*nomination_ids):
+    """Сдвигает отметку изменения номинаций без изменения показателей: по ней
+    API отвечает на условные GET (polls.conditional)."""
+    NominationTally.objects.filter(nomination_id__in=nomination_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+def apply_vote(candidate_id, nomination_id, delta, created_at=None):
+    apply_vote_deltas({candidate_id: delta}, {nomination_id: {"total_votes": delta}})
+    hour = buckets.bucket_start(created_at or timezone.now())
+    buckets.apply_bucket_deltas({(candidate_id, nomination_id, hour): delta})
+
+
+def count_votes(nomination_ids=None):
+    """Голоса одним сгруппированным запросом: строки ``(кандидат, номинация,
+    количество)``, читаемые потоком через ``iterator()``."""
+    rows = Vote.objects.all()
+    if nomination_ids is not None:
+        rows = rows.filter(nomination_id__in=nomination_ids)
+    rows = (
+        rows.values_list("candidate_id", "nomination_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    return rows.iterator()
+
+
+def lock_tallies(nomination_ids=None):
+    """Блокирует до конца транзакции номинации (все или указанные) и их
+    счётчики перед пересчётом.
+
+    Голос, пришедший во время пересчёта, ждёт блокировку и применяет своё
+    изменение счётчика поверх записанного итога, а не теряется. Порядок
+    блокировок тот же, что у записи голоса: номинация (внешний ключ), счётчик
+    кандидата, показатели номинации. SQLite блокировку строк не
+    поддерживает: там базу для других писателей блокирует первое изменение —
+    отметка времени показателей.
+    """
+    nominations = Nomination.objects.all()
+    candidate_tallies = CandidateTally.objects.select_for_update(of=("self",))
+    nomination_tallies = NominationTally.objects.all()
+    if nomination_ids is not None:
+        nominations = nominations.filter(pk__in=nomination_ids)
+        candidate_tallies = candidate_tallies.filter(
+            candidate__nomination_id__in=nomination_ids
+        )
+        nomination_tallies = nomination_tallies.filter(nomination_id__in=nomination_ids)
+    for queryset in (
+        nominations.select_for_update(),
+        candidate_tallies,
+        nomination_tallies.select_for_update(),
+    ):
+        list(queryset.values_list("pk", flat=True).order_by("pk"))
+    nomination_tallies.update(updated_at=timezone.now())
+
+
+def recount_tallies(nomination_ids=None):
+    """Пересчитывает счётчики кандидатов и показатели номинаций (все или
+    указанных номинаций): подсчёт и запись — в одной транзакции после
+    ``lock_tallies``. Возвращает ``Counter`` голосов по кандидатам."""
+    candidate_counts = Counter()
+    with transaction.atomic():
+        lock_tallies(nomination_ids)
+        for candidate_id, _, total in count_votes(nomination_ids):
+            candidate_counts[candidate_id] += total
+        write_tallies(candidate_counts, nomination_ids)
+    return candidate_counts
+
+
+def write_tallies(candidate_counts, nomination_ids=None):
+    """Записывает посчитанные счётчики кандидатов (всех или только кандидатов
+    указанных номинаций) и пересчитывает показатели номинаций.
+
+    Голоса должны быть посчитаны в той же транзакции после ``lock_tallies``.
+    Строки меняются на месте, а не пересоздаются: изменения голосов, которые
+    ждут блокировку, применятся к новым значениям.
+    """
+    candidate_tallies = CandidateTally.objects.all()
+    if nomination_ids is not None:
+        candidate_tallies = candidate_tallies.filter(
+            candidate__nomination_id__in=nomination_ids
+        )
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = set()
+        changed = []
+        for tally in candidate_tallies.only("candidate_id", "vote_count"):
+            existing.add(tally.candidate_id)
+            total = candidate_counts.get(tally.candidate_id, 0)
+            if tally.vote_count != total:
+                tally.vote_count = total
+                tally.updated_at = now
+                changed.append(tally)
+        CandidateTally.objects.bulk_update(
+            changed, ["vote_count", "updated_at"], batch_size=1000
+        )
+        CandidateTally.objects.bulk_create(
+            (
+                CandidateTally(candidate_id=pk, vote_count=total)
+                for pk, total in candidate_counts.items()
+                if pk not in existing
+            ),
+            batch_size=1000,
+        )
+        rebuild_nomination_metrics(nomination_ids)
+
+
+def rebuild_nomination_metrics(nomination_ids=None):
+    """Пересчитывает показатели всех или указанных номинаций тремя
+    сгруппированными запросами в транзакции после ``lock_tallies``."""
+    with transaction.atomic():
+        lock_tallies(nomination_ids)
+        metrics = count_nomination_metrics(nomination_ids)
+        tallies = NominationTally.objects.all()
+        if nomination_ids is not None:
+            tallies = tallies.filter(nomination_id__in=nomination_ids)
+        now = timezone.now()
+        changed = []
+        for tally in tallies:
+            row = metrics[tally.nomination_id]
+            if any(getattr(tally, name) != row[name] for name in NOMINATION_METRICS):
+                for name in NOMINATION_METRICS:
+                    setattr(tally, name, row[name])
+                tally.updated_at = now
+                changed.append(tally)
+        NominationTally.objects.bulk_update(
+            changed, [*NOMINATION_METRICS, "updated_at"], batch_size=500
+        )
+        existing = {tally.nomination_id for tally in tallies}
+        NominationTally.objects.bulk_create(
+            (
+                NominationTally(nomination_id=pk, **row)
+                for pk, row in metrics.items()
+                if pk not in existing
+            ),
+            batch_size=500,
+        )
+    return metrics
+
+
+def count_nomination_metrics(nomination_ids=None):
+    nominations = Nomination.objects.all()
+    votes = Vote.objects.all()
+    candidates = Candidate.objects.all()
+    jury_links = JuryMember.nominations.through.objects.all()
+    if nomination_ids is not None:
+        nominations = nominations.filter(pk__in=nomination_ids)
+        votes = votes.filter(nomination_id__in=nomination_ids)
+        candidates = candidates.filter(nomination_id__in=nomination_ids)
+        jury_links = jury_links.filter(nomination_id__in=nomination_ids)
+
+    metrics = {
+        pk: dict.fromkeys(NOMINATION_METRICS, 0)
+        for pk in nominations.values_list("pk", flat=True)
+    }
+    for row in (
+        votes.values("nomination_id").annotate(total_votes=Count("id")).order_by()
+    ):
+        metrics[row.pop("nomination_id")].update(row)
+    for field, rows in (("candidate_count", candidates), ("jury_count", jury_links)):
+        for pk, count in (
+            rows.values_list("nomination_id").annotate(Count("id")).order_by()
+        ):
+            metrics[pk][field] = count
+    return metrics
+
+
+def rebuild_tallies():
+    """Полностью пересобирает счётчики и часовые корзины по таблице голосов."""
+    candidate_counts = recount_tallies()
+    buckets.rebuild_buckets()
+    return candidate_counts
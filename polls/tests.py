@@ -1 +1,1658 @@
-# Create your tests here.
+import csv
+import itertools
+import json
+import os
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.db import DatabaseCache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count, Q
+from django.forms import modelform_factory
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from PIL import Image
+
+from config.middleware import view_query_budget
+from config.routers import REPLICA
+from config.urls import urlpatterns as config_urlpatterns
+
+from . import export, ingest, search, tallies, thumbnails, vote_queue, voted
+from .cache import get_response_cache
+from .filters import CandidateFilter
+from .history import deferred_history
+from .models import (
+    ALREADY_VOTED_MESSAGE,
+    Candidate,
+    CandidateTally,
+    JuryMember,
+    Nomination,
+    NominationTally,
+    SearchDocument,
+    Vote,
+    VoteAuditLog,
+    VoteBucket,
+)
+from .urls import async_urlpatterns
+from .views import (
+    AsyncCandidateDetailView,
+    CandidateViewSet,
+    JuryMemberViewSet,
+    NominationViewSet,
+    VoteViewSet,
+)
+
+User = get_user_model()
+
+# URLconf с async-view, как при POLLS_ASYNC_READS (ROOT_URLCONF=__name__).
+urlpatterns = [*async_urlpatterns, *config_urlpatterns]
+
+# Async-view и действие ViewSet на том же адресе: (ViewSet, действие, метод,
+# адрес).
+ASYNC_ENDPOINTS = [
+    (NominationViewSet, "active", "get", "/api/nominations/active/"),
+    (NominationViewSet, "stats", "post", "/api/nominations/{nomination}/stats/"),
+    (NominationViewSet, "stats_summary", "get", "/api/nominations/stats_summary/"),
+    (CandidateViewSet, "popular", "get", "/api/candidates/popular/"),
+]
+
+# Значения каждого фильтра CandidateFilter; None — фильтр не передан.
+CANDIDATE_FILTER_VALUES = {
+    "has_votes": [None, True, False],
+    "min_votes": [None, 0, 2],
+    "voted_by_me": [None, True, False],
+    "has_jury": [None, True, False],
+    "has_photo": [None, True, False],
+}
+
+
+def naive_candidates(options, user):
+    """Кандидаты по фильтрам через JOIN голосов и жюри и DISTINCT — так,
+    как фильтры были написаны до перехода на EXISTS."""
+    queryset = Candidate.objects.annotate(total=Count("votes", distinct=True))
+    if options["has_votes"] is not None:
+        queryset = queryset.filter(votes__isnull=not options["has_votes"])
+    if options["min_votes"] is not None:
+        queryset = queryset.filter(total__gte=options["min_votes"])
+    if options["voted_by_me"] is True:
+        queryset = queryset.filter(votes__user=user)
+    elif options["voted_by_me"] is False:
+        queryset = queryset.exclude(votes__user=user)
+    if options["has_jury"] is not None:
+        queryset = queryset.filter(
+            nomination__jury_members__isnull=not options["has_jury"]
+        )
+    if options["has_photo"] is not None:
+        no_photo = Q(photo__isnull=True) | Q(photo="")
+        queryset = (
+            queryset.exclude(no_photo)
+            if options["has_photo"]
+            else queryset.filter(no_photo)
+        )
+    return queryset.distinct()
+
+
+def full_scans(queryset, table):
+    """Строки плана запроса, читающие ``table`` целиком, а не по индексу."""
+    plan = queryset.explain()
+    if connection.vendor == "postgresql":
+        return [line for line in plan.splitlines() if f"Seq Scan on {table}" in line]
+    return [
+        line
+        for line in plan.splitlines()
+        if f"SCAN {table}" in line and "USING" not in line
+    ]
+
+
+class CandidateFilterMatrixTests(TestCase):
+    """Все сочетания фильтров CandidateFilter: тот же результат, что у
+    наивного JOIN + DISTINCT, без повторов строк, без DISTINCT и JOIN
+    голосов и жюри в SQL и без полного чтения таблицы голосов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create_user(f"user-{index}") for index in range(5)]
+        cls.user = users[0]
+        nominations = [
+            Nomination.objects.create(title=f"Номинация {index}") for index in range(3)
+        ]
+        JuryMember.objects.create(name="Жюри 1").nominations.set(nominations[:2])
+        JuryMember.objects.create(name="Жюри 2").nominations.set(nominations[:1])
+        candidates = [
+            Candidate.objects.create(
+                nomination=nominations[index % 3],
+                name=f"Кандидат {index}",
+                photo="photo.png" if index % 2 else "",
+            )
+            for index in range(9)
+        ]
+        # Кандидат → голосующие; пользователь голосует в номинации один раз.
+        voters = {0: [0, 1, 2], 1: [3], 3: [4], 4: [1], 6: [3], 7: [0]}
+        for candidate_index, user_indexes in voters.items():
+            for user_index in user_indexes:
+                Vote.objects.create(
+                    user=users[user_index], candidate=candidates[candidate_index]
+                )
+
+    def setUp(self):
+        voted.get_index_cache().clear()
+
+    def filter_data(self, options):
+        return {
+            name: str(value).lower() if isinstance(value, bool) else value
+            for name, value in options.items()
+            if value is not None
+        }
+
+    def check_matrix(self):
+        request = RequestFactory().get("/")
+        checked = 0
+        for values in itertools.product(*CANDIDATE_FILTER_VALUES.values()):
+            options = dict(zip(CANDIDATE_FILTER_VALUES, values))
+            with self.subTest(**options):
+                # Свежий пользователь: индекс голосов не запомнен на объекте.
+                request.user = User.objects.get(pk=self.user.pk)
+                queryset = CandidateFilter(
+                    self.filter_data(options),
+                    queryset=Candidate.objects.all(),
+                    request=request,
+                ).qs
+                with CaptureQueriesContext(connection) as queries:
+                    pks = [candidate.pk for candidate in queryset]
+
+                self.assertEqual(len(pks), len(set(pks)))
+                expected = naive_candidates(options, self.user)
+                self.assertEqual(
+                    sorted(pks), sorted(expected.values_list("pk", flat=True))
+                )
+                sql = queries.captured_queries[-1]["sql"]
+                self.assertNotIn("DISTINCT", sql)
+                self.assertNotIn('JOIN "polls_vote"', sql)
+                self.assertNotIn('JOIN "polls_jurymember_nominations"', sql)
+                self.assertEqual(full_scans(queryset, "polls_vote"), [])
+            checked += 1
+        self.assertEqual(checked, 3 ** len(CANDIDATE_FILTER_VALUES))
+
+    def test_matrix_with_tallies(self):
+        self.check_matrix()
+
+    @override_settings(POLLS_USE_VOTE_TALLY=False)
+    def test_matrix_without_tallies(self):
+        self.check_matrix()
+
+    def test_api_count_not_inflated_by_votes(self):
+        # Кандидат 0 набрал три голоса, кандидат 7 — один; оба — голоса
+        # пользователя, и список API показывает только их.
+        self.client.force_login(self.user)
+        for query, expected in (
+            ("has_votes=true", ["Кандидат 0", "Кандидат 7"]),
+            ("min_votes=2&has_jury=true", ["Кандидат 0"]),
+            (
+                "has_votes=true&voted_by_me=true&min_votes=1",
+                ["Кандидат 0", "Кандидат 7"],
+            ),
+        ):
+            with self.subTest(query=query):
+                data = self.client.get(f"/api/candidates/?{query}").json()
+                self.assertEqual(data["count"], len(expected))
+                self.assertEqual(
+                    sorted(item["name"] for item in data["results"]), expected
+                )
+
+
+class QueryBudgetTests(TestCase):
+    """Каждое действие из ``query_budgets`` укладывается в свой бюджет
+    SQL-запросов с холодным кэшем ответов. Индекс голосов прогрет: без
+    Redis он хранится в таблице базы, и его запись — запросы кэша, которые
+    повторяются раз в TIMEOUT, а не на каждом запросе."""
+
+    # ViewSet → {действие: (метод, адрес)}; в адресах подставляются объекты
+    # из setUpTestData.
+    ENDPOINTS = {
+        NominationViewSet: {
+            "list": ("get", "/api/nominations/"),
+            "retrieve": ("get", "/api/nominations/{nomination}/"),
+            "active": ("get", "/api/nominations/active/"),
+            "stats": ("post", "/api/nominations/{nomination}/stats/"),
+            "stats_summary": ("get", "/api/nominations/stats_summary/"),
+            "recently_active_with_votes": (
+                "get",
+                "/api/nominations/recently_active_with_votes/",
+            ),
+            "high_activity_or_old_active": (
+                "get",
+                "/api/nominations/high_activity_or_old_active/",
+            ),
+            "controversial_or_trending": (
+                "get",
+                "/api/nominations/controversial_or_trending/",
+            ),
+            "jury_active_or_no_jury": (
+                "get",
+                "/api/nominations/jury_active_or_no_jury/",
+            ),
+            "timeline": (
+                "get",
+                "/api/nominations/{nomination}/timeline/?resolution=hour",
+            ),
+        },
+        CandidateViewSet: {
+            "list": ("get", "/api/candidates/?has_votes=true&has_jury=true"),
+            "retrieve": ("get", "/api/candidates/{candidate}/"),
+            "complex_filter": ("get", "/api/candidates/complex_filter/"),
+            "popular": ("get", "/api/candidates/popular/"),
+            "special_candidates": ("get", "/api/candidates/special_candidates/"),
+            "controversial": ("get", "/api/candidates/controversial/"),
+            "my_voted_and_popular": ("get", "/api/candidates/my_voted_and_popular/"),
+        },
+        VoteViewSet: {
+            "list": ("get", "/api/votes/"),
+            "retrieve": ("get", "/api/votes/{vote}/"),
+        },
+        JuryMemberViewSet: {
+            "list": ("get", "/api/jury-members/"),
+            "retrieve": ("get", "/api/jury-members/{jury}/"),
+            "with_active_nominations": (
+                "get",
+                "/api/jury-members/with_active_nominations/",
+            ),
+        },
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create_user(f"user-{index}") for index in range(4)]
+        cls.user = users[0]
+        nominations = [
+            Nomination.objects.create(title=f"Номинация {index}") for index in range(4)
+        ]
+        # JuryMemberViewSet показывает только членов жюри с «user» в имени.
+        cls.jury = JuryMember.objects.create(name="Jury user")
+        cls.jury.nominations.set(nominations[:3])
+        JuryMember.objects.create(name="Другой user").nominations.set(nominations)
+        candidates = [
+            Candidate.objects.create(
+                nomination=nominations[index % 4], name=f"Кандидат {index}"
+            )
+            for index in range(12)
+        ]
+        for user in users:
+            for candidate in candidates[:4]:
+                Vote.objects.create(user=user, candidate=candidate)
+        cls.vote = Vote.objects.filter(user=cls.user).first()
+        cls.nomination = nominations[0]
+        cls.candidate = candidates[0]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_every_budget_has_an_endpoint(self):
+        for viewset, endpoints in self.ENDPOINTS.items():
+            self.assertEqual(set(viewset.query_budgets), set(endpoints), viewset)
+
+    def assert_within_budget(self, viewset, action, method, path):
+        budget = view_query_budget(resolve(path.partition("?")[0]).func, method)
+        self.assertEqual(budget, viewset.query_budgets[action])
+        get_response_cache().clear()
+        voted.get_index_cache().clear()
+        voted.voted_index(User.objects.get(pk=self.user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        return response
+
+    def test_endpoints_within_budget(self):
+        for viewset, endpoints in self.ENDPOINTS.items():
+            for action, (method, template) in endpoints.items():
+                path = template.format(**self.objects())
+                with self.subTest(viewset=viewset.__name__, action=action):
+                    self.assert_within_budget(viewset, action, method, path)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_async_endpoints_within_budget(self):
+        for viewset, action, method, template in ASYNC_ENDPOINTS:
+            path = template.format(**self.objects())
+            with self.subTest(action=action):
+                self.assert_within_budget(viewset, action, method, path)
+
+    def test_async_fallback_queries_match_viewsets(self):
+        # ?format=api обслуживает действие ViewSet в потоке: столько же
+        # запросов, сколько без async-view, пользователь загружается один раз.
+        for _, action, method, template in ASYNC_ENDPOINTS:
+            path = template.format(**self.objects()) + "?format=api"
+            with self.subTest(action=action):
+                counts = []
+                for urlconf in ("config.urls", __name__):
+                    get_response_cache().clear()
+                    voted.get_index_cache().clear()
+                    with (
+                        override_settings(ROOT_URLCONF=urlconf),
+                        CaptureQueriesContext(connection) as queries,
+                    ):
+                        response = getattr(self.client, method)(path)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(response["Content-Type"].startswith("text/html"))
+                    counts.append(len(queries))
+                self.assertEqual(counts[1], counts[0])
+
+    def objects(self):
+        return {
+            "nomination": self.nomination.pk,
+            "candidate": self.candidate.pk,
+            "vote": self.vote.pk,
+            "jury": self.jury.pk,
+        }
+
+
+class ExportStreamTests(TestCase):
+    """Выгрузка голосов: колонки и формат строк, фильтры команды; под ASGI
+    она отдаётся асинхронным итератором, а не собирается в список целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", is_staff=True)
+        nomination = Nomination.objects.create(title="Номинация")
+        candidate = Candidate.objects.create(nomination=nomination, name="Кандидат")
+        for index in range(5):
+            user = User.objects.create_user(f"voter-{index}")
+            Vote.objects.create(user=user, candidate=candidate)
+
+    async def test_asgi_export_streams(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get("/votes/export/?format=ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(b"".join(chunks).splitlines()), 5)
+
+        self.assertEqual(b"".join(chunks), await sync_to_async(self.wsgi_export)())
+
+    def wsgi_export(self):
+        self.client.force_login(self.staff)
+        response = self.client.get("/votes/export/?format=ndjson")
+        self.assertFalse(response.is_async)
+        return b"".join(response.streaming_content)
+
+    def test_csv_rows_and_format(self):
+        vote = Vote.objects.order_by("pk").first()
+        vote.created_at = datetime(2026, 3, 4, 5, 6, 7, tzinfo=UTC)
+        vote.save()
+        self.client.force_login(self.staff)
+        response = self.client.get("/votes/export/?format=csv")
+        self.assertEqual(response["Content-Type"], export.CONTENT_TYPES["csv"])
+        rows = list(
+            csv.reader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(rows[0], [title for _, title in export.COLUMNS])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(
+            rows[1],
+            [
+                str(vote.pk),
+                "VOTER-0",
+                "Кандидат (Номинация)",
+                "04.03.2026 05:06",
+                "Кандидат — voter-0",
+            ],
+        )
+
+    def test_command_filters_by_nomination_and_dates(self):
+        other = Candidate.objects.create(
+            nomination=Nomination.objects.create(title="Другая"), name="Другой"
+        )
+        recent = Vote.objects.create(user=self.staff, candidate=other)
+        Vote.objects.create(
+            user=User.objects.create_user("old"),
+            candidate=other,
+            created_at=timezone.now() - timedelta(days=10),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "votes.ndjson")
+            call_command(
+                "export_votes",
+                format="ndjson",
+                nomination=other.nomination_id,
+                since=(timezone.now() - timedelta(days=1)).date().isoformat(),
+                output=output,
+                stdout=StringIO(),
+            )
+            with open(output, encoding="utf-8") as file:
+                rows = [json.loads(line) for line in file]
+        self.assertEqual([row["id"] for row in rows], [recent.pk])
+        self.assertEqual(rows[0]["user"], "STAFF")
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadParityTests(TestCase):
+    """Async-view отвечают так же, как действия ViewSet и CandidateDetailView."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        voter = User.objects.create_user("voter")
+        cls.nomination = Nomination.objects.create(title="Номинация", is_active=True)
+        Nomination.objects.create(title="Архив", is_active=False)
+        cls.candidate = Candidate.objects.create(
+            nomination=cls.nomination, name="Кандидат", photo="photo.png"
+        )
+        other = Candidate.objects.create(nomination=cls.nomination, name="Другой")
+        Vote.objects.create(user=cls.user, candidate=cls.candidate)
+        Vote.objects.create(user=voter, candidate=other)
+
+    def sync_get(self, method, path):
+        get_response_cache().clear()
+        voted.get_index_cache().clear()
+        self.client.force_login(self.user)
+        with override_settings(ROOT_URLCONF="config.urls"):
+            response = getattr(self.client, method)(path)
+            self.assertFalse(iscoroutinefunction(response.resolver_match.func))
+        return response
+
+    async def test_api_endpoints_match_viewsets(self):
+        await self.async_client.aforce_login(self.user)
+        for _, action, method, template in ASYNC_ENDPOINTS:
+            path = template.format(nomination=self.nomination.pk)
+            with self.subTest(action=action):
+                expected = await sync_to_async(self.sync_get)(method, path)
+                self.assertEqual(expected.status_code, 200)
+                await get_response_cache().aclear()
+                response = await getattr(self.async_client, method)(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(iscoroutinefunction(response.resolver_match.func))
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_popular_photo_urls_are_absolute(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/api/candidates/popular/")
+        photos = {item["name"]: item["photo"] for item in response.json()}
+        self.assertEqual(photos["Кандидат"], "http://testserver/media/photo.png")
+
+    async def test_candidate_detail_matches_sync_view(self):
+        await self.async_client.aforce_login(self.user)
+        path = f"/candidates/{self.candidate.pk}/"
+        expected = await sync_to_async(self.sync_get)("get", path)
+        response = await self.async_client.get(path)
+        self.assertIs(response.resolver_match.func.view_class, AsyncCandidateDetailView)
+        self.assertEqual(response.templates[0].name, expected.templates[0].name)
+        for key in ("candidate", "user_voted", "vote_count"):
+            self.assertEqual(response.context[key], expected.context[key], key)
+
+
+@override_settings(ALLOWED_HOSTS=["localhost"])
+class BenchApiTests(TestCase):
+    """bench_api замеряет успешные ответы всех эндпоинтов на данных seed_data
+    и отказывается замерять, когда свободной номинации ни у кого нет."""
+
+    def setUp(self):
+        get_response_cache().clear()
+        voted.get_index_cache().clear()
+
+    def seed(self, **options):
+        call_command("seed_data", stdout=StringIO(), **options)
+
+    def bench(self, **options):
+        call_command("bench_api", iterations=1, warmup=0, stdout=StringIO(), **options)
+
+    def test_measures_every_endpoint(self):
+        self.seed(nominations=5, candidates=5, users=50, votes=150, jury=4)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            self.bench(output=output)
+            with open(output, encoding="utf-8") as file:
+                report = json.load(file)
+        self.assertEqual(report["not_measured"], [])
+        self.assertIn("jury.destroy", report["results"])
+        self.assertTrue(all(result["ok"] for result in report["results"].values()))
+
+    def test_fails_without_free_nomination(self):
+        self.seed(nominations=2, candidates=2, users=3, votes=6, jury=0)
+        with self.assertRaisesMessage(CommandError, "во всех номинациях"):
+            self.bench()
+
+
+class RecountTests(TransactionTestCase):
+    """recalc_votes --write считает голоса в той же транзакции, что и
+    записывает счётчики, после блокировки номинаций и их счётчиков."""
+
+    def setUp(self):
+        self.nomination = Nomination.objects.create(title="Номинация")
+        self.candidates = [
+            Candidate.objects.create(nomination=self.nomination, name=name)
+            for name in ("Первый", "Второй")
+        ]
+        for index in range(3):
+            user = User.objects.create_user(f"voter-{index}")
+            Vote.objects.create(user=user, candidate=self.candidates[index % 2])
+
+    def tally(self, candidate):
+        return CandidateTally.objects.get(candidate=candidate).vote_count
+
+    def test_counts_inside_locked_transaction(self):
+        CandidateTally.objects.update(vote_count=10)
+        counted_in = []
+
+        def count_votes(nomination_ids):
+            counted_in.append(connection.in_atomic_block)
+            return tallies.count_votes(nomination_ids)
+
+        with (
+            mock.patch(
+                "polls.management.commands.recalc_votes.count_votes", count_votes
+            ),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            call_command("recalc_votes", write=True, stdout=StringIO())
+
+        self.assertEqual(counted_in, [True])
+        sql = [query["sql"] for query in queries.captured_queries]
+        lock = next(
+            index
+            for index, query in enumerate(sql)
+            if query.startswith('UPDATE "polls_nominationtally"')
+        )
+        count = next(
+            index
+            for index, query in enumerate(sql)
+            if 'FROM "polls_vote"' in query and "COUNT" in query
+        )
+        self.assertLess(lock, count)
+        # Счётчики меняются на месте: ожидающие блокировку изменения голосов
+        # применяются к новым значениям.
+        self.assertFalse(
+            [query for query in sql if query.startswith('DELETE FROM "polls_')]
+        )
+        self.assertEqual([self.tally(c) for c in self.candidates], [2, 1])
+
+    def test_vote_after_recount_applies_on_top(self):
+        CandidateTally.objects.update(vote_count=0)
+        tallies.recount_tallies([self.nomination.pk])
+        Vote.objects.create(
+            user=User.objects.create_user("late"), candidate=self.candidates[1]
+        )
+        Vote.objects.filter(candidate=self.candidates[0]).first().delete()
+        self.assertEqual([self.tally(c) for c in self.candidates], [1, 2])
+        metrics = NominationTally.objects.get(nomination=self.nomination)
+        self.assertEqual((metrics.total_votes, metrics.candidate_count), (3, 2))
+
+
+class NominationMetricsTests(TestCase):
+    """Показатели номинаций: голоса за окна считаются по часовым корзинам при
+    чтении, счётчик жюри меняется только на реально удалённые связи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nomination = Nomination.objects.create(title="Номинация", is_active=True)
+        cls.other = Nomination.objects.create(title="Другая", is_active=True)
+        candidate = Candidate.objects.create(nomination=cls.nomination, name="Кандидат")
+        for index in range(6):
+            user = User.objects.create_user(f"voter-{index}")
+            Vote.objects.create(user=user, candidate=candidate)
+
+    def setUp(self):
+        get_response_cache().clear()
+
+    def windows(self, days_later):
+        later = timezone.now() + timedelta(days=days_later)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            nomination = tallies.with_nomination_metrics(
+                Nomination.objects.filter(pk=self.nomination.pk)
+            ).get()
+        return nomination.votes_7d, nomination.votes_30d
+
+    def test_windows_expire_without_refresh(self):
+        expected = {0: (6, 6), 8: (0, 6), 31: (0, 0)}
+        for days_later, windows in expected.items():
+            with self.subTest(days_later=days_later):
+                self.assertEqual(self.windows(days_later), windows)
+                with override_settings(POLLS_USE_VOTE_TALLY=False):
+                    self.assertEqual(self.windows(days_later), windows)
+
+    def test_trending_follows_window(self):
+        self.client.force_login(User.objects.get(username="voter-0"))
+        path = "/api/nominations/controversial_or_trending/"
+        titles = [item["title"] for item in self.client.get(path).json()]
+        self.assertIn("Номинация", titles)
+
+        get_response_cache().clear()
+        later = timezone.now() + timedelta(days=8)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            titles = [item["title"] for item in self.client.get(path).json()]
+        self.assertNotIn("Номинация", titles)
+
+    def jury_counts(self):
+        return dict(
+            NominationTally.objects.filter(
+                nomination__in=[self.nomination, self.other]
+            ).values_list("nomination__title", "jury_count")
+        )
+
+    def test_jury_count_ignores_missing_links(self):
+        jury = JuryMember.objects.create(name="Жюри")
+        outsider = JuryMember.objects.create(name="Сторонний")
+        jury.nominations.add(self.nomination)
+        self.assertEqual(self.jury_counts(), {"Номинация": 1, "Другая": 0})
+
+        # Связи jury → other нет: её «удаление» не меняет счётчик.
+        jury.nominations.remove(self.nomination, self.other)
+        self.assertEqual(self.jury_counts(), {"Номинация": 0, "Другая": 0})
+        jury.nominations.remove(self.nomination)
+        self.assertEqual(self.jury_counts(), {"Номинация": 0, "Другая": 0})
+
+        self.nomination.jury_members.add(jury, outsider)
+        self.nomination.jury_members.remove(outsider, JuryMember(pk=0))
+        self.assertEqual(self.jury_counts(), {"Номинация": 1, "Другая": 0})
+
+        outsider.nominations.add(self.other)
+        self.nomination.jury_members.clear()
+        outsider.nominations.clear()
+        self.assertEqual(self.jury_counts(), {"Номинация": 0, "Другая": 0})
+
+
+@skipUnless(
+    REPLICA in settings.DATABASES,
+    "нужна реплика: manage.py test polls.tests.ReplicaRoutingTests "
+    "--settings=config.settings_test",
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Списки, карточки и списки админки читают polls из реплики; записи
+    голосов и проверки «я голосовал» идут в основную базу.
+
+    Реплика — зеркало тестовой базы, а зеркало не видит данных транзакции
+    TestCase, поэтому тест транзакционный, а остальные тесты запускаются без
+    реплики.
+    """
+
+    databases = {"default", REPLICA} if REPLICA in settings.DATABASES else {"default"}
+
+    def setUp(self):
+        get_response_cache().clear()
+        voted.get_index_cache().clear()
+        self.user = User.objects.create_superuser("admin", password="password")
+        nomination = Nomination.objects.create(title="Номинация", is_active=True)
+        self.voted = Candidate.objects.create(nomination=nomination, name="Первый")
+        self.free = Candidate.objects.create(
+            nomination=Nomination.objects.create(title="Другая"), name="Второй"
+        )
+        Vote.objects.create(user=self.user, candidate=self.voted)
+        self.client.force_login(self.user)
+
+    def request(self, method, path, data=None):
+        with (
+            CaptureQueriesContext(connections["default"]) as primary,
+            CaptureQueriesContext(connections[REPLICA]) as replica,
+        ):
+            response = getattr(self.client, method)(
+                path, data, content_type="application/json"
+            )
+        self.assertLess(response.status_code, 300, response.content)
+        return (
+            [query["sql"] for query in primary.captured_queries],
+            [query["sql"] for query in replica.captured_queries],
+        )
+
+    def reads(self, queries, table):
+        return [sql for sql in queries if f'FROM "{table}"' in sql]
+
+    def test_reads_go_to_replica(self):
+        for path in (
+            "/api/candidates/",
+            f"/api/candidates/{self.voted.pk}/",
+            "/admin/polls/candidate/",
+        ):
+            with self.subTest(path=path):
+                primary, replica = self.request("get", path)
+                self.assertTrue(self.reads(replica, "polls_candidate"))
+                self.assertFalse(self.reads(primary, "polls_candidate"))
+                # Сессия и пользователь — из основной базы.
+                self.assertTrue(self.reads(primary, "django_session"))
+                self.assertFalse(self.reads(replica, "auth_user"))
+
+    def test_voted_checks_stay_on_primary(self):
+        primary, replica = self.request("get", "/api/candidates/?voted_by_me=true")
+        self.assertTrue(self.reads(replica, "polls_candidate"))
+        self.assertTrue(self.reads(primary, "polls_vote"))
+        self.assertFalse(self.reads(replica, "polls_vote"))
+
+    def test_vote_writes_go_to_primary(self):
+        primary, replica = self.request(
+            "post", "/api/votes/", {"candidate": self.free.pk}
+        )
+        self.assertTrue(
+            [sql for sql in primary if sql.startswith('INSERT INTO "polls_vote"')]
+        )
+        self.assertEqual(replica, [])
+
+
+class VoteModelTests(TestCase):
+    """Один голос пользователя в номинации; номинация голоса берётся из
+    кандидата без лишних запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("voter")
+        nomination = Nomination.objects.create(title="Номинация")
+        other = Nomination.objects.create(title="Другая")
+        cls.first, cls.second = (
+            Candidate.objects.create(nomination=nomination, name=name)
+            for name in ("Первый", "Второй")
+        )
+        cls.elsewhere = Candidate.objects.create(nomination=other, name="Третий")
+        cls.vote = Vote.objects.create(user=cls.user, candidate=cls.first)
+
+    def setUp(self):
+        voted.get_index_cache().clear()
+
+    def test_duplicate_vote_rejected_by_api(self):
+        self.client.force_login(self.user)
+        response = self.client.post("/api/votes/", {"candidate": self.second.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(ALREADY_VOTED_MESSAGE, str(response.json()))
+        # Индекс голосов не знает о голосе: отказ даёт уникальный индекс.
+        voted.get_index_cache().set(f"voted:{self.user.pk}", {})
+        response = self.client.post("/api/votes/", {"candidate": self.second.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 1)
+
+    def test_duplicate_vote_rejected_by_database(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(user=self.user, candidate=self.second)
+
+    def test_full_clean_reports_duplicate_once(self):
+        with self.assertRaises(ValidationError) as error:
+            Vote(user=self.user, candidate=self.second).full_clean()
+        self.assertEqual(error.exception.messages, [ALREADY_VOTED_MESSAGE])
+
+    def test_form_without_nomination_reports_duplicate(self):
+        form = modelform_factory(Vote, fields=["user", "candidate"])(
+            {"user": self.user.pk, "candidate": self.second.pk}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors(), [ALREADY_VOTED_MESSAGE])
+
+    def test_save_reads_candidate_only_when_changed(self):
+        vote = Vote.objects.get(pk=self.vote.pk)
+        with CaptureQueriesContext(connection) as queries:
+            vote.save()
+        self.assertFalse(
+            [
+                q
+                for q in queries.captured_queries
+                if 'FROM "polls_candidate"' in q["sql"]
+            ]
+        )
+
+        vote.candidate_id = self.elsewhere.pk
+        vote.save()
+        self.assertEqual(vote.nomination_id, self.elsewhere.nomination_id)
+        vote.candidate = self.second
+        with CaptureQueriesContext(connection) as queries:
+            vote.save()
+        self.assertEqual(vote.nomination_id, self.second.nomination_id)
+        self.assertFalse(
+            [
+                q
+                for q in queries.captured_queries
+                if 'FROM "polls_candidate"' in q["sql"]
+            ]
+        )
+
+
+class DuplicateVoteMigrationTests(TransactionTestCase):
+    """0004_vote_nomination оставляет самый ранний голос пользователя в
+    номинации и пересчитывает счётчики затронутых кандидатов и номинаций."""
+
+    before = [("polls", "0003_vote_tallies")]
+    after = [("polls", "0004_vote_nomination")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_removed(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        Candidate = apps.get_model("polls", "Candidate")
+        Vote = apps.get_model("polls", "Vote")
+        CandidateTally = apps.get_model("polls", "CandidateTally")
+        NominationTally = apps.get_model("polls", "NominationTally")
+
+        user = apps.get_model("auth", "User").objects.create(username="voter")
+        nomination = apps.get_model("polls", "Nomination").objects.create(
+            title="Номинация"
+        )
+        first, second = (
+            Candidate.objects.create(nomination=nomination, name=name, slug=slug)
+            for name, slug in (("Первый", "first"), ("Второй", "second"))
+        )
+        kept = Vote.objects.create(user=user, candidate=first)
+        Vote.objects.create(user=user, candidate=second)
+        CandidateTally.objects.create(candidate=first, vote_count=1)
+        CandidateTally.objects.create(candidate=second, vote_count=1)
+        NominationTally.objects.create(nomination=nomination, total_votes=2)
+
+        executor.loader.build_graph()
+        with self.assertLogs("polls.migrations", "WARNING"):
+            executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        Vote = apps.get_model("polls", "Vote")
+        self.assertEqual(list(Vote.objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertEqual(Vote.objects.get().nomination_id, nomination.pk)
+        tallies = apps.get_model("polls", "CandidateTally").objects
+        self.assertEqual(
+            dict(tallies.values_list("candidate_id", "vote_count")),
+            {first.pk: 1, second.pk: 0},
+        )
+        self.assertEqual(
+            apps.get_model("polls", "NominationTally").objects.get().total_votes, 1
+        )
+
+
+class VotedIndexTests(TestCase):
+    """Индекс голосов пользователей (polls.voted)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("voter")
+        cls.nomination = Nomination.objects.create(title="Номинация")
+        cls.candidate = Candidate.objects.create(
+            nomination=cls.nomination, name="Кандидат"
+        )
+
+    def setUp(self):
+        voted.get_index_cache().clear()
+
+    @skipUnless(not os.environ.get("CACHE_URL"), "индекс голосов в Redis")
+    def test_shared_between_processes_without_redis(self):
+        self.assertIsInstance(voted.get_index_cache(), DatabaseCache)
+
+    def test_loaddata_leaves_index_alone(self):
+        key = f"voted:{self.user.pk}"
+        voted.get_index_cache().set(key, {})
+        fixture = [
+            {
+                "model": "polls.vote",
+                "fields": {
+                    "user": self.user.pk,
+                    "candidate": self.candidate.pk,
+                    "nomination": self.nomination.pk,
+                    "created_at": "2026-01-01T00:00:00Z",
+                },
+            }
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump(fixture, file)
+            file.flush()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("loaddata", file.name, verbosity=0)
+        self.assertEqual(Vote.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(voted.get_index_cache().get(key), {})
+
+
+class VoteQueueTests(TestCase):
+    """Очередь голосов POLLS_VOTE_QUEUE и её перенос в базу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(username=f"voter-{index}") for index in range(3)
+        )
+        cls.nomination = Nomination.objects.create(title="Номинация")
+        cls.candidate = Candidate.objects.create(
+            nomination=cls.nomination, name="Кандидат"
+        )
+
+    def setUp(self):
+        voted.get_index_cache().clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "queue.sqlite3")
+        override = override_settings(POLLS_VOTE_QUEUE={"ENABLED": True, "PATH": path})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.queue = vote_queue.get_queue()
+        self.addCleanup(self.queue.connection.close)
+
+    def test_enqueue_checks_votes_through_index(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        voted.voted_index(user)
+        with CaptureQueriesContext(connection) as queries:
+            ticket = vote_queue.enqueue_vote(
+                User.objects.get(pk=user.pk), self.candidate
+            )
+        self.assertIsNotNone(ticket)
+        self.assertFalse(
+            [q for q in queries.captured_queries if 'FROM "polls_vote"' in q["sql"]]
+        )
+        self.assertIsNone(vote_queue.enqueue_vote(user, self.candidate))
+
+    def test_batch_written_in_one_transaction(self):
+        users = User.objects.bulk_create(
+            User(username=f"queued-{index}") for index in range(ingest.CHUNK_SIZE + 1)
+        )
+        for user in users:
+            self.queue.enqueue(user.pk, self.candidate.pk, self.nomination.pk)
+        with mock.patch.object(ingest, "_insert", wraps=ingest._insert) as insert:
+            processed = vote_queue.process_batch(self.queue, len(users))
+        self.assertEqual(processed, len(users))
+        self.assertEqual(insert.call_count, 1)
+        self.assertEqual(self.candidate.votes.count(), len(users))
+
+    def test_vote_keeps_enqueue_time(self):
+        ticket = vote_queue.enqueue_vote(self.users[0], self.candidate)
+        enqueued_at = (timezone.now() - timedelta(minutes=5)).replace(microsecond=0)
+        self.queue.connection.execute(
+            "UPDATE queued_vote SET enqueued_at = ? WHERE id = ?",
+            (enqueued_at.timestamp(), ticket),
+        )
+        vote_queue.process_batch(self.queue, 10)
+        status = self.queue.status(ticket)
+        self.assertEqual(status["status"], vote_queue.COMMITTED)
+        self.assertEqual(Vote.objects.get(pk=status["vote_id"]).created_at, enqueued_at)
+
+    def test_repeated_races_recorded_as_duplicates(self):
+        insert = ingest._insert
+        rivals = iter(self.users[:2])
+
+        def racing_insert(votes, created_by):
+            # Параллельный запрос успевает записать голос перед каждой
+            # попыткой, кроме последней.
+            rival = next(rivals, None)
+            if rival is None:
+                return insert(votes, created_by)
+            Vote.objects.create(user=rival, candidate=self.candidate)
+            raise IntegrityError
+
+        items = [
+            {"user_id": user.pk, "candidate_id": self.candidate.pk}
+            for user in self.users
+        ]
+        with mock.patch.object(ingest, "_insert", racing_insert):
+            results = ingest.ingest_votes(items)
+        self.assertEqual(
+            [result["status"] for result in results],
+            [ingest.DUPLICATE, ingest.DUPLICATE, ingest.ACCEPTED],
+        )
+        self.assertEqual(Vote.objects.get(user=self.users[2]).pk, results[2]["vote_id"])
+
+
+class ResponseCacheInvalidationTests(TestCase):
+    """Голос сбрасывает закэшированные ответы только своей номинации;
+    ответы по всем номинациям устаревают за POLLS_LIST_CACHE_TIMEOUT."""
+
+    LIST = "/api/nominations/jury_active_or_no_jury/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("voter")
+        cls.voted_in, cls.other = (
+            Nomination.objects.create(title=title) for title in ("Первая", "Вторая")
+        )
+        cls.candidate = Candidate.objects.create(
+            nomination=cls.voted_in, name="Кандидат"
+        )
+        Candidate.objects.create(nomination=cls.other, name="Другой")
+
+    def setUp(self):
+        get_response_cache().clear()
+        voted.get_index_cache().clear()
+        self.client.force_login(self.user)
+
+    def stats(self, nomination):
+        return f"/api/nominations/{nomination.pk}/stats/"
+
+    def computed(self, path, method="get"):
+        """Считал ли ответ заново: запросы к таблицам голосования, кроме
+        индекса голосов."""
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return any(
+            '"polls_' in query["sql"] and "polls_voted_index" not in query["sql"]
+            for query in queries.captured_queries
+        )
+
+    def vote(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=self.user, candidate=self.candidate)
+
+    def warm_up(self):
+        for nomination in (self.voted_in, self.other):
+            self.assertTrue(self.computed(self.stats(nomination), "post"))
+            self.assertFalse(self.computed(self.stats(nomination), "post"))
+        self.assertTrue(self.computed(self.LIST))
+        self.assertFalse(self.computed(self.LIST))
+
+    def test_vote_invalidates_only_its_nomination(self):
+        self.warm_up()
+        self.vote()
+        self.assertTrue(self.computed(self.stats(self.voted_in), "post"))
+        self.assertFalse(self.computed(self.stats(self.other), "post"))
+        self.assertFalse(self.computed(self.LIST))
+
+    def test_bulk_ingest_invalidates_only_its_nomination(self):
+        self.warm_up()
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest.ingest_votes(
+                [{"user_id": self.user.pk, "candidate_id": self.candidate.pk}]
+            )
+        self.assertTrue(self.computed(self.stats(self.voted_in), "post"))
+        self.assertFalse(self.computed(self.stats(self.other), "post"))
+        self.assertFalse(self.computed(self.LIST))
+
+    def test_nomination_change_invalidates_lists(self):
+        self.warm_up()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.save()
+        self.assertFalse(self.computed(self.stats(self.voted_in), "post"))
+        self.assertTrue(self.computed(self.stats(self.other), "post"))
+        self.assertTrue(self.computed(self.LIST))
+
+    @skipUnless(not os.environ.get("CACHE_URL"), "срок жизни проверяется в LocMem")
+    def test_list_expires_after_short_timeout(self):
+        self.warm_up()
+        self.vote()
+        later = time.time() + settings.POLLS_LIST_CACHE_TIMEOUT + 1
+        with mock.patch("time.time", return_value=later):
+            self.assertTrue(self.computed(self.LIST))
+            self.assertFalse(self.computed(self.stats(self.other), "post"))
+
+
+class VoteTallyTests(TestCase):
+    """Счётчики голосов кандидатов и номинаций следуют за записью голосов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"voter-{index}") for index in range(3)]
+        cls.nomination, cls.other = (
+            Nomination.objects.create(title=title) for title in ("Первая", "Вторая")
+        )
+        cls.first, cls.second = (
+            Candidate.objects.create(nomination=cls.nomination, name=name)
+            for name in ("Первый", "Второй")
+        )
+        cls.elsewhere = Candidate.objects.create(nomination=cls.other, name="Третий")
+
+    def counts(self):
+        candidates = dict(CandidateTally.objects.values_list("candidate", "vote_count"))
+        nominations = dict(
+            NominationTally.objects.values_list("nomination", "total_votes")
+        )
+        return (
+            [candidates.get(pk, 0) for pk in (self.first.pk, self.second.pk)],
+            [nominations.get(pk, 0) for pk in (self.nomination.pk, self.other.pk)],
+        )
+
+    def test_votes_counted_on_create_move_and_delete(self):
+        votes = [
+            Vote.objects.create(user=user, candidate=self.first) for user in self.users
+        ]
+        self.assertEqual(self.counts(), ([3, 0], [3, 0]))
+        self.assertEqual(tallies.candidate_vote_count(self.first), 3)
+
+        votes[0].candidate = self.second
+        votes[0].save()
+        self.assertEqual(self.counts(), ([2, 1], [3, 0]))
+
+        votes[1].candidate = self.elsewhere
+        votes[1].save()
+        self.assertEqual(self.counts(), ([1, 1], [2, 1]))
+
+        votes[2].delete()
+        self.assertEqual(self.counts(), ([0, 1], [1, 1]))
+        Vote.objects.all().delete()
+        self.assertEqual(self.counts(), ([0, 0], [0, 0]))
+
+    def test_stats_read_from_tallies(self):
+        for user, candidate in zip(self.users, (self.first, self.first, self.second)):
+            Vote.objects.create(user=user, candidate=candidate)
+        self.client.force_login(self.users[0])
+        get_response_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f"/api/nominations/{self.nomination.pk}/stats/")
+        self.assertEqual(
+            {row["candidate__name"]: row["total"] for row in response.json()},
+            {"Первый": 2, "Второй": 1},
+        )
+        self.assertFalse(
+            [q for q in queries.captured_queries if 'FROM "polls_vote"' in q["sql"]]
+        )
+
+
+class BulkVoteTests(TestCase):
+    """POST /api/votes/bulk/ записывает допустимые голоса пачкой и
+    сообщает причину отказа для остальных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", is_staff=True)
+        cls.users = [User.objects.create_user(f"voter-{index}") for index in range(3)]
+        cls.nomination = Nomination.objects.create(title="Номинация")
+        cls.first, cls.second = (
+            Candidate.objects.create(nomination=cls.nomination, name=name)
+            for name in ("Первый", "Второй")
+        )
+        Vote.objects.create(user=cls.users[2], candidate=cls.first)
+
+    def setUp(self):
+        voted.get_index_cache().clear()
+
+    def bulk(self, votes):
+        return self.client.post(
+            "/api/votes/bulk/", {"votes": votes}, content_type="application/json"
+        )
+
+    def test_inserted_and_rejected(self):
+        self.client.force_login(self.staff)
+        voter, other, already = self.users
+        response = self.bulk(
+            [
+                {"user": voter.pk, "candidate": self.first.pk},
+                {"user": other.pk, "candidate": self.second.pk},
+                # Второй голос того же пользователя в номинации этой пачки.
+                {"user": voter.pk, "candidate": self.second.pk},
+                {"user": already.pk, "candidate": self.second.pk},
+                {"user": voter.pk, "candidate": 0},
+                {"user": 0, "candidate": self.first.pk},
+            ]
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(
+            [result["status"] for result in data["results"]],
+            [
+                ingest.ACCEPTED,
+                ingest.ACCEPTED,
+                ingest.DUPLICATE,
+                ingest.DUPLICATE,
+                ingest.INVALID_CANDIDATE,
+                ingest.INVALID_USER,
+            ],
+        )
+        self.assertEqual(
+            data["summary"],
+            {
+                ingest.ACCEPTED: 2,
+                ingest.DUPLICATE: 2,
+                ingest.INVALID_CANDIDATE: 1,
+                ingest.INVALID_USER: 1,
+            },
+        )
+        created = Vote.objects.filter(
+            pk__in=[r["vote_id"] for r in data["results"][:2]]
+        )
+        self.assertEqual(
+            set(created.values_list("user", "candidate", "created_by")),
+            {
+                (voter.pk, self.first.pk, self.staff.pk),
+                (other.pk, self.second.pk, self.staff.pk),
+            },
+        )
+        self.assertEqual(tallies.candidate_vote_count(self.first), 2)
+        self.assertEqual(tallies.candidate_vote_count(self.second), 1)
+
+    def test_only_staff_votes_for_others(self):
+        voter, other, _ = self.users
+        self.client.force_login(voter)
+        response = self.bulk([{"user": other.pk, "candidate": self.first.pk}])
+        self.assertEqual(response.status_code, 403)
+        response = self.bulk([{"candidate": self.first.pk}])
+        self.assertEqual(response.json()["summary"], {ingest.ACCEPTED: 1})
+        self.assertFalse(Vote.objects.filter(user=other).exists())
+
+
+class KeysetPaginationTests(TestCase):
+    """?pagination=cursor: страницы по ключу (created_at, id) без COUNT(*)
+    и OFFSET, устойчивые к вставкам между запросами страниц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("voter")
+        cls.candidates = [
+            Candidate.objects.create(
+                nomination=Nomination.objects.create(title=f"Номинация {index}"),
+                name=f"Кандидат {index}",
+            )
+            for index in range(9)
+        ]
+        start = timezone.now() - timedelta(days=1)
+        # Голоса парами с одинаковым временем: порядок внутри пары задаёт id.
+        cls.votes = [
+            Vote.objects.create(
+                user=cls.user,
+                candidate=candidate,
+                created_at=start + timedelta(minutes=index // 2),
+            )
+            for index, candidate in enumerate(cls.candidates[:7])
+        ]
+
+    def setUp(self):
+        voted.get_index_cache().clear()
+        self.client.force_login(self.user)
+
+    def page(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(
+            [
+                q
+                for q in queries.captured_queries
+                if 'FROM "polls_vote"' in q["sql"]
+                and ("COUNT(" in q["sql"] or "OFFSET" in q["sql"])
+            ]
+        )
+        return response.json()
+
+    def test_pages_stable_under_inserts(self):
+        data = self.page("/api/votes/?pagination=cursor&page_size=3")
+        seen = [item["id"] for item in data["results"]]
+        # Новые голоса попадают в начало списка и не сдвигают следующие
+        # страницы, как сдвинули бы OFFSET.
+        for candidate in self.candidates[7:]:
+            Vote.objects.create(user=self.user, candidate=candidate)
+        while data["next"]:
+            data = self.page(data["next"])
+            seen += [item["id"] for item in data["results"]]
+        self.assertEqual(seen, [vote.pk for vote in reversed(self.votes)])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/votes/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class SlugAllocationTests(TestCase):
+    """Slug кандидатов с одинаковыми именами подбираются одним запросом на
+    пачку, а не перебором ``exists()``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nomination = Nomination.objects.create(title="Best")
+
+    def create(self, count):
+        candidates = [
+            Candidate(nomination_id=self.nomination.pk, name="Ivan Ivanov")
+            for _ in range(count)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            created = ingest.create_candidates(candidates)
+        return [candidate.slug for candidate in created], len(queries)
+
+    def test_save_takes_first_free_suffix(self):
+        for slug in ("ivan-ivanov-best", "ivan-ivanov-best-2", "ivan-ivanov-best-x"):
+            Candidate.objects.create(
+                nomination=self.nomination, name="Другой", slug=slug
+            )
+        slugs = [
+            Candidate.objects.create(
+                nomination=self.nomination, name="Ivan Ivanov"
+            ).slug
+            for _ in range(2)
+        ]
+        self.assertEqual(slugs, ["ivan-ivanov-best-1", "ivan-ivanov-best-3"])
+
+    def test_bulk_queries_do_not_grow_with_duplicates(self):
+        Candidate.objects.create(nomination=self.nomination, name="Ivan Ivanov")
+        few, few_queries = self.create(3)
+        many, many_queries = self.create(60)
+        self.assertEqual(few, [f"ivan-ivanov-best-{n}" for n in range(1, 4)])
+        self.assertEqual(many, [f"ivan-ivanov-best-{n}" for n in range(4, 64)])
+        self.assertEqual(many_queries, few_queries)
+
+
+class HistoryModeTests(TestCase):
+    """Режимы истории голосов POLLS_HISTORY_MODES и журнал VoteAuditLog."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"voter-{index}") for index in range(2)]
+        nomination = Nomination.objects.create(title="Номинация")
+        cls.first, cls.second = (
+            Candidate.objects.create(nomination=nomination, name=name)
+            for name in ("Первый", "Второй")
+        )
+
+    def vote_and_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            votes = [
+                Vote.objects.create(user=user, candidate=self.first)
+                for user in self.users
+            ]
+            votes[0].candidate = self.second
+            votes[0].save()
+        return votes
+
+    @override_settings(POLLS_HISTORY_MODES={"polls.Vote": "full"})
+    def test_full_writes_on_save(self):
+        self.vote_and_change()
+        self.assertEqual(Vote.history.count(), 3)
+        self.assertFalse(VoteAuditLog.objects.exists())
+
+    @override_settings(POLLS_HISTORY_MODES={"polls.Vote": "deferred"})
+    def test_deferred_writes_after_block(self):
+        with deferred_history():
+            self.vote_and_change()
+            self.assertEqual(Vote.history.count(), 0)
+        self.assertEqual(
+            sorted(Vote.history.values_list("history_type", flat=True)),
+            ["+", "+", "~"],
+        )
+
+    @override_settings(
+        POLLS_HISTORY_MODES={"polls.Vote": "off"}, POLLS_VOTE_AUDIT_LOG=True
+    )
+    def test_off_with_audit_log(self):
+        first, second = [vote.pk for vote in self.vote_and_change()]
+        Vote.objects.get(pk=second).delete()
+        self.assertEqual(Vote.history.count(), 0)
+        self.assertEqual(
+            list(
+                VoteAuditLog.objects.order_by("pk").values_list(
+                    "action", "vote_id", "candidate_id"
+                )
+            ),
+            [
+                (VoteAuditLog.CREATED, first, self.first.pk),
+                (VoteAuditLog.CREATED, second, self.first.pk),
+                (VoteAuditLog.CHANGED, first, self.second.pk),
+                (VoteAuditLog.DELETED, second, self.first.pk),
+            ],
+        )
+
+
+class VoteBucketTests(TestCase):
+    """Голоса сворачиваются в часовые корзины VoteBucket, по которым
+    строятся графики /timeline/ любого разрешения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nomination = Nomination.objects.create(title="Номинация")
+        cls.first, cls.second = (
+            Candidate.objects.create(nomination=cls.nomination, name=name)
+            for name in ("Первый", "Второй")
+        )
+        cls.day = datetime(2026, 3, 4, tzinfo=UTC)
+        # (кандидат, смещение от начала дня)
+        moments = [
+            (cls.first, timedelta(hours=10, minutes=5)),
+            (cls.first, timedelta(hours=10, minutes=55)),
+            (cls.second, timedelta(hours=10, minutes=30)),
+            (cls.first, timedelta(hours=13)),
+            (cls.second, timedelta(days=1, hours=9)),
+        ]
+        cls.votes = [
+            Vote.objects.create(
+                user=User.objects.create_user(f"voter-{index}"),
+                candidate=candidate,
+                created_at=cls.day + offset,
+            )
+            for index, (candidate, offset) in enumerate(moments)
+        ]
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.client.force_login(self.votes[0].user)
+
+    def buckets(self):
+        return set(
+            VoteBucket.objects.filter(vote_count__gt=0).values_list(
+                "candidate", "hour", "vote_count"
+            )
+        )
+
+    def test_rollup_follows_votes_and_backfill(self):
+        hour = timedelta(hours=1)
+        expected = {
+            (self.first.pk, self.day + 10 * hour, 2),
+            (self.second.pk, self.day + 10 * hour, 1),
+            (self.first.pk, self.day + 13 * hour, 1),
+            (self.second.pk, self.day + 33 * hour, 1),
+        }
+        self.assertEqual(self.buckets(), expected)
+
+        self.votes[0].delete()
+        expected.remove((self.first.pk, self.day + 10 * hour, 2))
+        expected.add((self.first.pk, self.day + 10 * hour, 1))
+        self.assertEqual(self.buckets(), expected)
+
+        VoteBucket.objects.update(vote_count=100)
+        call_command("backfill_vote_buckets", stdout=StringIO())
+        self.assertEqual(self.buckets(), expected)
+
+    def timeline(self, resolution, since, until):
+        response = self.client.get(
+            f"/api/nominations/{self.nomination.pk}/timeline/",
+            {"resolution": resolution, "since": since, "until": until},
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_timeline_resolutions(self):
+        data = self.timeline("hour", "2026-03-04T10:00:00Z", "2026-03-04T14:00:00Z")
+        self.assertEqual(
+            [(row["start"][11:16], row["votes"]) for row in data["series"]],
+            [("10:00", 3), ("13:00", 1)],
+        )
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(
+            [(row["name"], row["votes"]) for row in data["candidates"]],
+            [("Первый", 3), ("Второй", 1)],
+        )
+
+        data = self.timeline("day", "2026-03-01", "2026-03-10")
+        self.assertEqual(
+            [(row["start"][:10], row["votes"]) for row in data["series"]],
+            [("2026-03-04", 4), ("2026-03-05", 1)],
+        )
+        data = self.timeline("week", "2026-03-01", "2026-03-10")
+        self.assertEqual(
+            [(row["start"][:10], row["votes"]) for row in data["series"]],
+            [("2026-03-02", 5)],
+        )
+
+    def test_unknown_resolution(self):
+        response = self.client.get(
+            f"/api/nominations/{self.nomination.pk}/timeline/?resolution=minute"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchIndexTests(TestCase):
+    """Поиск по индексу SearchDocument: регистр и «ё» кириллицы, короткие
+    слова, синхронизация FTS-таблицы с документами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader")
+        cls.titles = ["Лучший АКТЁР", "Лучшая актриса", "Дебют года"]
+        cls.nominations = [Nomination.objects.create(title=t) for t in cls.titles]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def found(self, term):
+        response = self.client.get("/api/nominations/", {"search": term})
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(item["title"] for item in response.json()["results"])
+
+    def test_cyrillic_case_insensitive(self):
+        self.assertEqual(self.found("актер"), ["Лучший АКТЁР"])
+        self.assertEqual(self.found("АКТ"), ["Лучшая актриса", "Лучший АКТЁР"])
+        self.assertEqual(self.found("лучш дебют"), [])
+        self.assertEqual(self.found("ДЕБЮТ"), ["Дебют года"])
+        # Короче триграммы: поиск по документам через LIKE.
+        self.assertEqual(self.found("да"), ["Дебют года"])
+
+    def fts_matches(self, term):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {search.FTS_TABLE} "
+                f"WHERE {search.FTS_TABLE} MATCH %s",
+                [f'"{term}"'],
+            )
+            return cursor.fetchone()[0]
+
+    @skipUnless(search.uses_fts(connection), "FTS5 trigram недоступен")
+    def test_fts_follows_documents(self):
+        nomination = self.nominations[2]
+        self.assertEqual(self.fts_matches("дебют"), 1)
+        nomination.title = "Открытие года"
+        nomination.save()
+        self.assertEqual(self.fts_matches("дебют"), 0)
+        self.assertEqual(self.fts_matches("открытие"), 1)
+        self.assertEqual(self.found("открыт"), ["Открытие года"])
+        nomination.delete()
+        self.assertEqual(self.fts_matches("открытие"), 0)
+
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.fts_matches("лучш"), 0)
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.fts_matches("лучш"), 2)
+
+
+class ThumbnailTests(TestCase):
+    """Миниатюры фото кандидата создаются после коммита рядом с оригиналом и
+    удаляются вместе с ним."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(
+            MEDIA_ROOT=directory.name,
+            POLLS_THUMBNAILS={"SIZES": (64, 256), "WORKERS": 0},
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.nomination = Nomination.objects.create(title="Номинация")
+
+    def photo(self, name, size=(800, 400)):
+        buffer = BytesIO()
+        Image.new("RGBA", size, (200, 10, 10, 128)).save(buffer, "PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+    def save(self, candidate, photo):
+        candidate.photo = photo
+        with self.captureOnCommitCallbacks(execute=True):
+            candidate.save()
+        candidate.refresh_from_db()
+        return candidate
+
+    def test_variants_generated_and_replaced(self):
+        candidate = self.save(
+            Candidate(nomination=self.nomination, name="Кандидат"), self.photo("a.png")
+        )
+        storage = candidate.photo.storage
+        variants = candidate.thumbnails["variants"]
+        self.assertEqual(candidate.thumbnails["source"], candidate.photo.name)
+        self.assertEqual(set(variants), {"64", "256"})
+        for size, files in variants.items():
+            self.assertEqual(set(files), {"webp", "jpeg"})
+            for image_format, name in files.items():
+                with storage.open(name) as file, Image.open(file) as image:
+                    self.assertEqual(image.format, image_format.upper())
+                    self.assertEqual(image.size, (int(size), int(size) // 2))
+        self.assertEqual(
+            thumbnails.thumbnail_url(candidate, 100),
+            storage.url(variants["256"]["webp"]),
+        )
+        self.assertEqual(
+            thumbnails.thumbnail_url(candidate, 1000), storage.url(candidate.photo.name)
+        )
+
+        old = [name for files in variants.values() for name in files.values()]
+        candidate = self.save(candidate, self.photo("b.png", (100, 300)))
+        self.assertFalse([name for name in old if storage.exists(name)])
+        with storage.open(candidate.thumbnails["variants"]["64"]["jpeg"]) as file:
+            self.assertEqual(Image.open(file).size, (21, 64))
+
+        current = candidate.thumbnails["variants"]["256"]["webp"]
+        candidate = self.save(candidate, None)
+        self.assertEqual(candidate.thumbnails, {})
+        self.assertFalse(storage.exists(current))
+        self.assertIsNone(thumbnails.thumbnail_url(candidate, 64))
+
+
+class ConditionalGetTests(TestCase):
+    """ETag и Last-Modified по версии ресурса: 304 без основного запроса и
+    сериализации, новый ответ после голоса или правки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("voter")
+        cls.nomination = Nomination.objects.create(title="Номинация")
+        cls.candidate = Candidate.objects.create(
+            nomination=cls.nomination, name="Кандидат"
+        )
+
+    def setUp(self):
+        voted.get_index_cache().clear()
+        self.client.force_login(self.user)
+        self.url = f"/api/nominations/{self.nomination.pk}/"
+
+    def test_etag_round_trip(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with (
+            CaptureQueriesContext(connection) as queries,
+            mock.patch.object(NominationViewSet, "get_serializer") as get_serializer,
+        ):
+            response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        get_serializer.assert_not_called()
+        # Сессия, пользователь и версия ресурса.
+        self.assertEqual(len(queries), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=self.user, candidate=self.candidate)
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.nomination.title = "Новое название"
+        self.nomination.save()
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "Новое название")
+
+    def test_if_modified_since(self):
+        response = self.client.get("/api/nominations/")
+        last_modified = response["Last-Modified"]
+        response = self.client.get(
+            "/api/nominations/", headers={"if-modified-since": last_modified}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        Vote.objects.create(user=self.user, candidate=self.candidate)
+        url = f"/api/candidates/{self.candidate.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.client.force_login(User.objects.create_user("other"))
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertNotEqual(response.status_code, 304)
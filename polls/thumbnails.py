@@ -0,0 +1,203 @@
+import logging
+import multiprocessing
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Длинная сторона миниатюр в пикселях.
+    "SIZES": (64, 256, 1024),
+    "FORMATS": ("webp", "jpeg"),
+    "QUALITY": 82,
+    # Процессы Pillow; 0 — генерировать сразу в потоке запроса.
+    "WORKERS": 2,
+}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+_pools = {}
+
+
+def thumbnail_settings():
+    return {**DEFAULTS, **getattr(settings, "POLLS_THUMBNAILS", {})}
+
+
+def variant_name(source, size, image_format):
+    """Имя миниатюры рядом с оригиналом: ``photo.png`` → ``photo_256.webp``."""
+    root, _ = posixpath.splitext(source)
+    return f"{root}_{size}.{EXTENSIONS[image_format]}"
+
+
+def render_variants(data, sizes, formats, quality):
+    """Миниатюры изображения ``{размер: {формат: байты}}``. Работает без
+    Django, поэтому выполняется в дочернем процессе."""
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        rendered = {}
+        for size in sizes:
+            resized = image.copy()
+            # thumbnail() сохраняет пропорции и не увеличивает маленькие фото.
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            rendered[size] = {}
+            for image_format in formats:
+                frame = resized
+                if image_format == "jpeg" and has_alpha:
+                    frame = Image.new("RGB", resized.size, "white")
+                    frame.paste(resized, mask=resized.getchannel("A"))
+                buffer = BytesIO()
+                frame.save(buffer, image_format.upper(), quality=quality)
+                rendered[size][image_format] = buffer.getvalue()
+    return rendered
+
+
+def is_current(candidate):
+    thumbnails = candidate.thumbnails or {}
+    return thumbnails.get("source") == (candidate.photo.name or None)
+
+
+def read_photo(candidate):
+    with candidate.photo.storage.open(candidate.photo.name, "rb") as file:
+        return file.read()
+
+
+def store_variants(candidate_id, source, rendered):
+    """Сохраняет миниатюры в хранилище фото и записывает их в кандидата,
+    если за это время фото не поменяли."""
+    from . import tallies
+    from .models import Candidate
+
+    candidate = Candidate.objects.filter(pk=candidate_id).first()
+    if candidate is None or candidate.photo.name != source:
+        return None
+    storage = candidate.photo.storage
+    variants = {}
+    for size, files in rendered.items():
+        for image_format, content in files.items():
+            name = variant_name(source, size, image_format)
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(content))
+            variants.setdefault(str(size), {})[image_format] = name
+    thumbnails = {"source": source, "variants": variants}
+    # update() без save(): без сигналов, истории и повторной генерации.
+    Candidate.objects.filter(pk=candidate_id, photo=source).update(
+        thumbnails=thumbnails, updated_at=timezone.now()
+    )
+    tallies.touch_nominations(candidate.nomination_id)
+    delete_stale(storage, candidate.thumbnails, variants)
+    return thumbnails
+
+
+def delete_stale(storage, previous, variants):
+    current = {name for files in variants.values() for name in files.values()}
+    for files in (previous or {}).get("variants", {}).values():
+        for name in files.values():
+            if name not in current and storage.exists(name):
+                storage.delete(name)
+
+
+def delete_thumbnails(candidate):
+    """Удаляет файлы миниатюр кандидата из хранилища."""
+    delete_stale(candidate.photo.storage, candidate.thumbnails, {})
+
+
+def clear_thumbnails(candidate):
+    """Удаляет миниатюры кандидата, у которого больше нет фото."""
+    from .models import Candidate
+
+    delete_thumbnails(candidate)
+    Candidate.objects.filter(pk=candidate.pk).update(thumbnails={})
+    candidate.thumbnails = {}
+
+
+def generate_thumbnails(candidate):
+    """Синхронно создаёт миниатюры фото кандидата."""
+    options = thumbnail_settings()
+    rendered = render_variants(
+        read_photo(candidate),
+        options["SIZES"],
+        options["FORMATS"],
+        options["QUALITY"],
+    )
+    thumbnails = store_variants(candidate.pk, candidate.photo.name, rendered)
+    if thumbnails is not None:
+        candidate.thumbnails = thumbnails
+    return thumbnails
+
+
+def pools(workers):
+    """Процессы для Pillow и поток, который сохраняет готовые миниатюры."""
+    if workers not in _pools:
+        _pools[workers] = (
+            # spawn: fork многопоточного веб-процесса небезопасен.
+            ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            ),
+            ThreadPoolExecutor(1, thread_name_prefix="thumbnails"),
+        )
+    return _pools[workers]
+
+
+def _store_result(candidate_id, source, future):
+    try:
+        store_variants(candidate_id, source, future.result())
+    except Exception:
+        logger.exception("Не удалось создать миниатюры кандидата %s", candidate_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnails(candidate):
+    """После коммита ставит генерацию миниатюр в пул процессов; запрос не
+    ждёт Pillow."""
+    if not candidate.photo or is_current(candidate):
+        return
+    options = thumbnail_settings()
+    candidate_id, source = candidate.pk, candidate.photo.name
+
+    def submit():
+        if not options["WORKERS"]:
+            generate_thumbnails(candidate)
+            return
+        processes, writer = pools(options["WORKERS"])
+        future = processes.submit(
+            render_variants,
+            read_photo(candidate),
+            options["SIZES"],
+            options["FORMATS"],
+            options["QUALITY"],
+        )
+        future.add_done_callback(
+            lambda done: writer.submit(_store_result, candidate_id, source, done)
+        )
+
+    transaction.on_commit(submit)
+
+
+def thumbnail_urls(candidate):
+    """``{размер: {формат: url}}`` для API; пусто, пока миниатюр нет."""
+    if not candidate.photo or not is_current(candidate):
+        return {}
+    storage = candidate.photo.storage
+    return {
+        size: {image_format: storage.url(name) for image_format, name in files.items()}
+        for size, files in candidate.thumbnails["variants"].items()
+    }
+
+
+def thumbnail_url(candidate, size, image_format="webp"):
+    """URL миниатюры не меньше ``size`` или оригинала, если её ещё нет."""
+    urls = thumbnail_urls(candidate)
+    for available in sorted(urls, key=int):
+        if int(available) >= size and image_format in urls[available]:
+            return urls[available][image_format]
+    return candidate.photo.url if candidate.photo else None
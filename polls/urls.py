@@ -9,6 +9,17 @@ router.register("api/candidates", views.CandidateViewSet, basename="candidate")
 router.register("api/votes", views.VoteViewSet, basename="vote")
 router.register("api/jury-members", views.JuryMemberViewSet, basename="jury-member")
 
+# Async-версии частых чтений на тех же адресах (POLLS_ASYNC_READS): config.urls
+# ставит их раньше DRF-роутеров и HTML-view.
+async_urlpatterns = [
+    path("api/nominations/active/", views.active_nominations),
+    path("api/nominations/stats_summary/", views.nominations_stats_summary),
+    path("api/nominations/<int:pk>/stats/", views.nomination_stats),
+    path("api/candidates/popular/", views.popular_candidates),
+    path("candidates/<int:pk>/", views.AsyncCandidateDetailView.as_view()),
+    path("candidates/<slug:slug>/", views.AsyncCandidateDetailView.as_view()),
+]
+
 urlpatterns = [
     path("nominations/", views.NominationListView.as_view(), name="nomination_list"),
     path(
@@ -42,5 +53,11 @@ urlpatterns = [
     path(
         "candidates/<int:pk>/vote/", views.vote_for_candidate, name="vote_for_candidate"
     ),
+    path("votes/export/", views.export_votes, name="export_votes"),
+    path(
+        "api/nominations/<int:pk>/live/",
+        views.nomination_live_results,
+        name="nomination_live_results",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,32 +1,84 @@
-from datetime import timedelta
+from collections import Counter
+from functools import wraps
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
 from django.db.models import Count, Q
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
     ListView,
     UpdateView,
+    View,
 )
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import (
+    APIException,
+    NotAcceptable,
+    NotFound,
+    PermissionDenied,
+    ValidationError,
+)
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
-from .filters import CandidateFilter
-from .models import Candidate, JuryMember, Nomination, Vote
+from . import (
+    buckets,
+    conditional,
+    export,
+    live,
+    search,
+    tallies,
+    vote_queue,
+    voted,
+)
+from .cache import cache_response, cached_data
+from .conditional import async_conditional_response, conditional_response
+from .filters import CandidateFilter, IndexedSearchFilter
+from .ingest import create_candidates, ingest_votes
+from .models import (
+    ALREADY_VOTED_MESSAGE,
+    Candidate,
+    JuryMember,
+    Nomination,
+    Vote,
+)
+from .pagination import (
+    CandidateKeysetPagination,
+    NominationKeysetPagination,
+    SelectablePaginationMixin,
+    VoteKeysetPagination,
+)
 from .serializers import (
+    BulkCandidateSerializer,
+    BulkVoteSerializer,
     CandidateSerializer,
     JuryMemberSerializer,
     NominationSerializer,
@@ -40,152 +92,229 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 50
 
 
-class NominationViewSet(ModelViewSet):
+class NominationViewSet(SelectablePaginationMixin, ModelViewSet):
     queryset = Nomination.objects.all()
     serializer_class = NominationSerializer
     permission_classes = [IsAuthenticated]
+    cursor_pagination_class = NominationKeysetPagination
+    filter_backends = [IndexedSearchFilter]
+    search_fields = ["title"]
+
+    # Потолок SQL-запросов на действие (сессия и пользователь — 2 запроса,
+    # версия для условного GET — 1), см. config.middleware.PerformanceMiddleware,
+    # bench_api --check-budgets и polls.tests.QueryBudgetTests
+    query_budgets = {
+        "list": 5,
+        "retrieve": 4,
+        "active": 4,
+        "stats": 4,
+        "stats_summary": 4,
+        "recently_active_with_votes": 3,
+        "high_activity_or_old_active": 3,
+        "controversial_or_trending": 3,
+        "jury_active_or_no_jury": 3,
+        "timeline": 4,
+    }
+
+    # Версии ресурсов для ETag / Last-Modified (polls.conditional). Действия,
+    # зависящие от текущего времени (окна «за N дней», timeline), меняются и
+    # без записи в базу, поэтому условный GET к ним не применяется.
+
+    @conditional_response(conditional.nominations_version)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(conditional.nomination_version)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(methods=["GET"], detail=False)
+    @conditional_response(conditional.nominations_version)
+    @cache_response
     def active(self, request):
         nominations = Nomination.objects.filter(is_active=True)
         serializer = self.get_serializer(nominations, many=True)
         return Response(serializer.data)
 
     @action(methods=["POST"], detail=True)
+    @cache_response
     def stats(self, request, pk=None):
         nomination = self.get_object()
-        data = (
-            Vote.objects.filter(candidate__nomination=nomination)
-            .values("candidate__name")
-            .annotate(total=Count("id"))
-        )
+        data = tallies.nomination_vote_stats(nomination)
         return Response(data)
 
     @action(methods=["GET"], detail=False)
+    @conditional_response(conditional.nominations_version)
+    @cache_response
     def stats_summary(self, request):
-        data = (
+        data = tallies.with_nomination_metrics(
             Nomination.objects.filter(is_active=True)
-            .annotate(
-                candidate_count=Count("candidates"),
-                total_votes=Count("candidates__votes"),
-            )
-            .values("id", "title", "candidate_count", "total_votes")
-        )
+        ).values("id", "title", "candidate_count", "total_votes")
         return Response(data)
 
+    @action(methods=["GET"], detail=True)
+    @cache_response(hourly=True)
+    def timeline(self, request, pk=None):
+        """Голоса номинации по часам, дням или неделям и итоги кандидатов
+        за период: ``?resolution=hour|day|week&since=...&until=...``."""
+        nomination = self.get_object()
+        resolution = request.query_params.get("resolution", "day")
+        if resolution not in buckets.RESOLUTIONS:
+            raise ValidationError(
+                {"resolution": f"Допустимые значения: {', '.join(buckets.RESOLUTIONS)}"}
+            )
+        try:
+            until = request.query_params.get("until")
+            until = export.parse_bound(until, end=True) if until else timezone.now()
+            since = request.query_params.get("since")
+            since = (
+                export.parse_bound(since)
+                if since
+                else until - buckets.RESOLUTIONS[resolution]
+            )
+        except ValueError as error:
+            raise ValidationError(str(error))
+        return Response(buckets.timeline(nomination.pk, resolution, since, until))
+
+    # Четыре действия ниже фильтруют по показателям номинаций
+    # (tallies.with_nomination_metrics) вместо подсчёта голосов, кандидатов
+    # и жюри через JOIN при каждом запросе.
+
     @action(detail=False, methods=["get"])
+    @cache_response(hourly=True)
     def recently_active_with_votes(self, request):
-        thirty_days_ago = timezone.now() - timedelta(days=30)
+        thirty_days_ago = tallies.window_start(30)
 
         queryset = (
-            self.get_queryset()
-            .annotate(vote_count=Count("candidates__votes", distinct=True))
-            .filter(
-                Q(created_at__gte=thirty_days_ago) & Q(is_active=True)
-                | Q(vote_count__gte=5)
-            )
-            .filter(~Q(is_active=False))
-            .distinct()
+            tallies.with_nomination_metrics(self.get_queryset())
+            .filter(is_active=True)
+            .filter(Q(created_at__gte=thirty_days_ago) | Q(total_votes__gte=5))
         )
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @cache_response(hourly=True)
     def high_activity_or_old_active(self, request):
-        ninety_days_ago = timezone.now() - timedelta(days=90)
+        ninety_days_ago = tallies.window_start(90)
 
         queryset = (
-            self.get_queryset()
-            .annotate(candidate_count=Count("candidates"))
-            .filter(
-                (Q(candidate_count__gt=10) & Q(is_active=True))
-                | Q(created_at__lte=ninety_days_ago)
-            )
-            .filter(~Q(is_active=False))
-            .distinct()
+            tallies.with_nomination_metrics(self.get_queryset())
+            .filter(is_active=True)
+            .filter(Q(candidate_count__gt=10) | Q(created_at__lte=ninety_days_ago))
         )
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @cache_response(hourly=True)
     def controversial_or_trending(self, request):
-        seven_days_ago = timezone.now() - timedelta(days=7)
-
         queryset = (
-            self.get_queryset()
-            .annotate(
-                total_votes=Count("candidates__votes", distinct=True),
-                recent_votes=Count(
-                    "candidates__votes",
-                    filter=Q(candidates__votes__created_at__gte=seven_days_ago),
-                    distinct=True,
-                ),
-            )
-            .filter((Q(total_votes__lt=3) & Q(is_active=True)) | Q(recent_votes__gt=5))
-            .filter(~Q(is_active=False))
-            .distinct()
+            tallies.with_nomination_metrics(self.get_queryset())
+            .filter(is_active=True)
+            .filter(Q(total_votes__lt=3) | Q(votes_7d__gt=5))
         )
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @cache_response
     def jury_active_or_no_jury(self, request):
         queryset = (
-            self.get_queryset()
+            tallies.with_nomination_metrics(self.get_queryset())
             .filter(is_active=True)
-            .annotate(
-                jury_count=Count("jury_members", distinct=True),
-                vote_count=Count("candidates__votes", distinct=True),
-            )
-            .filter(Q(jury_count__gt=0) | (Q(jury_count=0) & Q(vote_count__gt=8)))
-            .distinct()
+            .filter(Q(jury_count__gt=0) | Q(total_votes__gt=8))
         )
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
 
-class CandidateViewSet(ModelViewSet):
-    queryset = Candidate.objects.all()
+class CandidateViewSet(SelectablePaginationMixin, ModelViewSet):
+    queryset = Candidate.objects.select_related("nomination")
     serializer_class = CandidateSerializer
     permission_classes = [IsAuthenticated]
 
+    # Индекс голосов пользователя (polls.voted) при промахе кэша — ещё 1.
+    query_budgets = {
+        "list": 6,
+        "retrieve": 5,
+        "complex_filter": 3,
+        "popular": 3,
+        "special_candidates": 4,
+        "controversial": 3,
+        "my_voted_and_popular": 4,
+    }
+
     pagination_class = StandardResultsSetPagination
+    cursor_pagination_class = CandidateKeysetPagination
 
     filter_backends = [
         DjangoFilterBackend,
-        SearchFilter,
+        IndexedSearchFilter,
     ]
     filterset_class = CandidateFilter
     search_fields = ["name"]
 
+    @conditional_response(conditional.nominations_version)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(conditional.candidate_version)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
+        # Кандидаты, за которых голосовал пользователь, — по его индексу
+        # голосов (polls.voted), без JOIN голосов и DISTINCT.
         qs = super().get_queryset()
-        qs = qs.filter(votes__user=self.request.user)
+        qs = qs.filter(pk__in=voted.voted_candidate_ids(self.request.user))
 
         nomination_id = self.request.GET.get("nomination_id")
         if nomination_id:
             qs = qs.filter(nomination_id=nomination_id)
 
-        return qs.distinct()
+        return qs
+
+    @action(detail=False, methods=["POST"])
+    def bulk(self, request):
+        serializer = BulkCandidateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        candidates = [
+            Candidate(nomination_id=item["nomination"], name=item["name"])
+            for item in serializer.validated_data["candidates"]
+        ]
+        try:
+            created = create_candidates(candidates, created_by=request.user)
+        except Nomination.DoesNotExist as error:
+            raise ValidationError({"candidates": [str(error)]})
+
+        data = CandidateSerializer(
+            created, many=True, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=["GET"])
     def complex_filter(self, request):
         user = request.user
-        queryset = Candidate.objects.filter(
-            (Q(name__icontains="user") & ~Q(votes__user=user))
-            | Q(nomination__is_active=True)
-        ).distinct()
+        queryset = (
+            Candidate.objects.filter(
+                (Q(name__icontains="user") & ~Q(votes__user=user))
+                | Q(nomination__is_active=True)
+            )
+            .select_related("nomination")
+            .distinct()
+        )
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=["GET"])
     def popular(self, request):
-        qs = Candidate.objects.annotate(vote_count=Count("votes")).order_by(
-            "-vote_count"
-        )[:10]
+        qs = tallies.with_vote_count(Candidate.objects.select_related("nomination"))
+        qs = qs.order_by("-vote_count")[:10]
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
 
@@ -194,7 +323,10 @@ class CandidateViewSet(ModelViewSet):
         user = request.user
         queryset = (
             Candidate.objects.filter(
-                (Q(votes__user=user) & Q(nomination__is_active=True))
+                (
+                    Q(pk__in=voted.voted_candidate_ids(user))
+                    & Q(nomination__is_active=True)
+                )
                 | (~Q(votes__isnull=False) & ~Q(photo__isnull=True))
             )
             .select_related("nomination")
@@ -225,12 +357,13 @@ class CandidateViewSet(ModelViewSet):
     def my_voted_and_popular(self, request):
         user = request.user
 
-        my_voted = Q(votes__user=user)
+        my_voted = Q(pk__in=voted.voted_candidate_ids(user))
         top_overall = Q(vote_count__gte=3)
 
         queryset = (
             Candidate.objects.annotate(vote_count=Count("votes"))
             .filter(my_voted | top_overall)
+            .select_related("nomination")
             .order_by("-vote_count")[:10]
         )
 
@@ -238,30 +371,91 @@ class CandidateViewSet(ModelViewSet):
         return Response(serializer.data)
 
 
-class VoteViewSet(ModelViewSet):
+class VoteViewSet(SelectablePaginationMixin, ModelViewSet):
     serializer_class = VoteSerializer
     permission_classes = [IsAuthenticated]
+    cursor_pagination_class = VoteKeysetPagination
+
+    query_budgets = {"list": 4, "retrieve": 3}
+    # Пользователь сразу видит свой голос: отставание реплики здесь заметно.
+    read_from_replica = False
 
     def get_queryset(self):
-        return Vote.objects.filter(user=self.request.user)
+        return Vote.objects.filter(user=self.request.user).order_by(
+            "-created_at", "-id"
+        )
+
+    def create(self, request, *args, **kwargs):
+        if not vote_queue.queue_enabled():
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        candidate = serializer.validated_data["candidate"]
+        ticket = vote_queue.enqueue_vote(request.user, candidate)
+        if ticket is None:
+            raise ValidationError(ALREADY_VOTED_MESSAGE)
+        return Response(
+            {"ticket": ticket, "candidate": candidate.pk, "status": vote_queue.PENDING},
+            status=status.HTTP_202_ACCEPTED,
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=["GET"], url_path=r"queue/(?P<ticket>\d+)")
+    def queued(self, request, ticket=None):
+        data = vote_queue.get_queue().status(int(ticket), user_id=request.user.pk)
+        if data is None:
+            raise NotFound()
+        return Response(data)
+
+    @action(detail=False, methods=["POST"])
+    def bulk(self, request):
+        serializer = BulkVoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user = request.user
+        items = [
+            {"user_id": item.get("user", user.pk), "candidate_id": item["candidate"]}
+            for item in serializer.validated_data["votes"]
+        ]
+        if not user.is_staff and any(item["user_id"] != user.pk for item in items):
+            raise PermissionDenied(
+                "Голосовать за других пользователей может только персонал"
+            )
+
+        results = ingest_votes(items, created_by=user)
+        summary = Counter(result["status"] for result in results)
+        return Response({"summary": summary, "results": results})
+
 
 class JuryMemberViewSet(ModelViewSet):
     queryset = JuryMember.objects.all()
     serializer_class = JuryMemberSerializer
     permission_classes = [IsAuthenticated]
 
+    query_budgets = {"list": 5, "retrieve": 4, "with_active_nominations": 4}
+    filter_backends = [IndexedSearchFilter]
+    search_fields = ["name"]
+
     def get_queryset(self):
-        return JuryMember.objects.filter(
-            Q(name__icontains="user") & Q(nominations__isnull=False)
-        ).distinct()
+        return (
+            JuryMember.objects.filter(
+                search.field_q(JuryMember, "name", "user")
+                & Q(nominations__isnull=False)
+            )
+            .prefetch_related("nominations")
+            .distinct()
+        )
 
     @action(detail=False, methods=["GET"])
     def with_active_nominations(self, request):
-        queryset = JuryMember.objects.filter(nominations__is_active=True).distinct()
+        queryset = (
+            JuryMember.objects.filter(nominations__is_active=True)
+            .prefetch_related("nominations")
+            .distinct()
+        )
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
@@ -269,16 +463,18 @@ class JuryMemberViewSet(ModelViewSet):
 
 class CandidateDetailView(LoginRequiredMixin, DetailView):
     model = Candidate
+    queryset = Candidate.objects.select_related("nomination")
     template_name = "polls/candidate_detail.html"
     context_object_name = "candidate"
     login_url = "/login/"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["user_voted"] = Vote.objects.filter(
-            user=self.request.user, candidate=self.object
-        ).exists()
-        context["vote_count"] = self.object.votes.count()
+        context["user_voted"] = (
+            voted.voted_index(self.request.user).get(self.object.nomination_id)
+            == self.object.pk
+        )
+        context["vote_count"] = tallies.candidate_vote_count(self.object)
         return context
 
 
@@ -331,12 +527,25 @@ def vote_for_candidate(request, pk):
     if request.method == "POST":
         candidate = get_object_or_404(Candidate, pk=pk)
 
-        if Vote.objects.filter(
-            user=request.user, candidate__nomination=candidate.nomination
-        ).exists():
+        if vote_queue.queue_enabled():
+            if vote_queue.enqueue_vote(request.user, candidate) is None:
+                messages.error(request, "Вы уже голосовали в этой номинации!")
+            else:
+                messages.success(
+                    request, f"Голос за {candidate.name} принят и скоро будет учтён!"
+                )
+            return redirect("candidate_detail", pk=pk)
+
+        duplicate = voted.has_voted(request.user, candidate.nomination_id)
+        if not duplicate:
+            try:
+                with transaction.atomic():
+                    Vote.objects.create(user=request.user, candidate=candidate)
+            except IntegrityError:
+                duplicate = True
+        if duplicate:
             messages.error(request, "Вы уже голосовали в этой номинации!")
         else:
-            Vote.objects.create(user=request.user, candidate=candidate)
             messages.success(request, f"Голос за {candidate.name} учтён!")
 
         return redirect("candidate_detail", pk=pk)
@@ -344,6 +553,213 @@ def vote_for_candidate(request, pk):
     return redirect("candidate_detail", pk=pk)
 
 
+@staff_member_required
+def export_votes(request):
+    """Потоковая выгрузка голосов в CSV или NDJSON.
+
+    Параметры: ``format`` (csv/ndjson), ``nomination``, ``since``, ``until``
+    (ISO-дата или дата и время), ``active=1`` — только активные номинации.
+    """
+    params = request.GET
+    export_format = params.get("format", "csv")
+    if export_format not in export.FORMATS:
+        return HttpResponseBadRequest("Формат должен быть csv или ndjson")
+    try:
+        nomination_id = int(params["nomination"]) if "nomination" in params else None
+        since = export.parse_bound(params["since"]) if "since" in params else None
+        until = (
+            export.parse_bound(params["until"], end=True) if "until" in params else None
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    queryset = export.export_queryset(
+        nomination_id, since, until, active_only=params.get("active") == "1"
+    )
+    stream = (
+        export.astream_votes
+        if isinstance(request, ASGIRequest)
+        else export.stream_votes
+    )
+    response = StreamingHttpResponse(
+        stream(export_format, queryset),
+        content_type=export.CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="votes.{export_format}"'
+    return response
+
+
+async def nomination_live_results(request, pk):
+    """Результаты номинации в реальном времени через Server-Sent Events."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Требуется авторизация"}, status=401)
+    if not await Nomination.objects.filter(pk=pk).aexists():
+        raise Http404("Номинация не найдена")
+
+    response = StreamingHttpResponse(
+        live.live_results(pk), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Отключает буферизацию ответа в nginx.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# Асинхронные версии частых чтений для ASGI (POLLS_ASYNC_READS, см.
+# config.asgi). Отвечают так же, как действия NominationViewSet /
+# CandidateViewSet и CandidateDetailView, но ждут базу через async ORM, не
+# занимая поток воркера. DRF async-view не поддерживает, поэтому async-путь
+# обслуживает только вход по сессии и ответ в JSON, остальное — само
+# действие ViewSet.
+
+
+def api_response(data, status_code=200):
+    return HttpResponse(
+        JSONRenderer().render(data),
+        content_type="application/json",
+        status=status_code,
+    )
+
+
+def api_error(exc, status_code=None):
+    return api_response({"detail": exc.detail}, status_code or exc.status_code)
+
+
+def negotiates_json(request, view_class):
+    """Выберет ли DRF для запроса JSONRenderer (``?format=``, Accept)."""
+    renderers = [renderer() for renderer in view_class.renderer_classes]
+    try:
+        renderer, _ = view_class.content_negotiation_class().select_renderer(
+            Request(request), renderers
+        )
+    except NotAcceptable:
+        return False
+    return isinstance(renderer, JSONRenderer)
+
+
+def async_api_view(fallback):
+    """Async-view для действия ViewSet ``fallback`` (``ViewSet.as_view()``).
+
+    Async-путь — пользователь вошёл по сессии и ждёт JSON; CSRF проверяется,
+    как в SessionAuthentication. Запросы без сессии (Basic и другие
+    DEFAULT_AUTHENTICATION_CLASSES), с другим форматом ответа или методом
+    обрабатывает ``fallback`` в потоке.
+    """
+    view_class = fallback.cls
+    methods = {method.upper() for method in fallback.actions}
+    session_auth = any(
+        issubclass(authentication, SessionAuthentication)
+        for authentication in view_class.authentication_classes
+    )
+
+    def decorator(view):
+        async def respond(request, *args, **kwargs):
+            try:
+                if request.method not in SAFE_METHODS:
+                    SessionAuthentication().enforce_csrf(request)
+                return await view(request, *args, **kwargs)
+            except Http404 as error:
+                return api_error(NotFound(*error.args))
+            except APIException as error:
+                return api_error(error)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if session_auth and request.method in methods:
+                # Шаблоны, condition() и SessionAuthentication в fallback читают
+                # request.user синхронно: пользователь загружается один раз.
+                request.user = user = await request.auser()
+                if user.is_authenticated and negotiates_json(request, view_class):
+                    response = await respond(request, *args, **kwargs)
+                    patch_vary_headers(response, ["Accept"])
+                    return response
+            return await sync_to_async(fallback)(request, *args, **kwargs)
+
+        # Бюджет запросов и чтение из реплики — как у действия ViewSet
+        # (config.middleware.view_query_budget, reads_from_replica); CSRF
+        # проверяет сам view, как и DRF.
+        wrapper.cls = view_class
+        wrapper.actions = fallback.actions
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+@async_api_view(NominationViewSet.as_view({"get": "active"}))
+@async_conditional_response(conditional.nominations_version)
+async def active_nominations(request):
+    async def load():
+        nominations = [
+            nomination async for nomination in Nomination.objects.filter(is_active=True)
+        ]
+        return NominationSerializer(
+            nominations, many=True, context={"request": request}
+        ).data
+
+    return api_response(await cached_data(request, load))
+
+
+@async_api_view(NominationViewSet.as_view({"post": "stats"}))
+async def nomination_stats(request, pk):
+    async def load():
+        nomination = await aget_object_or_404(Nomination, pk=pk)
+        return [row async for row in tallies.nomination_vote_stats(nomination)]
+
+    return api_response(await cached_data(request, load, pk=pk))
+
+
+@async_api_view(NominationViewSet.as_view({"get": "stats_summary"}))
+@async_conditional_response(conditional.nominations_version)
+async def nominations_stats_summary(request):
+    async def load():
+        rows = tallies.with_nomination_metrics(
+            Nomination.objects.filter(is_active=True)
+        ).values("id", "title", "candidate_count", "total_votes")
+        return [row async for row in rows]
+
+    return api_response(await cached_data(request, load))
+
+
+@async_api_view(CandidateViewSet.as_view({"get": "popular"}))
+async def popular_candidates(request):
+    queryset = tallies.with_vote_count(Candidate.objects.select_related("nomination"))
+    candidates = [
+        candidate async for candidate in queryset.order_by("-vote_count")[:10]
+    ]
+    serializer = CandidateSerializer(
+        candidates, many=True, context={"request": request}
+    )
+    return api_response(serializer.data)
+
+
+class AsyncCandidateDetailView(View):
+    """CandidateDetailView с async ORM: по ``pk`` или ``slug``."""
+
+    template_name = CandidateDetailView.template_name
+    login_url = CandidateDetailView.login_url
+
+    async def get(self, request, pk=None, slug=None):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        request.user = user
+
+        lookup = {"pk": pk} if pk is not None else {"slug": slug}
+        candidate = await aget_object_or_404(
+            Candidate.objects.select_related("nomination"), **lookup
+        )
+        index = await sync_to_async(voted.voted_index)(user)
+        context = {
+            "object": candidate,
+            "candidate": candidate,
+            "user_voted": index.get(candidate.nomination_id) == candidate.pk,
+            "vote_count": await tallies.acandidate_vote_count(candidate),
+        }
+        return render(request, self.template_name, context)
+
+
 def register(request):
     if request.method == "POST":
         form = UserCreationForm(request.POST)
@@ -0,0 +1,210 @@
+import sqlite3
+import threading
+import time
+from datetime import UTC, datetime
+
+from django.conf import settings
+
+from . import ingest, voted
+from .models import Vote
+
+PENDING = "pending"
+COMMITTED = "committed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queued_vote (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    candidate_id INTEGER NOT NULL,
+    nomination_id INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    vote_id INTEGER,
+    processed_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS queued_vote_pending_user_nomination
+    ON queued_vote (user_id, nomination_id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS queued_vote_pending
+    ON queued_vote (id) WHERE status = 'pending';
+"""
+
+
+def queue_settings():
+    return {
+        "ENABLED": False,
+        "PATH": settings.BASE_DIR / "vote_queue.sqlite3",
+        "BATCH_SIZE": 1000,
+        "FLUSH_INTERVAL": 0.5,
+        **getattr(settings, "POLLS_VOTE_QUEUE", {}),
+    }
+
+
+def queue_enabled():
+    return queue_settings()["ENABLED"]
+
+
+class VoteQueue:
+    """Очередь принятых голосов в отдельном файле SQLite.
+
+    Веб-процессы только дописывают строки в очередь, а команда
+    ``process_vote_queue`` переносит их в основную базу пачками.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, user_id, candidate_id, nomination_id):
+        """Ставит голос в очередь и возвращает номер квитанции.
+
+        Возвращает ``None``, если у пользователя уже есть необработанный
+        голос в этой номинации.
+        """
+        try:
+            cursor = self.connection.execute(
+                "INSERT INTO queued_vote "
+                "(user_id, candidate_id, nomination_id, enqueued_at) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, candidate_id, nomination_id, time.time()),
+            )
+        except sqlite3.IntegrityError:
+            return None
+        return cursor.lastrowid
+
+    def is_pending(self, user_id, nomination_id):
+        row = self.connection.execute(
+            "SELECT 1 FROM queued_vote "
+            "WHERE user_id = ? AND nomination_id = ? AND status = ?",
+            (user_id, nomination_id, PENDING),
+        ).fetchone()
+        return row is not None
+
+    def pending(self, limit):
+        return self.connection.execute(
+            "SELECT id, user_id, candidate_id, nomination_id, enqueued_at "
+            "FROM queued_vote WHERE status = ? ORDER BY id LIMIT ?",
+            (PENDING, limit),
+        ).fetchall()
+
+    def mark(self, outcomes):
+        """Сохраняет результаты обработки: ``[(ticket, status, vote_id)]``."""
+        now = time.time()
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "UPDATE queued_vote SET status = ?, vote_id = ?, processed_at = ? "
+                "WHERE id = ?",
+                [
+                    (status, vote_id, now, ticket)
+                    for ticket, status, vote_id in outcomes
+                ],
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def status(self, ticket, user_id=None):
+        query = (
+            "SELECT id AS ticket, candidate_id, status, vote_id, enqueued_at, "
+            "processed_at FROM queued_vote WHERE id = ?"
+        )
+        params = [ticket]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        row = self.connection.execute(query, params).fetchone()
+        return dict(row) if row else None
+
+    def purge(self, older_than):
+        """Удаляет обработанные записи старше ``older_than`` секунд."""
+        cursor = self.connection.execute(
+            "DELETE FROM queued_vote WHERE status != ? AND processed_at < ?",
+            (PENDING, time.time() - older_than),
+        )
+        return cursor.rowcount
+
+
+def enqueue_vote(user, candidate):
+    """Ставит голос в очередь, возвращает квитанцию или ``None`` для повтора."""
+    # Индекс голосов общий для процессов (см. POLLS_VOTED_INDEX_CACHE), и
+    # воркер очереди дописывает в него записанные голоса. Повтор, который
+    # индекс пропустил, отклонит сам воркер.
+    if voted.has_voted(user, candidate.nomination_id):
+        return None
+    return get_queue().enqueue(user.pk, candidate.pk, candidate.nomination_id)
+
+
+def process_batch(queue, limit):
+    """Переносит до ``limit`` голосов из очереди в базу одной транзакцией,
+    возвращает их число. Голоса получают время постановки в очередь."""
+    rows = queue.pending(limit)
+    if not rows:
+        return 0
+
+    items = [
+        {
+            "user_id": row["user_id"],
+            "candidate_id": row["candidate_id"],
+            "created_at": datetime.fromtimestamp(row["enqueued_at"], tz=UTC),
+        }
+        for row in rows
+    ]
+    results = ingest.ingest_votes(items, batch_size=len(items))
+
+    # Голос мог быть записан прошлым запуском воркера, который упал до
+    # отметки в очереди: такой «дубликат» считаем записанным.
+    duplicates = [
+        row
+        for row, result in zip(rows, results)
+        if result["status"] == ingest.DUPLICATE
+    ]
+    stored = {}
+    if duplicates:
+        stored = {
+            (user_id, nomination_id): (vote_id, candidate_id)
+            for vote_id, user_id, nomination_id, candidate_id in Vote.objects.filter(
+                user_id__in={row["user_id"] for row in duplicates},
+                nomination_id__in={row["nomination_id"] for row in duplicates},
+            ).values_list("id", "user_id", "nomination_id", "candidate_id")
+        }
+
+    outcomes = []
+    for row, result in zip(rows, results):
+        status, vote_id = result["status"], result.get("vote_id")
+        if status == ingest.ACCEPTED:
+            status = COMMITTED
+        elif status == ingest.DUPLICATE:
+            vote_id, candidate_id = stored.get(
+                (row["user_id"], row["nomination_id"]), (None, None)
+            )
+            if candidate_id == row["candidate_id"]:
+                status = COMMITTED
+            else:
+                vote_id = None
+        outcomes.append((row["id"], status, vote_id))
+    queue.mark(outcomes)
+    return len(rows)
+
+
+_queues = {}
+
+
+def get_queue():
+    path = str(queue_settings()["PATH"])
+    if path not in _queues:
+        _queues[path] = VoteQueue(path)
+    return _queues[path]
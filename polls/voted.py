@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+
+from .models import Vote
+
+
+def get_index_cache():
+    return caches[getattr(settings, "POLLS_VOTED_INDEX_CACHE", "default")]
+
+
+def _key(user_id):
+    return f"voted:{user_id}"
+
+
+def voted_index(user):
+    """Голоса пользователя ``{nomination_id: candidate_id}``.
+
+    Берётся из кэша (или одним запросом из базы) и запоминается на объекте
+    пользователя, поэтому за запрос читается не больше одного раза.
+    """
+    if not user or not user.is_authenticated:
+        return {}
+    index = getattr(user, "_voted_index", None)
+    if index is None:
+        cache = get_index_cache()
+        index = cache.get(_key(user.pk))
+        if index is None:
+            # Свои голоса читаются из основной базы, даже если запрос
+            # читает из реплики: она может ещё не получить новый голос.
+            index = dict(
+                Vote.objects.using(router.db_for_write(Vote))
+                .filter(user_id=user.pk)
+                .values_list("nomination_id", "candidate_id")
+            )
+            cache.set(_key(user.pk), index)
+        user._voted_index = index
+    return index
+
+
+def voted_candidate_ids(user):
+    return list(voted_index(user).values())
+
+
+def has_voted(user, nomination_id):
+    """Голосовал ли пользователь в номинации.
+
+    Индекс — только подсказка: кэш другого процесса мог не узнать об
+    удалённом голосе. Поэтому найденный голос подтверждается запросом к
+    основной базе, а устаревший индекс сбрасывается. Пропущенный в индексе
+    голос отсекает ограничение unique_vote_per_nomination.
+    """
+    if nomination_id not in voted_index(user):
+        return False
+    exists = (
+        Vote.objects.using(router.db_for_write(Vote))
+        .filter(user_id=user.pk, nomination_id=nomination_id)
+        .exists()
+    )
+    if not exists:
+        get_index_cache().delete(_key(user.pk))
+        del user._voted_index
+    return exists
+
+
+def record_votes(votes):
+    """После коммита добавляет новые голоса в закэшированные индексы их
+    пользователей; незакэшированные индексы прочитаются при обращении."""
+    added = defaultdict(dict)
+    for vote in votes:
+        added[vote.user_id][vote.nomination_id] = vote.candidate_id
+    if not added:
+        return
+
+    def apply():
+        cache = get_index_cache()
+        cached = cache.get_many([_key(user_id) for user_id in added])
+        cache.set_many(
+            {
+                key: {**cached[key], **added[user_id]}
+                for user_id in added
+                if (key := _key(user_id)) in cached
+            }
+        )
+
+    transaction.on_commit(apply)
+
+
+def forget_users(user_ids):
+    """Сбрасывает индексы пользователей после коммита (удаление голоса,
+    перенос кандидата в другую номинацию)."""
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: get_index_cache().delete_many(keys))